@@ -1,12 +1,23 @@
+import functools
 import os
-from datetime import datetime
 from typing import Any
 
 from flask import Flask, jsonify, render_template, request
 from dotenv import load_dotenv
+from werkzeug.middleware.proxy_fix import ProxyFix
+from neo4j.exceptions import ClientError
 
+from graph.admission import Rejected, pool_from_env
+from graph.event_impact import format_event_impact, read_event_impact
 from graph.neo4j_connection import Neo4jConnection
-from chatbot.chatbot import answer_from_neo4j
+from chatbot.chatbot import answer_comparison, answer_from_neo4j, answer_in_session
+from chatbot.sessions import store as session_store
+from graph.news_search import search_news
+from graph.peer_aggregates import GROUP_TYPES, read_group_summary
+from graph.read_model import (
+    ReadModel, load_companies, load_overview, parse_fields, project_bundle, rows_to_columns
+)
+from graph.singleflight import coalesced, singleflight_stats
 
 # --------------------------------------------------
 # Load environment variables (.env)
@@ -29,16 +40,61 @@ NEO4J_PASSWORD = _env("NEO4J_PASSWORD", "firmlens")
 # --------------------------------------------------
 app = Flask(__name__, template_folder="templates")
 
+# Behind a reverse proxy, set FIRMLENS_PROXY_HOPS to the number of proxies
+# in front of the app so request.remote_addr is the real client address.
+# X-Forwarded-For is not trusted otherwise (any client can send it).
+PROXY_HOPS = int(_env("FIRMLENS_PROXY_HOPS", "0"))
+if PROXY_HOPS > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_HOPS)  # type: ignore[method-assign]
+
 def get_driver() -> Neo4jConnection:
     """Singleton Neo4j connection for dev/MVP."""
     if not hasattr(app, "_neo4j"):
         app._neo4j = Neo4jConnection(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)  # type: ignore[attr-defined]
     return app._neo4j  # type: ignore[attr-defined]
 
-def _record_to_dict(obj: Any) -> Any:
-    if hasattr(obj, "_properties"):
-        return dict(obj._properties)  # noqa
-    return obj
+# Local overview snapshot published by ingestion (graph/read_model.py)
+read_model = ReadModel()
+
+# --------------------------------------------------
+# Admission control (graph/admission.py)
+# Chat and dashboard routes draw from separate pools, so a burst of slow
+# LLM calls is shed with 429/503 instead of taking every worker thread.
+# --------------------------------------------------
+chat_pool = pool_from_env("chat", capacity=4, queue=8, max_wait_s=2.0, client_queue=2)
+dashboard_pool = pool_from_env("dashboard", capacity=16, queue=32, max_wait_s=1.0, client_queue=8)
+
+def _client_key() -> str:
+    # Rewritten from X-Forwarded-For by ProxyFix only when FIRMLENS_PROXY_HOPS is set
+    return request.remote_addr or "unknown"
+
+def admitted(pool, rejected_body):
+    """Route decorator: run inside `pool`, or answer fast with Retry-After."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                ticket = pool.acquire(_client_key())
+            except Rejected as e:
+                response = jsonify(rejected_body(e))
+                response.status_code = e.status
+                response.headers["Retry-After"] = str(e.retry_after)
+                return response
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                pool.release(ticket)
+        return wrapper
+    return decorator
+
+def _dashboard_rejected(e: Rejected) -> dict:
+    return {"error": e.reason, "retry_after": e.retry_after}
+
+def _chat_rejected(e: Rejected) -> dict:
+    return {
+        "reply": "FIRMLENS is busy answering other questions, please retry shortly.",
+        "meta": {"ok": False, "error": e.reason, "retry_after": e.retry_after},
+    }
 
 # --------------------------------------------------
 # Routes
@@ -58,124 +114,218 @@ def health():
     except Exception as e:
         return jsonify({"ok": False, "neo4j": False, "error": str(e)}), 500
 
+@app.get("/api/metrics")
+def metrics():
+    return jsonify({
+        "singleflight": singleflight_stats(),
+        "chat_sessions": session_store.stats(),
+        "read_model": read_model.stats(),
+        "admission": {"chat": chat_pool.stats(), "dashboard": dashboard_pool.stats()},
+    })
+
 @app.get("/api/companies")
+@admitted(dashboard_pool, _dashboard_rejected)
 def list_companies():
+    companies = read_model.companies(limit=50)
+    if companies is None:
+        driver = get_driver()
+        with driver.driver.session() as session:
+            companies = load_companies(session, limit=50)
+    return jsonify({"companies": companies})
+
+def _projection_key(projection: dict | None):
+    if projection is None:
+        return None
+    return tuple(sorted((k, tuple(v) if v is not None else None) for k, v in projection.items()))
+
+@coalesced(
+    "overview",
+    key=lambda company_id, limit_news, projection=None: (company_id, limit_news, _projection_key(projection)),
+)
+def _overview_payload(company_id: str, limit_news: int, projection: dict | None = None) -> dict[str, Any] | None:
+    """Overview bundle for one company, or None if it doesn't exist."""
     driver = get_driver()
     with driver.driver.session() as session:
-        res = session.run(
-            """
-            MATCH (c:Company)
-            RETURN c.company_id AS company_id,
-                   c.name AS name,
-                   c.sector AS sector,
-                   c.industry AS industry
-            ORDER BY c.name
-            LIMIT 50
-            """
-        )
-        companies = [dict(r) for r in res]
-    return jsonify({"companies": companies})
+        return load_overview(session, company_id, limit_news, projection)
 
 @app.get("/api/company/<company_id>/overview")
+@admitted(dashboard_pool, _dashboard_rejected)
 def company_overview(company_id: str):
-    driver = get_driver()
+    """
+    ?newsLimit=10
+    ?fields=company.name,quarterly.sales,news  only these sections / properties
+    ?format=columns  quarterly/annual as {"period_end": [...], "sales": [...]}
+    """
     limit_news = int(request.args.get("newsLimit", "10"))
+    try:
+        projection = parse_fields(request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    with driver.driver.session() as session:
-        company_rec = session.run(
-            """
-            MATCH (c:Company {company_id: $company_id})
-            RETURN c AS company
-            """,
-            {"company_id": company_id},
-        ).single()
+    # Snapshot first (no network hop); Neo4j only on a miss
+    payload = read_model.overview(company_id, limit_news)
+    if payload is not None:
+        payload = project_bundle(payload, projection)
+    else:
+        payload = _overview_payload(company_id, limit_news, projection)
+    if payload is None:
+        return jsonify({"error": f"Company not found: {company_id}"}), 404
 
-        if not company_rec:
-            return jsonify({"error": f"Company not found: {company_id}"}), 404
+    if request.args.get("format") == "columns":
+        payload = {
+            **payload,
+            **{
+                section: rows_to_columns(payload[section], section, projection)
+                for section in ("quarterly", "annual")
+                if section in payload
+            },
+        }
+    return jsonify(payload)
 
-        company = _record_to_dict(company_rec["company"])
+@app.get("/api/company/<company_id>/period-news")
+@admitted(dashboard_pool, _dashboard_rejected)
+def company_period_news(company_id: str):
+    """
+    News attached to each financial period via ABOUT_PERIOD edges.
+    Optional ?periodType=quarter|year and ?newsLimit= (per period).
+    """
+    period_type = request.args.get("periodType")
+    limit_news = int(request.args.get("newsLimit", "10"))
 
-        quarterly = [
+    driver = get_driver()
+    with driver.driver.session() as session:
+        periods = [
             dict(r)
             for r in session.run(
                 """
-                MATCH (c:Company {company_id: $company_id})
-                      -[:HAS_PERIOD]->(p:FinancialPeriod {period_type: "quarter"})
-                      -[:HAS_METRICS]->(m:FinancialMetrics)
+                MATCH (c:Company {company_id: $company_id})-[:HAS_PERIOD]->(p:FinancialPeriod)
+                WHERE $period_type IS NULL OR p.period_type = $period_type
+                OPTIONAL MATCH (p)-[:HAS_METRICS]->(m:FinancialMetrics)
+                WITH p, head(collect(m)) AS m
+                OPTIONAL MATCH (n:News)-[r:ABOUT_PERIOD]->(p)
+                WITH p, m, n, r
+                ORDER BY n.published_at DESC
+                WITH p, m, collect(CASE WHEN n IS NOT NULL THEN {
+                         news_id: n.news_id, title: n.title, source: n.source,
+                         published_at: n.published_at, url: n.url,
+                         event_type: n.event_type, via: r.via
+                     } END)[..$limit] AS news
                 RETURN p.period_end AS period_end,
+                       p.period_type AS period_type,
                        p.label AS label,
                        m.sales AS sales,
                        m.operating_profit AS operating_profit,
                        m.net_profit AS net_profit,
                        m.opm_percent AS opm_percent,
                        m.eps AS eps,
-                       m.source_url AS source_url
-                ORDER BY p.period_end ASC
+                       news
+                ORDER BY period_end ASC
                 """,
-                {"company_id": company_id},
+                {"company_id": company_id, "period_type": period_type, "limit": limit_news},
             )
         ]
 
-        annual = [
-            dict(r)
-            for r in session.run(
-                """
-                MATCH (c:Company {company_id: $company_id})
-                      -[:HAS_PERIOD]->(p:FinancialPeriod {period_type: "year"})
-                      -[:HAS_METRICS]->(m:FinancialMetrics)
-                RETURN p.period_end AS period_end,
-                       p.label AS label,
-                       m.sales AS sales,
-                       m.operating_profit AS operating_profit,
-                       m.net_profit AS net_profit,
-                       m.opm_percent AS opm_percent,
-                       m.eps AS eps,
-                       m.source_url AS source_url
-                ORDER BY p.period_end ASC
-                """,
-                {"company_id": company_id},
-            )
-        ]
+    if not periods:
+        return jsonify({"error": f"No periods found for company: {company_id}"}), 404
+    return jsonify({"company_id": company_id, "periods": periods})
 
-        news = [
-            dict(r)
-            for r in session.run(
-                """
-                MATCH (c:Company {company_id: $company_id})-[:MENTIONED_IN]->(n:News)
-                RETURN n.news_id AS news_id,
-                       n.title AS title,
-                       n.summary AS summary,
-                       n.source AS source,
-                       n.published_at AS published_at,
-                       n.url AS url,
-                       n.event_type AS event_type,
-                       n.time_context AS time_context
-                ORDER BY n.published_at DESC
-                LIMIT $limit
-                """,
-                {"company_id": company_id, "limit": limit_news},
-            )
-        ]
+@app.get("/api/sector/<name>/summary")
+@admitted(dashboard_pool, _dashboard_rejected)
+def sector_summary(name: str):
+    """
+    Precomputed peer quartiles (OPM, YoY sales / EPS growth) per period.
+    ?groupType=industry to look up an industry instead of a sector.
+    """
+    group_type = request.args.get("groupType", "sector")
+    if group_type not in GROUP_TYPES:
+        return jsonify({"error": f"groupType must be one of {GROUP_TYPES}"}), 400
 
+    driver = get_driver()
+    with driver.driver.session() as session:
+        summary = read_group_summary(session, name, group_type)
+    if summary is None:
+        return jsonify({"error": f"No aggregates for {group_type}: {name}"}), 404
+    return jsonify(summary)
+
+@app.get("/api/company/<company_id>/event-impact")
+@admitted(dashboard_pool, _dashboard_rejected)
+def company_event_impact(company_id: str):
+    """
+    Precomputed next-quarter metric changes after news clusters, per
+    event_type (graph/event_impact.py). `context` is the compact text the
+    chatbot gets.
+    """
+    driver = get_driver()
+    with driver.driver.session() as session:
+        events = read_event_impact(session, company_id)
     return jsonify({
-        "company": company,
-        "quarterly": quarterly,
-        "annual": annual,
-        "news": news,
-        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "company_id": company_id,
+        "computed_at": events[0].get("computed_at") if events else None,
+        "events": events,
+        "context": format_event_impact(events),
     })
 
+def _news_search(company_id: str | None):
+    """
+    Shared handler for the news search routes.
+    ?q=terms  &from=YYYY-MM-DD  &to=YYYY-MM-DD  &limit=20  &cursor=<next_cursor>
+    &syntax=lucene to pass q through as a raw Lucene query.
+    """
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify({"error": "Missing query parameter: q"}), 400
+
+    driver = get_driver()
+    try:
+        with driver.driver.session() as session:
+            page = search_news(
+                session,
+                q,
+                company_id=company_id,
+                date_from=request.args.get("from"),
+                date_to=request.args.get("to"),
+                limit=int(request.args.get("limit", "20")),
+                cursor=request.args.get("cursor"),
+                raw_syntax=request.args.get("syntax") == "lucene",
+            )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except ClientError as e:
+        # Malformed syntax=lucene queries are rejected by the index
+        return jsonify({"error": f"Invalid query: {e.message}"}), 400
+
+    return jsonify({"query": q, "company_id": company_id, **page})
+
+@app.get("/api/company/<company_id>/news/search")
+@admitted(dashboard_pool, _dashboard_rejected)
+def company_news_search(company_id: str):
+    return _news_search(company_id)
+
+@app.get("/api/news/search")
+@admitted(dashboard_pool, _dashboard_rejected)
+def news_search():
+    return _news_search(request.args.get("company_id"))
+
 @app.post("/api/chat")
+@admitted(chat_pool, _chat_rejected)
 def chat():
     """
     Chat endpoint for FIRMLENS.
     Accepts BOTH:
       { "question": "..." }  or
       { "message": "..." }
+    Pass "company_ids": [...] (2+ ids) for a side-by-side comparison.
+    Include "session_id" (null to start one) for multi-turn chat; the
+    reply meta carries the session_id to send back on the next turn.
     """
     data = request.get_json(force=True, silent=True) or {}
 
     company_id = (data.get("company_id") or "TATA_ELXSI").strip()
+    raw_ids = data.get("company_ids") or []
+    if isinstance(raw_ids, str):
+        raw_ids = raw_ids.split(",")
+    # De-duplicate while keeping the caller's order
+    company_ids = list(dict.fromkeys(str(c).strip() for c in raw_ids if str(c).strip()))
     question = (data.get("question") or data.get("message") or "").strip()
 
     if not question:
@@ -184,11 +334,25 @@ def chat():
     driver = get_driver()
 
     try:
-        result = answer_from_neo4j(
-            neo4j_driver=driver.driver,
-            company_id=company_id,
-            question=question,
-        )
+        if "session_id" in data:
+            result = answer_in_session(
+                neo4j_driver=driver.driver,
+                company_ids=company_ids or [company_id],
+                question=question,
+                session_id=(data.get("session_id") or "").strip() or None,
+            )
+        elif len(company_ids) > 1:
+            result = answer_comparison(
+                neo4j_driver=driver.driver,
+                company_ids=company_ids,
+                question=question,
+            )
+        else:
+            result = answer_from_neo4j(
+                neo4j_driver=driver.driver,
+                company_id=company_ids[0] if company_ids else company_id,
+                question=question,
+            )
         return jsonify(result)
     except Exception as e:
         print("❌ CHAT ERROR:", e)
@@ -197,6 +361,10 @@ def chat():
             "meta": {"ok": False, "error": str(e)}
         }), 500
 
+@app.delete("/api/chat/session/<session_id>")
+def end_chat_session(session_id: str):
+    return jsonify({"ok": session_store.drop(session_id)})
+
 # --------------------------------------------------
 # Run
 # --------------------------------------------------
@@ -0,0 +1,138 @@
+"""
+Benchmark: per-period nodes vs compact MetricSeries arrays (needs Neo4j).
+
+Loads N synthetic companies (company_id prefix BENCH_) in both storage
+models, measures reading the latest 10 quarters per company, reports
+node / relationship / property counts, then deletes the synthetic data.
+
+    python benchmarks/bench_series_storage.py --companies 500 --quarters 40
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from graph.ingestion import ingest_financials
+from graph.neo4j_connection import Neo4jConnection
+from graph.series_store import ingest_series, read_series
+
+PREFIX = "BENCH_"
+
+GRAPH_READ = """
+    MATCH (:Company {company_id: $company_id})-[:HAS_PERIOD]->(p:FinancialPeriod {period_type: "quarter"})
+          -[:HAS_METRICS]->(m:FinancialMetrics)
+    RETURN p.period_end AS period_end, p.label AS label,
+           m.sales AS sales, m.operating_profit AS operating_profit,
+           m.net_profit AS net_profit, m.opm_percent AS opm_percent, m.eps AS eps
+    ORDER BY p.period_end DESC
+    LIMIT 10
+"""
+
+
+def synthetic_quarters(n: int, rng: random.Random) -> list[dict]:
+    rows = []
+    year, q = 2025 - n // 4, 0
+    ends = ["03-31", "06-30", "09-30", "12-31"]
+    labels = ["Mar", "Jun", "Sep", "Dec"]
+    for _ in range(n):
+        sales = rng.randint(100, 5000)
+        op = int(sales * rng.uniform(0.1, 0.3))
+        rows.append({
+            "period_type": "quarter",
+            "period_end": f"{year}-{ends[q]}",
+            "label": f"{labels[q]} {year}",
+            "sales": sales,
+            "operating_profit": op,
+            "net_profit": int(op * 0.7),
+            "opm_percent": round(op / sales * 100, 2),
+            "eps": round(rng.uniform(1, 50), 2),
+            "source_url": None,
+        })
+        q = (q + 1) % 4
+        year += q == 0
+    return rows
+
+
+def _timed(fn, ids):
+    times = []
+    for cid in ids:
+        start = time.perf_counter()
+        fn(cid)
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.95) - 1]
+
+
+GRAPH_COUNTS = """
+    MATCH (c:Company)-[hp:HAS_PERIOD]->(p:FinancialPeriod)-[hm:HAS_METRICS]->(m:FinancialMetrics)
+    WHERE c.company_id STARTS WITH $prefix
+    RETURN count(DISTINCT p) + count(DISTINCT m) AS nodes,
+           count(DISTINCT hp) + count(DISTINCT hm) AS relationships,
+           sum(size(keys(p))) + sum(size(keys(m))) AS properties
+"""
+
+SERIES_COUNTS = """
+    MATCH (c:Company)-[hs:HAS_SERIES]->(s:MetricSeries)
+    WHERE c.company_id STARTS WITH $prefix
+    RETURN count(s) AS nodes, count(hs) AS relationships,
+           sum(size(keys(s))) AS properties
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--companies", type=int, default=500)
+    parser.add_argument("--quarters", type=int, default=40)
+    args = parser.parse_args()
+
+    conn = Neo4jConnection(
+        os.getenv("NEO4J_URI", "bolt://127.0.0.1:7687"),
+        os.getenv("NEO4J_USER", "neo4j"),
+        os.getenv("NEO4J_PASSWORD", "firmlens"),
+    )
+    rng = random.Random(7)
+    ids = [f"{PREFIX}{i:05d}" for i in range(args.companies)]
+
+    try:
+        with conn.driver.session() as session:
+            print(f"🔄 Loading {args.companies} companies x {args.quarters} quarters in both models...")
+            for cid in ids:
+                rows = synthetic_quarters(args.quarters, rng)
+                session.execute_write(ingest_financials, cid, rows)
+                session.execute_write(ingest_series, cid, "quarter", rows)
+
+            graph_p50, graph_p95 = _timed(
+                lambda cid: list(session.run(GRAPH_READ, {"company_id": cid})), ids)
+            series_p50, series_p95 = _timed(
+                lambda cid: read_series(session, cid, "quarter", limit=10), ids)
+
+            graph_store = session.run(GRAPH_COUNTS, {"prefix": PREFIX}).single()
+            series_store = session.run(SERIES_COUNTS, {"prefix": PREFIX}).single()
+
+        print("\nRead latest 10 quarters (ms)      p50      p95")
+        print(f"  period/metrics nodes      {graph_p50:8.2f} {graph_p95:8.2f}")
+        print(f"  MetricSeries arrays       {series_p50:8.2f} {series_p95:8.2f}")
+        print("\nStore size                   nodes    rels   props")
+        for name, c in [("period/metrics nodes", graph_store), ("MetricSeries arrays", series_store)]:
+            print(f"  {name:<24} {c['nodes']:7d} {c['relationships']:7d} {c['properties']:7d}")
+    finally:
+        with conn.driver.session() as session:
+            session.run("""
+                MATCH (c:Company) WHERE c.company_id STARTS WITH $prefix
+                OPTIONAL MATCH (c)-[:HAS_PERIOD]->(p)-[:HAS_METRICS]->(m)
+                OPTIONAL MATCH (c)-[:HAS_SERIES]->(s)
+                DETACH DELETE c, p, m, s
+            """, {"prefix": PREFIX}).consume()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
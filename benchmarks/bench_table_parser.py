@@ -0,0 +1,140 @@
+"""
+Benchmark: bulk table parser vs the original per-cell cleaning helpers.
+
+    python benchmarks/bench_table_parser.py --companies 5000 --periods 60
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from normalizations.table_parser import parse_cells, parse_table, to_python
+
+
+# --------------------------------
+# Original implementations (baseline)
+# --------------------------------
+
+def legacy_clean_number(val):
+    if not val:
+        return None
+    val = val.replace(",", "")
+    m = re.findall(r"-?\d+", val)
+    return int(m[0]) if m else None
+
+
+def legacy_clean_float(val):
+    if not val:
+        return None
+    return float(val.replace(",", ""))
+
+
+def legacy_clean_percent(val):
+    if not val:
+        return None
+    return int(float(val.replace("%", "")))
+
+
+LEGACY = {
+    "sales": legacy_clean_number,
+    "operating_profit": legacy_clean_number,
+    "opm_percent": legacy_clean_percent,
+    "net_profit": legacy_clean_number,
+    "eps": legacy_clean_float,
+}
+
+
+# --------------------------------
+# Synthetic screener tables
+# --------------------------------
+
+def _amount(rng):
+    v = rng.uniform(-500, 250_000)
+    if rng.random() < 0.3:
+        text = f"{abs(v):,.2f}"
+    else:
+        text = f"{abs(round(v)):,}"
+    if v < 0:
+        text = f"({text})" if rng.random() < 0.3 else f"-{text}"
+    return text
+
+
+def synthetic_tables(companies: int, periods: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    tables = []
+    for _ in range(companies):
+        table = {}
+        for metric in LEGACY:
+            cells = []
+            for _ in range(periods):
+                if rng.random() < 0.03:
+                    cells.append("")
+                elif metric == "opm_percent":
+                    cells.append(f"{rng.uniform(-20, 45):.1f}%")
+                elif metric == "eps":
+                    cells.append(f"{rng.uniform(-5, 300):.2f}")
+                else:
+                    cells.append(_amount(rng))
+            table[metric] = cells
+        tables.append(table)
+    return tables
+
+
+def _safe(fn, cell):
+    # legacy float()/int() raise on parentheses and unicode minus
+    try:
+        return fn(cell)
+    except ValueError:
+        return "error"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--companies", type=int, default=5_000)
+    parser.add_argument("--periods", type=int, default=60)
+    args = parser.parse_args()
+
+    tables = synthetic_tables(args.companies, args.periods)
+    cells = args.companies * args.periods * len(LEGACY)
+
+    start = time.perf_counter()
+    legacy = [
+        {metric: [_safe(LEGACY[metric], c) for c in column] for metric, column in table.items()}
+        for table in tables
+    ]
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bulk = [{metric: to_python(v) for metric, v in parse_table(table).items()} for table in tables]
+    bulk_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    universe = parse_cells([c for table in tables for column in table.values() for c in column])
+    universe_s = time.perf_counter() - start
+
+    differs = sum(
+        1
+        for a, b in zip(legacy, bulk)
+        for metric in LEGACY
+        for x, y in zip(a[metric], b[metric])
+        if x != y
+    )
+
+    print(f"cells:              {cells:,}")
+    print(f"legacy per-cell:    {legacy_s:.3f}s  ({cells / legacy_s:,.0f}/s)")
+    print(f"bulk table parser:  {bulk_s:.3f}s  ({cells / bulk_s:,.0f}/s)  x{legacy_s / bulk_s:.1f}")
+    print(f"one call, all tables (float64 array, no Python values): "
+          f"{universe_s:.3f}s  x{legacy_s / universe_s:.1f}  ({len(universe):,} values)")
+    print(f"values differing from legacy: {differs:,} "
+          f"(decimals kept, parenthesised negatives, percent fractions)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,21 @@
 from __future__ import annotations
 
 import os
+import time
 from datetime import datetime
 from typing import Any
 
 from neo4j import Driver
 
-# LangChain (Groq)
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
-
 from dotenv import load_dotenv
 load_dotenv()
 
+from chatbot.llm_backends import LLMBackend, get_backend
+from chatbot.sessions import ChatSession, store as session_store
+from graph.event_impact import format_event_impact, read_event_impact
+from graph.series_store import read_series, read_series_many, reads_series
+from graph.singleflight import coalesced
+
 
 
 SYSTEM_PROMPT = """You are FirmLens Assistant.
@@ -28,17 +30,26 @@ Rules (must follow):
 """
 
 
-PROMPT = ChatPromptTemplate.from_messages(
-    [
-        ("system", SYSTEM_PROMPT),
-        (
-            "human",
-            "CONTEXT (Neo4j):\n{context}\n\nUSER QUESTION:\n{question}\n\nAnswer:",
-        ),
-    ]
+HUMAN_PROMPT = "CONTEXT (Neo4j):\n{context}\n\nUSER QUESTION:\n{question}\n\nAnswer:"
+
+CONVERSATION_PROMPT = (
+    "CONTEXT (Neo4j):\n{context}\n\n"
+    "CONVERSATION SO FAR:\n{history}\n\n"
+    "USER QUESTION:\n{question}\n\nAnswer:"
 )
 
 
+# Row fields used by the context builders (series-mode reads)
+CONTEXT_QUARTER_FIELDS = [
+    "label", "sales", "operating_profit", "net_profit", "opm_percent", "eps", "source_url",
+    "sales_yoy", "net_profit_yoy", "opm_delta_yoy", "sales_ttm",
+]
+CONTEXT_YEAR_FIELDS = [
+    "label", "sales", "operating_profit", "net_profit", "opm_percent", "eps",
+    "sales_yoy", "net_profit_yoy",
+]
+
+
 def _env(name: str, default: str | None = None) -> str | None:
     v = os.getenv(name)
     if v is None or v.strip() == "":
@@ -75,6 +86,8 @@ def _fmt_context(bundle: dict[str, Any]) -> str:
             f"- {row.get('label')} | period_end={row.get('period_end')} | "
             f"sales={row.get('sales')} | op_profit={row.get('operating_profit')} | "
             f"opm%={row.get('opm_percent')} | net_profit={row.get('net_profit')} | eps={row.get('eps')} | "
+            f"sales_yoy%={row.get('sales_yoy')} | net_profit_yoy%={row.get('net_profit_yoy')} | "
+            f"opm_delta_yoy_pp={row.get('opm_delta_yoy')} | sales_ttm={row.get('sales_ttm')} | "
             f"source_url={row.get('source_url')}"
         )
     if not q:
@@ -86,7 +99,8 @@ def _fmt_context(bundle: dict[str, Any]) -> str:
         lines.append(
             f"- {row.get('label')} | period_end={row.get('period_end')} | "
             f"sales={row.get('sales')} | op_profit={row.get('operating_profit')} | "
-            f"opm%={row.get('opm_percent')} | net_profit={row.get('net_profit')} | eps={row.get('eps')}"
+            f"opm%={row.get('opm_percent')} | net_profit={row.get('net_profit')} | eps={row.get('eps')} | "
+            f"sales_yoy%={row.get('sales_yoy')} | net_profit_yoy%={row.get('net_profit_yoy')}"
         )
     if not a:
         lines.append("- (no annual data)")
@@ -103,9 +117,95 @@ def _fmt_context(bundle: dict[str, Any]) -> str:
     if not n:
         lines.append("- (no news)")
 
+    impact = bundle.get("event_impact") or []
+    if impact:
+        lines.append("")
+        lines.append("== News event impact (precomputed: next-quarter change after news of each type vs the company's usual change) ==")
+        lines.append(format_event_impact(impact))
+
     return "\n".join(lines)
 
 
+_TABLE_METRICS = [
+    ("sales", "sales"),
+    ("operating_profit", "op_profit"),
+    ("opm_percent", "opm%"),
+    ("net_profit", "net_profit"),
+    ("eps", "eps"),
+]
+
+
+def _fmt_metric_tables(bundles: list[dict[str, Any]], key: str, title: str) -> list[str]:
+    """One table per metric: rows = period label, columns = company_id."""
+    ids = [b["company"].get("company_id") for b in bundles]
+    periods: dict[str, str] = {}
+    cells: dict[tuple[str, str, str], Any] = {}
+    for cid, b in zip(ids, bundles):
+        for row in b.get(key) or []:
+            periods.setdefault(row.get("period_end"), row.get("label"))
+            for field, _ in _TABLE_METRICS:
+                cells[(field, row.get("period_end"), cid)] = row.get(field)
+
+    lines = [f"== {title} (rows=period, columns: {' | '.join(ids)}) =="]
+    if not periods:
+        lines.append("- (no data)")
+        return lines
+    ordered = sorted(periods)
+    for field, short in _TABLE_METRICS:
+        lines.append(f"{short}:")
+        for pe in ordered:
+            values = " | ".join(_safe(cells.get((field, pe, cid))) for cid in ids)
+            lines.append(f"  {periods[pe] or pe} | {values}")
+    return lines
+
+
+def _fmt_comparison_context(bundles: list[dict[str, Any]], *, news_per_company: int = 3) -> str:
+    """
+    Compact side-by-side context for several companies.
+    Grows with the number of companies/periods, not with descriptions or news prose.
+    """
+    lines: list[str] = ["== Companies ==", "company_id | name | sector | industry | market_cap_cr | current_price"]
+    for b in bundles:
+        c = b.get("company", {}) or {}
+        lines.append(
+            " | ".join(_safe(c.get(k)) for k in
+                       ("company_id", "name", "sector", "industry", "market_cap_cr", "current_price"))
+        )
+    lines.append("")
+    lines.extend(_fmt_metric_tables(bundles, "quarterly", "Quarterly financials"))
+    lines.append("")
+    lines.extend(_fmt_metric_tables(bundles, "annual", "Annual financials"))
+    lines.append("")
+
+    lines.append("== News headlines (latest first) ==")
+    for b in bundles:
+        cid = (b.get("company") or {}).get("company_id")
+        for item in (b.get("news") or [])[:news_per_company]:
+            lines.append(
+                f"- {cid} | {item.get('published_at')} | {item.get('event_type')} | {item.get('title')} "
+                f"(source={item.get('source')}) url={item.get('url')}"
+            )
+    return "\n".join(lines)
+
+
+def _context_key(neo4j_driver, company_id, *, limit_quarters=10, limit_annual=4, limit_news=10):
+    return (id(neo4j_driver), company_id, int(limit_quarters), int(limit_annual), int(limit_news))
+
+
+def _companies_key(neo4j_driver, company_ids, *, limit_quarters=10, limit_annual=4, limit_news=3):
+    return (id(neo4j_driver), tuple(company_ids), int(limit_quarters), int(limit_annual), int(limit_news))
+
+
+def _answer_key(*, neo4j_driver, company_id, question, model=None, backend=None, bundle=None):
+    # Case/whitespace variants of the same question share one LLM call.
+    q = " ".join((question or "").lower().split())
+    return (
+        id(neo4j_driver), company_id, q, model,
+        id(backend) if backend else None, id(bundle) if bundle is not None else None,
+    )
+
+
+@coalesced("context", key=_context_key)
 def fetch_company_context(
     neo4j_driver: Driver,
     company_id: str,
@@ -126,40 +226,47 @@ def fetch_company_context(
             raise ValueError(f"Company not found: {company_id}")
         company = dict(company_rec["company"]._properties)  # noqa: SLF001
 
-        # Quarterly (descending then reversed for human readability)
-        q_rows = list(
-            session.run(
-                """
-                MATCH (:Company {company_id: $company_id})-[:HAS_PERIOD]->(p:FinancialPeriod {period_type: "quarter"})
-                      -[:HAS_METRICS]->(m:FinancialMetrics)
-                RETURN p.period_end AS period_end, p.label AS label,
-                       m.sales AS sales, m.operating_profit AS operating_profit,
-                       m.net_profit AS net_profit, m.opm_percent AS opm_percent,
-                       m.eps AS eps, m.source_url AS source_url
-                ORDER BY p.period_end DESC
-                LIMIT $limit
-                """,
-                {"company_id": company_id, "limit": int(limit_quarters)},
-            )
-        )
-        quarterly = [dict(r) for r in reversed(q_rows)]
-
-        annual = [
-            dict(r)
-            for r in session.run(
-                """
-                MATCH (:Company {company_id: $company_id})-[:HAS_PERIOD]->(p:FinancialPeriod {period_type: "year"})
-                      -[:HAS_METRICS]->(m:FinancialMetrics)
-                RETURN p.period_end AS period_end, p.label AS label,
-                       m.sales AS sales, m.operating_profit AS operating_profit,
-                       m.net_profit AS net_profit, m.opm_percent AS opm_percent,
-                       m.eps AS eps
-                ORDER BY p.period_end ASC
-                LIMIT $limit
-                """,
-                {"company_id": company_id, "limit": int(limit_annual)},
+        if reads_series():
+            quarterly = read_series(session, company_id, "quarter", limit=limit_quarters, fields=CONTEXT_QUARTER_FIELDS)
+            annual = read_series(session, company_id, "year", limit=limit_annual, fields=CONTEXT_YEAR_FIELDS)
+        else:
+            # Quarterly (descending then reversed for human readability)
+            q_rows = list(
+                session.run(
+                    """
+                    MATCH (:Company {company_id: $company_id})-[:HAS_PERIOD]->(p:FinancialPeriod {period_type: "quarter"})
+                          -[:HAS_METRICS]->(m:FinancialMetrics)
+                    RETURN p.period_end AS period_end, p.label AS label,
+                           m.sales AS sales, m.operating_profit AS operating_profit,
+                           m.net_profit AS net_profit, m.opm_percent AS opm_percent,
+                           m.eps AS eps, m.source_url AS source_url,
+                           m.sales_yoy AS sales_yoy, m.net_profit_yoy AS net_profit_yoy,
+                           m.opm_delta_yoy AS opm_delta_yoy, m.sales_ttm AS sales_ttm
+                    ORDER BY p.period_end DESC
+                    LIMIT $limit
+                    """,
+                    {"company_id": company_id, "limit": int(limit_quarters)},
+                )
             )
-        ]
+            quarterly = [dict(r) for r in reversed(q_rows)]
+
+            annual = [
+                dict(r)
+                for r in session.run(
+                    """
+                    MATCH (:Company {company_id: $company_id})-[:HAS_PERIOD]->(p:FinancialPeriod {period_type: "year"})
+                          -[:HAS_METRICS]->(m:FinancialMetrics)
+                    RETURN p.period_end AS period_end, p.label AS label,
+                           m.sales AS sales, m.operating_profit AS operating_profit,
+                           m.net_profit AS net_profit, m.opm_percent AS opm_percent,
+                           m.eps AS eps,
+                           m.sales_yoy AS sales_yoy, m.net_profit_yoy AS net_profit_yoy
+                    ORDER BY p.period_end ASC
+                    LIMIT $limit
+                    """,
+                    {"company_id": company_id, "limit": int(limit_annual)},
+                )
+            ]
 
         news = [
             dict(r)
@@ -176,54 +283,277 @@ def fetch_company_context(
             )
         ]
 
-    return {"company": company, "quarterly": quarterly, "annual": annual, "news": news}
+        # Precomputed by graph/event_impact.py (empty until that job has run)
+        event_impact = read_event_impact(session, company_id)
 
+    return {"company": company, "quarterly": quarterly, "annual": annual, "news": news,
+            "event_impact": event_impact}
 
+
+@coalesced("context_multi", key=_companies_key)
+def fetch_companies_context(
+    neo4j_driver: Driver,
+    company_ids: list[str],
+    *,
+    limit_quarters: int = 10,
+    limit_annual: int = 4,
+    limit_news: int = 3,
+) -> list[dict[str, Any]]:
+    """
+    Context bundles for several companies in ONE round trip.
+    Returned in the order of `company_ids`; unknown ids raise ValueError.
+    """
+    with neo4j_driver.session() as session:
+        rows = list(
+            session.run(
+                """
+                UNWIND $company_ids AS cid
+                MATCH (c:Company {company_id: cid})
+                CALL {
+                    WITH c
+                    MATCH (c)-[:HAS_PERIOD]->(p:FinancialPeriod {period_type: "quarter"})-[:HAS_METRICS]->(m:FinancialMetrics)
+                    WITH p, m ORDER BY p.period_end DESC LIMIT $limit_quarters
+                    RETURN collect({period_end: p.period_end, label: p.label,
+                                    sales: m.sales, operating_profit: m.operating_profit,
+                                    net_profit: m.net_profit, opm_percent: m.opm_percent,
+                                    eps: m.eps}) AS quarterly
+                }
+                CALL {
+                    WITH c
+                    MATCH (c)-[:HAS_PERIOD]->(p:FinancialPeriod {period_type: "year"})-[:HAS_METRICS]->(m:FinancialMetrics)
+                    WITH p, m ORDER BY p.period_end DESC LIMIT $limit_annual
+                    RETURN collect({period_end: p.period_end, label: p.label,
+                                    sales: m.sales, operating_profit: m.operating_profit,
+                                    net_profit: m.net_profit, opm_percent: m.opm_percent,
+                                    eps: m.eps}) AS annual
+                }
+                CALL {
+                    WITH c
+                    MATCH (c)-[:MENTIONED_IN]->(nw:News)
+                    WITH nw ORDER BY nw.published_at DESC LIMIT $limit_news
+                    RETURN collect({published_at: nw.published_at, event_type: nw.event_type,
+                                    title: nw.title, source: nw.source, url: nw.url}) AS news
+                }
+                RETURN cid,
+                       c {.company_id, .name, .sector, .industry, .market_cap_cr, .current_price} AS company,
+                       quarterly, annual, news
+                """,
+                {
+                    "company_ids": list(company_ids),
+                    "limit_quarters": int(limit_quarters),
+                    "limit_annual": int(limit_annual),
+                    "limit_news": int(limit_news),
+                },
+            )
+        )
+
+        # Series mode: the period subqueries above come back empty; read the arrays instead
+        series = None
+        if reads_series():
+            series = {
+                "quarter": read_series_many(session, company_ids, "quarter", limit=limit_quarters),
+                "year": read_series_many(session, company_ids, "year", limit=limit_annual),
+            }
+
+    by_id = {
+        r["cid"]: {
+            "company": dict(r["company"]),
+            "quarterly": series["quarter"][r["cid"]] if series else list(reversed(r["quarterly"])),
+            "annual": series["year"][r["cid"]] if series else list(reversed(r["annual"])),
+            "news": list(r["news"]),
+        }
+        for r in rows
+    }
+    missing = [cid for cid in company_ids if cid not in by_id]
+    if missing:
+        raise ValueError(f"Company not found: {', '.join(missing)}")
+    return [by_id[cid] for cid in company_ids]
+
+
+def fetch_data_versions(neo4j_driver: Driver, company_ids: list[str]) -> dict[str, Any]:
+    """
+    Cheap per-company version lookup (Company.data_version, set at ingestion).
+    Missing companies are absent from the result.
+    """
+    with neo4j_driver.session() as session:
+        rows = session.run(
+            """
+            UNWIND $company_ids AS cid
+            MATCH (c:Company {company_id: cid})
+            RETURN cid, c.data_version AS version
+            """,
+            {"company_ids": list(company_ids)},
+        )
+        return {r["cid"]: r["version"] for r in rows}
+
+
+def _run_llm(llm: LLMBackend, prompt: str, meta: dict[str, Any]) -> dict[str, Any]:
+    result = llm.generate(SYSTEM_PROMPT, prompt)
+    return {
+        "reply": result.reply,
+        "meta": {
+            "ok": True,
+            **meta,
+            "backend": llm.name,
+            "model": result.model,
+            "prompt_tokens": result.prompt_tokens,
+            "completion_tokens": result.completion_tokens,
+            "generated_at": datetime.utcnow().isoformat() + "Z",
+        },
+    }
+
+
+def _not_configured(llm: LLMBackend) -> dict[str, Any] | None:
+    missing = llm.missing_config()
+    if not missing:
+        return None
+    return {
+        "reply": f"Chatbot is not configured yet ({missing}). Check the {llm.name} backend settings and restart the server.",
+        "meta": {"ok": False, "error": missing},
+    }
+
+
+@coalesced("chat", key=_answer_key)
 def answer_from_neo4j(
     *,
     neo4j_driver: Driver,
     company_id: str,
     question: str,
     model: str | None = None,
+    backend: LLMBackend | None = None,
+    bundle: dict[str, Any] | None = None,
 ) -> dict[str, Any]:
     """
     Main entrypoint used by the Flask API.
     Returns a JSON-serializable dict.
+    The LLM comes from `backend`, or FIRMLENS_LLM_BACKEND (groq | openai | stub).
+    Pass a prefetched `bundle` to skip the Neo4j context query.
     """
     q = (question or "").strip()
     if not q:
         return {"reply": "Ask a question about the company’s financials or news.", "meta": {"ok": True}}
 
-    groq_key = _env("GROQ_API_KEY")
-    if not groq_key:
-        return {
-            "reply": "Chatbot is not configured yet. Set the GROQ_API_KEY environment variable and restart the server.",
-            "meta": {"ok": False, "error": "missing_groq_api_key"},
-        }
-
-    # User requested llama-8b-instruct; allow override via env later.
-    model_name = model or _env("GROQ_MODEL", "llama-8b-instruct") or "llama-8b-instruct"
+    llm = backend or get_backend(model=model)
+    not_configured = _not_configured(llm)
+    if not_configured:
+        return not_configured
 
-    bundle = fetch_company_context(neo4j_driver, company_id)
+    if bundle is None:
+        bundle = fetch_company_context(neo4j_driver, company_id)
     context = _fmt_context(bundle)
 
-    llm = ChatGroq(
-        api_key=groq_key,
-        model=model_name,
-        temperature=float(_env("GROQ_TEMPERATURE", "0") or "0"),
-        max_tokens=int(_env("GROQ_MAX_TOKENS", "512") or "512"),
+    return _run_llm(llm, HUMAN_PROMPT.format(context=context, question=q), {"company_id": company_id})
+
+
+def _comparison_key(*, neo4j_driver, company_ids, question, model=None, backend=None):
+    q = " ".join((question or "").lower().split())
+    return (id(neo4j_driver), tuple(company_ids), q, model, id(backend) if backend else None)
+
+
+@coalesced("chat", key=_comparison_key)
+def answer_comparison(
+    *,
+    neo4j_driver: Driver,
+    company_ids: list[str],
+    question: str,
+    model: str | None = None,
+    backend: LLMBackend | None = None,
+) -> dict[str, Any]:
+    """
+    Comparative answer over several companies.
+    Contexts are fetched in one batched query and rendered as side-by-side tables.
+    """
+    q = (question or "").strip()
+    if not q:
+        return {"reply": "Ask a question comparing the selected companies.", "meta": {"ok": True}}
+
+    llm = backend or get_backend(model=model)
+    not_configured = _not_configured(llm)
+    if not_configured:
+        return not_configured
+
+    bundles = fetch_companies_context(neo4j_driver, company_ids)
+    context = _fmt_comparison_context(bundles)
+
+    return _run_llm(llm, HUMAN_PROMPT.format(context=context, question=q), {"company_ids": list(company_ids)})
+
+
+def _session_context(neo4j_driver: Driver, session: ChatSession) -> bool:
+    """
+    Make sure session.context matches the current company data.
+    Rebuilds it only when a company's data_version changed (or, for companies
+    ingested before data_version existed, after CHAT_CONTEXT_MAX_AGE_S).
+    Returns True if the context was (re)loaded.
+    """
+    ids = list(session.company_ids)
+    versions = fetch_data_versions(neo4j_driver, ids)
+    missing = [cid for cid in ids if cid not in versions]
+    if missing:
+        raise ValueError(f"Company not found: {', '.join(missing)}")
+
+    version = tuple(versions[cid] for cid in ids)
+    max_age = float(_env("CHAT_CONTEXT_MAX_AGE_S", "300") or "300")
+    unversioned = any(v is None for v in version)
+    fresh = (
+        session.context is not None
+        and session.context_version == version
+        and not (unversioned and time.time() - session.context_loaded_at > max_age)
     )
+    if fresh:
+        return False
 
-    chain = PROMPT | llm | StrOutputParser()
-    reply = chain.invoke({"context": context, "question": q})
+    if len(ids) > 1:
+        session.context = _fmt_comparison_context(fetch_companies_context(neo4j_driver, ids))
+    else:
+        session.context = _fmt_context(fetch_company_context(neo4j_driver, ids[0]))
+    session.context_version = version
+    session.context_loaded_at = time.time()
+    return True
 
-    return {
-        "reply": reply,
-        "meta": {
-            "ok": True,
-            "company_id": company_id,
-            "model": model_name,
-            "generated_at": datetime.utcnow().isoformat() + "Z",
-        },
-    }
 
+def answer_in_session(
+    *,
+    neo4j_driver: Driver,
+    company_ids: list[str],
+    question: str,
+    session_id: str | None = None,
+    model: str | None = None,
+    backend: LLMBackend | None = None,
+) -> dict[str, Any]:
+    """
+    Multi-turn chat. History is kept server-side as a rolling summary plus a
+    bounded window of recent turns; the grounding context is reused until the
+    company data version changes.
+    """
+    session = session_store.get_or_create(session_id)
+    q = (question or "").strip()
+    if not q:
+        return {"reply": "Ask a question about the company’s financials or news.",
+                "meta": {"ok": True, "session_id": session.session_id}}
+
+    llm = backend or get_backend(model=model)
+    not_configured = _not_configured(llm)
+    if not_configured:
+        not_configured["meta"]["session_id"] = session.session_id
+        return not_configured
+
+    # Turns within one session are answered in order.
+    with session.lock:
+        ids = tuple(company_ids)
+        if session.company_ids != ids:
+            session.reset(ids)
+        context_reloaded = _session_context(neo4j_driver, session)
+
+        prompt = CONVERSATION_PROMPT.format(context=session.context, history=session.history_text(), question=q)
+        result = _run_llm(llm, prompt, {
+            "company_ids": list(ids),
+            "session_id": session.session_id,
+            "turn": session.turns + 1,
+            "context_reloaded": context_reloaded,
+        })
+        session.add_turn(
+            q, result["reply"],
+            max_recent=session_store.max_recent,
+            max_summary_chars=session_store.max_summary_chars,
+        )
+    return result
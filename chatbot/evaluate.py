@@ -0,0 +1,277 @@
+"""
+Chat evaluation / regression runner.
+
+Runs a YAML question set against answer_from_neo4j for many companies and
+writes a JSON report (latency, tokens, grounding) that can be diffed against
+a previous run.
+
+    python -m chatbot.evaluate chatbot/eval_questions.yaml --backend stub \\
+        --bundles bundles.json --concurrency 32 --out report.json \\
+        --baseline previous_report.json
+
+Context comes from Neo4j unless --bundles points to a JSON file of
+{company_id: bundle}; use --dump-bundles to snapshot Neo4j into that format.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from chatbot.chatbot import _env, _fmt_context, answer_from_neo4j, fetch_company_context
+from chatbot.llm_backends import get_backend
+
+# --------------------------------
+# Grounding check
+# --------------------------------
+
+# A leading "-" is a sign unless it joins words/numbers ("2024-25", "Q3-FY25")
+_NUMBER = re.compile(r"(?:(?<!\w)-)?\d+(?:\.\d+)?")
+
+
+def _numbers(text: str) -> set[str]:
+    """
+    Numbers in `text`, normalised so '1,234.50' and '1234.5' compare equal.
+    The sign is kept: a reply that flips -12.5 to 12.5 is not grounded.
+    """
+    out = set()
+    for raw in _NUMBER.findall((text or "").replace(",", "").replace("−", "-")):
+        sign, n = ("-", raw[1:]) if raw.startswith("-") else ("", raw)
+        if "." in n:
+            n = n.rstrip("0").rstrip(".")
+        n = n.lstrip("0") or "0"
+        out.add(n if n == "0" else sign + n)
+    return out
+
+
+def ungrounded_numbers(reply: str, context: str) -> list[str]:
+    """Numbers cited in the reply that do not appear anywhere in the context."""
+    return sorted(_numbers(reply) - _numbers(context))
+
+
+# --------------------------------
+# Loading
+# --------------------------------
+
+def load_question_set(path: str) -> dict[str, Any]:
+    """
+    YAML format:
+        companies: [TATA_ELXSI, KPIT_TECHNOLOGIES]
+        questions:
+          - id: latest_sales
+            question: What were sales in the latest quarter?
+            companies: [TATA_ELXSI]   # optional override
+    """
+    raw = Path(path).read_bytes()
+    spec = yaml.safe_load(raw) or {}
+    questions = []
+    for i, q in enumerate(spec.get("questions") or []):
+        if isinstance(q, str):
+            q = {"question": q}
+        questions.append({
+            "id": str(q.get("id") or f"q{i + 1}"),
+            "question": q["question"],
+            "companies": q.get("companies"),
+        })
+    return {
+        "companies": list(spec.get("companies") or []),
+        "questions": questions,
+        "sha256": hashlib.sha256(raw).hexdigest(),
+    }
+
+
+def build_cases(spec: dict[str, Any], companies: list[str] | None) -> list[dict[str, str]]:
+    default_companies = companies or spec["companies"]
+    cases = []
+    for q in spec["questions"]:
+        for company_id in q["companies"] or default_companies:
+            cases.append({"id": q["id"], "company_id": company_id, "question": q["question"]})
+    return cases
+
+
+def load_bundles(path: str | None, company_ids: set[str], driver) -> dict[str, Any]:
+    if path and Path(path).exists():
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    bundles: dict[str, Any] = {}
+    for company_id in sorted(company_ids):
+        try:
+            bundles[company_id] = fetch_company_context(driver, company_id)
+        except ValueError:
+            bundles[company_id] = None
+    return bundles
+
+
+# --------------------------------
+# Run
+# --------------------------------
+
+def _percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(pct / 100.0 * (len(values) - 1)))))
+    return round(values[k], 2)
+
+
+def run_case(case: dict[str, str], bundles: dict[str, Any], contexts: dict[str, str], backend) -> dict[str, Any]:
+    bundle = bundles.get(case["company_id"])
+    result: dict[str, Any] = {**case}
+    if bundle is None:
+        return {**result, "ok": False, "error": "company_not_found"}
+
+    start = time.perf_counter()
+    try:
+        answer = answer_from_neo4j(
+            neo4j_driver=None,
+            company_id=case["company_id"],
+            question=case["question"],
+            backend=backend,
+            bundle=bundle,
+        )
+    except Exception as e:
+        return {**result, "ok": False, "error": str(e),
+                "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+    latency_ms = (time.perf_counter() - start) * 1000
+
+    meta = answer.get("meta") or {}
+    reply = answer.get("reply") or ""
+    ungrounded = ungrounded_numbers(reply, contexts[case["company_id"]])
+    return {
+        **result,
+        "ok": bool(meta.get("ok")),
+        "error": meta.get("error"),
+        "latency_ms": round(latency_ms, 2),
+        "prompt_tokens": meta.get("prompt_tokens"),
+        "completion_tokens": meta.get("completion_tokens"),
+        "grounded": not ungrounded,
+        "ungrounded_numbers": ungrounded,
+        "reply": reply,
+    }
+
+
+def summarize(results: list[dict[str, Any]], wall_s: float) -> dict[str, Any]:
+    ok = [r for r in results if r.get("ok")]
+    latencies = [r["latency_ms"] for r in ok]
+    prompt_tokens = sum(r.get("prompt_tokens") or 0 for r in ok)
+    completion_tokens = sum(r.get("completion_tokens") or 0 for r in ok)
+    return {
+        "cases": len(results),
+        "ok": len(ok),
+        "errors": len(results) - len(ok),
+        "grounded_rate": round(sum(1 for r in ok if r["grounded"]) / len(ok), 4) if ok else None,
+        "latency_ms_mean": round(sum(latencies) / len(latencies), 2) if latencies else None,
+        "latency_ms_p50": _percentile(latencies, 50),
+        "latency_ms_p90": _percentile(latencies, 90),
+        "latency_ms_p99": _percentile(latencies, 99),
+        "prompt_tokens_total": prompt_tokens,
+        "completion_tokens_total": completion_tokens,
+        "prompt_tokens_mean": round(prompt_tokens / len(ok), 1) if ok else None,
+        "wall_s": round(wall_s, 3),
+        "throughput_qps": round(len(results) / wall_s, 1) if wall_s > 0 else None,
+    }
+
+
+def compare(summary: dict[str, Any], baseline: dict[str, Any]) -> dict[str, Any]:
+    """Numeric deltas (current - baseline) for every shared summary field."""
+    out = {}
+    for k, v in summary.items():
+        b = baseline.get(k)
+        if isinstance(v, (int, float)) and isinstance(b, (int, float)):
+            out[k] = round(v - b, 4)
+    return out
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Evaluate FirmLens chat answers over a YAML question set.")
+    parser.add_argument("questions", help="YAML question set")
+    parser.add_argument("--companies", help="comma-separated company_ids (overrides the YAML list)")
+    parser.add_argument("--backend", help="LLM backend (groq | openai | stub); default FIRMLENS_LLM_BACKEND")
+    parser.add_argument("--model", help="model override for the backend")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--bundles", help="JSON file of prefetched context bundles (skips Neo4j)")
+    parser.add_argument("--dump-bundles", help="write the bundles used for this run to this JSON file")
+    parser.add_argument("--out", default="chat_eval_report.json")
+    parser.add_argument("--baseline", help="previous report to compare against")
+    args = parser.parse_args(argv)
+
+    spec = load_question_set(args.questions)
+    companies = [c.strip() for c in args.companies.split(",")] if args.companies else None
+    cases = build_cases(spec, companies)
+    if not cases:
+        print("❌ No questions/companies to evaluate")
+        return 1
+
+    driver = None
+    if not (args.bundles and Path(args.bundles).exists()):
+        from graph.neo4j_connection import Neo4jConnection
+
+        driver = Neo4jConnection(
+            _env("NEO4J_URI", "bolt://127.0.0.1:7687"),
+            _env("NEO4J_USER", "neo4j"),
+            _env("NEO4J_PASSWORD", "firmlens"),
+        )
+
+    try:
+        bundles = load_bundles(args.bundles, {c["company_id"] for c in cases}, driver.driver if driver else None)
+    finally:
+        if driver:
+            driver.close()
+
+    if args.dump_bundles:
+        with open(args.dump_bundles, "w", encoding="utf-8") as f:
+            json.dump(bundles, f, default=str)
+
+    contexts = {cid: _fmt_context(b) for cid, b in bundles.items() if b is not None}
+    backend = get_backend(args.backend, model=args.model)
+
+    print(f"🔄 Evaluating {len(cases)} cases with backend={backend.name} concurrency={args.concurrency}...")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+        results = list(pool.map(lambda c: run_case(c, bundles, contexts, backend), cases))
+    wall_s = time.perf_counter() - start
+
+    summary = summarize(results, wall_s)
+    report: dict[str, Any] = {
+        "run": {
+            "generated_at": datetime.utcnow().isoformat() + "Z",
+            "question_set": args.questions,
+            "question_set_sha256": spec["sha256"],
+            "backend": backend.name,
+            "model": backend.model,
+            "concurrency": args.concurrency,
+        },
+        "summary": summary,
+        "results": results,
+    }
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["delta_vs_baseline"] = compare(summary, json.load(f).get("summary") or {})
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+
+    print(f"✅ {summary['ok']}/{summary['cases']} ok in {summary['wall_s']}s "
+          f"(p50={summary['latency_ms_p50']}ms p99={summary['latency_ms_p99']}ms, "
+          f"grounded={summary['grounded_rate']})")
+    if "delta_vs_baseline" in report:
+        for k, v in report["delta_vs_baseline"].items():
+            if v:
+                print(f"   Δ {k}: {v:+}")
+    print(f"📄 Report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
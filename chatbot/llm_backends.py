@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+import requests
+
+# --------------------------------------------------
+# LLM backends
+#
+# Selected with FIRMLENS_LLM_BACKEND:
+#   groq   -> Groq cloud via langchain_groq (default)
+#   openai -> any OpenAI-compatible /chat/completions server (vLLM, llama.cpp, Ollama, ...)
+#   stub   -> deterministic offline echo of the context, for CI / perf runs
+# --------------------------------------------------
+
+
+def _env(name: str, default: str | None = None) -> str | None:
+    v = os.getenv(name)
+    if v is None or v.strip() == "":
+        return default
+    return v
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 chars per token) used when a backend reports no usage."""
+    if not text:
+        return 0
+    return max(1, (len(text) + 3) // 4)
+
+
+@dataclass
+class LLMResult:
+    reply: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+
+
+class LLMBackend(ABC):
+    """Minimal interface: one system prompt + one user message in, one reply out."""
+
+    name = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def missing_config(self) -> str | None:
+        """Return an error code if the backend cannot run, else None."""
+        return None
+
+    @abstractmethod
+    def generate(self, system: str, user: str) -> LLMResult:
+        ...
+
+
+class GroqBackend(LLMBackend):
+    name = "groq"
+
+    def __init__(self, model: str | None = None):
+        # User requested llama-8b-instruct; allow override via env later.
+        super().__init__(model or _env("GROQ_MODEL", "llama-8b-instruct") or "llama-8b-instruct")
+        self.api_key = _env("GROQ_API_KEY")
+        self.temperature = float(_env("GROQ_TEMPERATURE", "0") or "0")
+        self.max_tokens = int(_env("GROQ_MAX_TOKENS", "512") or "512")
+
+    def missing_config(self) -> str | None:
+        return None if self.api_key else "missing_groq_api_key"
+
+    def generate(self, system: str, user: str) -> LLMResult:
+        from langchain_groq import ChatGroq
+
+        llm = ChatGroq(
+            api_key=self.api_key,
+            model=self.model,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+        )
+        msg = llm.invoke([("system", system), ("human", user)])
+        reply = msg.content if isinstance(msg.content, str) else str(msg.content)
+
+        usage = getattr(msg, "usage_metadata", None) or {}
+        return LLMResult(
+            reply=reply,
+            model=self.model,
+            prompt_tokens=int(usage.get("input_tokens") or estimate_tokens(system + user)),
+            completion_tokens=int(usage.get("output_tokens") or estimate_tokens(reply)),
+        )
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    name = "openai"
+
+    def __init__(self, model: str | None = None):
+        super().__init__(model or _env("OPENAI_MODEL", "local-model") or "local-model")
+        self.base_url = (_env("OPENAI_BASE_URL", "http://127.0.0.1:8000/v1") or "").rstrip("/")
+        self.api_key = _env("OPENAI_API_KEY", "not-needed")
+        self.temperature = float(_env("OPENAI_TEMPERATURE", "0") or "0")
+        self.max_tokens = int(_env("OPENAI_MAX_TOKENS", "512") or "512")
+        self.timeout = float(_env("OPENAI_TIMEOUT", "60") or "60")
+
+    def missing_config(self) -> str | None:
+        return None if self.base_url else "missing_openai_base_url"
+
+    def generate(self, system: str, user: str) -> LLMResult:
+        response = requests.post(
+            f"{self.base_url}/chat/completions",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json={
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": user},
+                ],
+                "temperature": self.temperature,
+                "max_tokens": self.max_tokens,
+            },
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        reply = data["choices"][0]["message"]["content"] or ""
+        usage = data.get("usage") or {}
+        return LLMResult(
+            reply=reply,
+            model=data.get("model") or self.model,
+            prompt_tokens=int(usage.get("prompt_tokens") or estimate_tokens(system + user)),
+            completion_tokens=int(usage.get("completion_tokens") or estimate_tokens(reply)),
+        )
+
+
+_WORD = re.compile(r"[a-z0-9%]+")
+_STOPWORDS = {
+    "the", "a", "an", "and", "or", "of", "in", "on", "for", "to", "is", "was",
+    "what", "how", "did", "does", "do", "with", "about", "from", "its", "it",
+    "me", "show", "tell", "give", "company", "by", "at", "as", "be", "are",
+}
+
+
+class StubBackend(LLMBackend):
+    """
+    Deterministic, offline backend.
+    Replies with the context lines that best overlap the question, so every
+    number it cites is taken verbatim from the context.
+    Latency = STUB_LATENCY_MS + completion_tokens / STUB_TOKENS_PER_SEC.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        model: str | None = None,
+        *,
+        latency_ms: float | None = None,
+        tokens_per_sec: float | None = None,
+        max_lines: int = 3,
+    ):
+        super().__init__(model or "stub-echo")
+        self.latency_ms = float(latency_ms if latency_ms is not None else _env("STUB_LATENCY_MS", "0") or "0")
+        self.tokens_per_sec = float(
+            tokens_per_sec if tokens_per_sec is not None else _env("STUB_TOKENS_PER_SEC", "0") or "0"
+        )
+        self.max_lines = max_lines
+
+    def _pick_lines(self, user: str) -> list[str]:
+        context, _, question = user.partition("USER QUESTION:")
+        terms = {w for w in _WORD.findall(question.lower()) if w not in _STOPWORDS}
+        if not terms:
+            return []
+
+        scored = []
+        for i, line in enumerate(context.splitlines()):
+            line = line.strip()
+            if not line.startswith("-") and ":" not in line:
+                continue
+            score = len(terms & set(_WORD.findall(line.lower())))
+            if score:
+                scored.append((-score, i, line))
+        scored.sort()
+        return [line for _, _, line in scored[: self.max_lines]]
+
+    def generate(self, system: str, user: str) -> LLMResult:
+        lines = self._pick_lines(user)
+        if lines:
+            reply = "From the database:\n" + "\n".join(
+                line if line.startswith("-") else f"- {line}" for line in lines
+            )
+        else:
+            reply = "I don't have that in the database yet."
+
+        completion_tokens = estimate_tokens(reply)
+        delay = self.latency_ms / 1000.0
+        if self.tokens_per_sec > 0:
+            delay += completion_tokens / self.tokens_per_sec
+        if delay > 0:
+            time.sleep(delay)
+
+        return LLMResult(
+            reply=reply,
+            model=self.model,
+            prompt_tokens=estimate_tokens(system + user),
+            completion_tokens=completion_tokens,
+        )
+
+
+BACKENDS: dict[str, type[LLMBackend]] = {
+    GroqBackend.name: GroqBackend,
+    OpenAICompatibleBackend.name: OpenAICompatibleBackend,
+    StubBackend.name: StubBackend,
+}
+
+
+def get_backend(name: str | None = None, model: str | None = None) -> LLMBackend:
+    """
+    Build the backend named by `name` or FIRMLENS_LLM_BACKEND (default: groq).
+    Backends read their other settings from the environment; construct the
+    class directly for per-instance options (e.g. StubBackend(latency_ms=...)).
+    """
+    key = (name or _env("FIRMLENS_LLM_BACKEND", "groq") or "groq").strip().lower()
+    if key not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {key} (choose from {', '.join(sorted(BACKENDS))})")
+    return BACKENDS[key](model)
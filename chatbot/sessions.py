@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any
+
+# --------------------------------------------------
+# Server-side chat sessions
+#
+# Each session keeps:
+#   - the rendered grounding context + the company data_version it came from
+#   - a bounded window of recent turns (verbatim)
+#   - a rolling compact summary of older turns (one short line per turn)
+# so prompt size per turn is bounded instead of growing with turn count.
+# --------------------------------------------------
+
+
+def _env_int(name: str, default: int) -> int:
+    v = os.getenv(name)
+    return int(v) if v is not None and v.strip() != "" else default
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def _first_sentence(text: str) -> str:
+    text = " ".join((text or "").split())
+    for sep in (". ", "\n", "; "):
+        if sep in text:
+            return text.split(sep, 1)[0]
+    return text
+
+
+@dataclass
+class ChatSession:
+    session_id: str
+    company_ids: tuple[str, ...] = ()
+    context: str | None = None
+    context_version: tuple | None = None
+    context_loaded_at: float = 0.0
+    summary: deque = field(default_factory=deque)
+    recent: deque = field(default_factory=deque)
+    turns: int = 0
+    last_used: float = field(default_factory=time.time)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def reset(self, company_ids: tuple[str, ...]) -> None:
+        """Switching companies starts a fresh conversation."""
+        self.company_ids = company_ids
+        self.context = None
+        self.context_version = None
+        self.context_loaded_at = 0.0
+        self.summary.clear()
+        self.recent.clear()
+        self.turns = 0
+
+    def add_turn(self, question: str, reply: str, *, max_recent: int, max_summary_chars: int) -> None:
+        self.recent.append((question, reply))
+        self.turns += 1
+        while len(self.recent) > max_recent:
+            old_q, old_a = self.recent.popleft()
+            self.summary.append(f"- Q: {_clip(old_q, 120)} → A: {_clip(_first_sentence(old_a), 160)}")
+        while self.summary and sum(len(s) + 1 for s in self.summary) > max_summary_chars:
+            self.summary.popleft()
+
+    def history_text(self) -> str:
+        lines: list[str] = []
+        if self.summary:
+            lines.append("Earlier (summary):")
+            lines.extend(self.summary)
+        if self.recent:
+            lines.append("Recent turns:")
+            for q, a in self.recent:
+                lines.append(f"User: {q}")
+                lines.append(f"Assistant: {a}")
+        return "\n".join(lines) if lines else "(new conversation)"
+
+
+class SessionStore:
+    """Thread-safe in-memory LRU of chat sessions with idle expiry."""
+
+    def __init__(self, *, max_sessions: int | None = None, ttl_s: int | None = None):
+        self.max_sessions = max_sessions or _env_int("CHAT_SESSION_MAX", 1000)
+        self.ttl_s = ttl_s or _env_int("CHAT_SESSION_TTL_S", 1800)
+        self.max_recent = _env_int("CHAT_RECENT_TURNS", 4)
+        self.max_summary_chars = _env_int("CHAT_SUMMARY_CHARS", 1200)
+        self._lock = threading.Lock()
+        self._sessions: OrderedDict[str, ChatSession] = OrderedDict()
+
+    def _evict(self, now: float) -> None:
+        while self._sessions:
+            sid, s = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions or now - s.last_used > self.ttl_s:
+                del self._sessions[sid]
+            else:
+                break
+
+    def get_or_create(self, session_id: str | None) -> ChatSession:
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session = ChatSession(session_id=session_id or uuid.uuid4().hex)
+                self._sessions[session.session_id] = session
+            self._sessions.move_to_end(session.session_id)
+            session.last_used = now
+            self._evict(now)
+            return session
+
+    def drop(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"sessions": len(self._sessions), "max_sessions": self.max_sessions, "ttl_s": self.ttl_s}
+
+
+store = SessionStore()
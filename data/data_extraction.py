@@ -1,11 +1,33 @@
+import os
+import re
+
 import requests
 from bs4 import BeautifulSoup
 
-def fetch_soup(url: str) -> BeautifulSoup:
-    """Fetch the page and return a BeautifulSoup object."""
+SCREENER_URL = "https://www.screener.in/company/TATAELXSI/"
+
+# How many of the latest columns to keep (0 = everything the page shows)
+HISTORY_QUARTERS = int(os.getenv("FIRMLENS_HISTORY_QUARTERS") or 0)
+HISTORY_YEARS = int(os.getenv("FIRMLENS_HISTORY_YEARS") or 0)
+
+PERIOD_LABEL_RE = re.compile(r"^[A-Z][a-z]{2} \d{4}$")  # "Mar 2025"; skips "TTM"
+
+
+def _latest(indices: list[int], depth: int) -> list[int]:
+    return indices[-depth:] if depth else indices
+
+def fetch_html(url: str) -> str:
+    """Fetch the raw page HTML."""
     headers = {"User-Agent": "Mozilla/5.0"}
     response = requests.get(url, headers=headers)
-    return BeautifulSoup(response.text, "html.parser")
+    return response.text
+
+def parse_html(html: str) -> BeautifulSoup:
+    return BeautifulSoup(html, "html.parser")
+
+def fetch_soup(url: str) -> BeautifulSoup:
+    """Fetch the page and return a BeautifulSoup object."""
+    return parse_html(fetch_html(url))
 
 def get_company_name(soup: BeautifulSoup) -> str | None:
     """Extract company name from the page heading."""
@@ -145,18 +167,23 @@ def get_quarterly_pdf_sources(soup):
 
     return sources
 
-def get_quarterly_results(soup):
+def get_quarterly_results(soup, history=HISTORY_QUARTERS):
     quarters = get_quarter_labels(soup)
     financials = get_quarterly_financials(soup)
     pdf_sources = get_quarterly_pdf_sources(soup)
 
+    keep = _latest([i for i, q in enumerate(quarters) if PERIOD_LABEL_RE.match(q)], history)
+
+    def pick(values):
+        return [values[i] if i < len(values) else None for i in keep]
+
     return {
-        "quarters": quarters,
-        "metrics": financials,
-        "sources": pdf_sources
+        "quarters": [quarters[i] for i in keep],
+        "metrics": {name: pick(values) for name, values in financials.items()},
+        "sources": pick(pdf_sources)
     }
 
-def get_profit_and_loss(soup):
+def get_profit_and_loss(soup, history=HISTORY_YEARS):
     pl_data = {
         "years": [],
         "sales": [],
@@ -170,19 +197,16 @@ def get_profit_and_loss(soup):
     if not section:
         return pl_data
 
-    # --- Extract years (Mar 2022 → Mar 2025) ---
+    # --- Extract years (latest `history` fiscal years, TTM excluded) ---
     thead = section.find("thead")
     if not thead:
         return pl_data
 
     all_years = [th.get_text(strip=True) for th in thead.find_all("th")[1:]]
-    target_years = ["Mar 2022", "Mar 2023", "Mar 2024", "Mar 2025"]
-
-    year_indices = []
-    for i, year in enumerate(all_years):
-        if year in target_years:
-            pl_data["years"].append(year)
-            year_indices.append(i)
+    year_indices = _latest(
+        [i for i, year in enumerate(all_years) if PERIOD_LABEL_RE.match(year)], history
+    )
+    pl_data["years"] = [all_years[i] for i in year_indices]
 
     if not year_indices:
         return pl_data
@@ -200,7 +224,7 @@ def get_profit_and_loss(soup):
         metric_name = first_td.get_text(strip=True)
         values = [td.get_text(strip=True) for td in tr.find_all("td")[1:]]
 
-        selected_values = [values[i] for i in year_indices if i < len(values)]
+        selected_values = [values[i] if i < len(values) else None for i in year_indices]
 
         if "Sales" in metric_name:
             pl_data["sales"] = selected_values
@@ -216,17 +240,18 @@ def get_profit_and_loss(soup):
 
     return pl_data
 
-def extract_all():
-    url = "https://www.screener.in/company/TATAELXSI/"
-    soup = fetch_soup(url)
+def extract_all(url: str = SCREENER_URL, quarters: int = HISTORY_QUARTERS, years: int = HISTORY_YEARS,
+                soup: BeautifulSoup | None = None):
+    if soup is None:
+        soup = fetch_soup(url)
 
     company_name = get_company_name(soup)
     sector, industry = get_sector_and_industry(soup)
     market_cap, current_price = get_market_data(soup)
     description, sources = get_description_and_sources(soup)
 
-    quarterly = get_quarterly_results(soup)
-    pl = get_profit_and_loss(soup)
+    quarterly = get_quarterly_results(soup, quarters)
+    pl = get_profit_and_loss(soup, years)
 
     return {
         "company_name": company_name,
@@ -48,17 +48,87 @@ def fetch_company_news(
 
     return articles
 
-news = fetch_company_news(
-    company_name="Tata Elxsi",
-    api_key=API_KEY,
-    days=30,
-    page_size=5
-)
-
-for n in news:
-    print("\n---")
-    print("Title:", n["title"])
-    print("Source:", n["source"])
-    print("Date:", n["published_at"])
-    print("Summary:", n["summary"])
-    print("URL:", n["url"])
\ No newline at end of file
+
+def fetch_company_news_since(
+    company_name: str,
+    api_key: str,
+    since: str | None = None,
+    to: str | None = None,
+    days: int = 30,
+    page_size: int = 100,
+    max_pages: int = 5
+):
+    """
+    Fetch every article published between `since` and `to` (ISO timestamps,
+    inclusive; `to` open-ended when None), newest first, paging until a
+    short page, `max_pages`, or the plan's result limit.
+    Without `since`, falls back to the last `days` days.
+    Articles keep the raw `published_at` timestamp.
+
+    Returns (articles, complete). complete is False when paging stopped at
+    `max_pages` or NewsAPI's maximumResultsReached: older articles in the
+    window were not fetched, so callers must not treat the window as done.
+    """
+
+    base_url = "https://newsapi.org/v2/everything"
+
+    if since:
+        from_date = since
+    else:
+        from_date = (datetime.today() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+    articles = []
+
+    for page in range(1, max_pages + 1):
+        params = {
+            "q": company_name,
+            "from": from_date,
+            "language": "en",
+            "sortBy": "publishedAt",
+            "pageSize": page_size,
+            "page": page,
+            "apiKey": api_key
+        }
+        if to:
+            params["to"] = to
+
+        response = requests.get(base_url, params=params)
+        data = response.json()
+
+        if data.get("status") != "ok":
+            # Free/dev plans cap how deep paging may go; keep what was fetched
+            if data.get("code") == "maximumResultsReached" and articles:
+                return articles, False
+            raise Exception(f"NewsAPI error: {data}")
+
+        items = data.get("articles", [])
+        for item in items:
+            articles.append({
+                "title": item.get("title"),
+                "summary": item.get("description"),
+                "source": item.get("source", {}).get("name"),
+                "published_at": item.get("publishedAt"),
+                "url": item.get("url")
+            })
+
+        if len(items) < page_size or len(articles) >= data.get("totalResults", 0):
+            return articles, True
+
+    return articles, False
+
+
+if __name__ == "__main__":
+    news = fetch_company_news(
+        company_name="Tata Elxsi",
+        api_key=API_KEY,
+        days=30,
+        page_size=5
+    )
+
+    for n in news:
+        print("\n---")
+        print("Title:", n["title"])
+        print("Source:", n["source"])
+        print("Date:", n["published_at"])
+        print("Summary:", n["summary"])
+        print("URL:", n["url"])
\ No newline at end of file
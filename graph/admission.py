@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any
+
+# --------------------------------------------------
+# Admission control / load shedding
+#
+# A pool admits at most `capacity` requests at a time. Beyond that a request
+# waits in a short queue for at most `max_wait_s`; freed slots are handed
+# out round-robin across clients (one queued request per client per turn),
+# so one client bursting cannot starve the others. Requests that cannot be
+# queued are rejected immediately instead of piling up on worker threads:
+#
+#   429  the client already has `client_queue` requests waiting
+#   503  the pool's queue is full, or the wait timed out
+#
+# Both carry a Retry-After estimate from the pool's recent service times.
+#
+# Route groups get separate pools (see app.py): slow LLM chat calls can only
+# ever occupy the chat pool's slots + queue, leaving the rest of the worker
+# threads to the dashboard pool. Size the chat pool so that
+# capacity + queue stays below the server's worker threads.
+# --------------------------------------------------
+
+
+def _env_int(name: str, default: int) -> int:
+    v = os.getenv(name)
+    return int(v) if v is not None and v.strip() != "" else default
+
+
+def _env_float(name: str, default: float) -> float:
+    v = os.getenv(name)
+    return float(v) if v is not None and v.strip() != "" else default
+
+
+class Rejected(Exception):
+    def __init__(self, status: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    __slots__ = ("client", "granted", "event", "started")
+
+    def __init__(self, client: str):
+        self.client = client
+        self.granted = False
+        self.event = threading.Event()
+        self.started = 0.0
+
+
+class AdmissionPool:
+    def __init__(self, name: str, capacity: int, queue: int, max_wait_s: float, client_queue: int):
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.queue = max(0, queue)
+        self.max_wait_s = max_wait_s
+        self.client_queue = max(1, client_queue)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiting: OrderedDict[str, deque[_Ticket]] = OrderedDict()
+        self._queued = 0
+        self._service_s = 1.0  # EWMA of admitted request duration
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected_429 = 0
+        self.rejected_503 = 0
+        self.timed_out = 0
+
+    def _retry_after(self) -> int:
+        # Time for the current queue to drain through the pool's slots
+        backlog = (self._queued + 1) / self.capacity
+        return min(60, max(1, math.ceil(self._service_s * backlog)))
+
+    def _reject(self, status: int, reason: str) -> Rejected:
+        if status == 429:
+            self.rejected_429 += 1
+        else:
+            self.rejected_503 += 1
+        return Rejected(status, reason, self._retry_after())
+
+    def acquire(self, client: str) -> _Ticket:
+        """A granted ticket, or raises Rejected. Pair with release()."""
+        ticket = _Ticket(client)
+        with self._lock:
+            if self._active < self.capacity and not self._queued:
+                self._active += 1
+                self.admitted += 1
+                ticket.granted = True
+                ticket.started = time.monotonic()
+                return ticket
+            mine = self._waiting.get(client)
+            if mine is not None and len(mine) >= self.client_queue:
+                raise self._reject(429, "too many concurrent requests from this client")
+            if self._queued >= self.queue:
+                raise self._reject(503, f"{self.name} is at capacity")
+            self._waiting.setdefault(client, deque()).append(ticket)
+            self._queued += 1
+            self.queued_total += 1
+
+        ticket.event.wait(self.max_wait_s)
+        with self._lock:
+            if not ticket.granted:
+                # Timed out: leave the queue (the slot may be granted later to others)
+                mine = self._waiting.get(client)
+                if mine is not None and ticket in mine:
+                    mine.remove(ticket)
+                    self._queued -= 1
+                    if not mine:
+                        del self._waiting[client]
+                self.timed_out += 1
+                raise self._reject(503, f"{self.name} is busy, timed out waiting")
+            self.admitted += 1
+            return ticket
+
+    def release(self, ticket: _Ticket) -> None:
+        with self._lock:
+            elapsed = time.monotonic() - ticket.started
+            self._service_s = 0.8 * self._service_s + 0.2 * elapsed
+            if not self._waiting:
+                self._active -= 1
+                return
+            # Hand the slot to the next client in round-robin order
+            client, mine = next(iter(self._waiting.items()))
+            nxt = mine.popleft()
+            if mine:
+                self._waiting.move_to_end(client)
+            else:
+                del self._waiting[client]
+            self._queued -= 1
+            nxt.granted = True
+            nxt.started = time.monotonic()
+            nxt.event.set()
+
+    @contextmanager
+    def admit(self, client: str):
+        ticket = self.acquire(client)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "queue": self.queue,
+                "active": self._active,
+                "queued": self._queued,
+                "waiting_clients": len(self._waiting),
+                "admitted": self.admitted,
+                "queued_total": self.queued_total,
+                "rejected_429": self.rejected_429,
+                "rejected_503": self.rejected_503,
+                "timed_out": self.timed_out,
+                "avg_service_s": round(self._service_s, 3),
+            }
+
+
+def pool_from_env(name: str, capacity: int, queue: int, max_wait_s: float, client_queue: int) -> AdmissionPool:
+    """Pool sized by FIRMLENS_<NAME>_CONCURRENCY / _QUEUE / _QUEUE_WAIT_S / _CLIENT_QUEUE."""
+    prefix = f"FIRMLENS_{name.upper()}"
+    return AdmissionPool(
+        name,
+        capacity=_env_int(f"{prefix}_CONCURRENCY", capacity),
+        queue=_env_int(f"{prefix}_QUEUE", queue),
+        max_wait_s=_env_float(f"{prefix}_QUEUE_WAIT_S", max_wait_s),
+        client_queue=_env_int(f"{prefix}_CLIENT_QUEUE", client_queue),
+    )
@@ -0,0 +1,370 @@
+"""
+Bulk initial load: normalized payloads -> node / relationship CSVs.
+
+    python graph/bulk_import.py --universe universe.json --out import/
+    neo4j-admin database import full neo4j <flags printed by the command>
+      (or: cat import/load_csv.cypher | cypher-shell, with the CSVs in Neo4j's import dir)
+    python graph/bulk_import.py --finalize
+
+Seeding an empty database this way skips the per-row MERGEs of
+graph/ingestion.py. IDs are derived from natural keys, so the same
+company / period / article always gets the same ID across runs:
+
+    Company          company_id
+    FinancialPeriod  <company_id>|<period_type>|<period_end>
+    FinancialMetrics M|<company_id>|<period_type>|<period_end>
+    MetricSeries     S|<company_id>|<period_type>        (series storage mode)
+    News             news_id (md5 of the URL)
+
+Nodes carry the same properties as the incremental ingestion writes, so
+later runs of ingestion.py / refresh_scheduler.py MERGE onto them.
+--finalize does the graph-side steps the CSVs can't express: indexes,
+ABOUT_PERIOD links, data_version stamps, peer aggregates, the dashboard
+snapshot. News watermarks are not advanced; the next incremental run
+refetches its window and skips articles that are already linked.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from data.data_extraction import SCREENER_URL
+from graph.series_store import NUMBER_FIELDS, rows_to_arrays, writes_graph, writes_series
+from normalizations.derived_metrics import attach_derived
+from normalizations.normalize_news import normalize_news
+from normalizations.normalize_numbers import normalize
+
+ARRAY_DELIMITER = ";"
+CHUNK = 100  # companies normalized (and derived) together
+
+# file -> (label, id column, [(property, type)])
+NODE_FILES = {
+    "companies.csv": ("Company", "company_id:ID(Company)", [
+        ("name", "string"), ("sector", "string"), ("industry", "string"),
+        ("market_cap_cr", "double"), ("current_price", "double"),  # may carry decimals
+        ("description", "string"), ("description_sources", "string[]"),
+        ("data_version", "string"),
+    ]),
+    "periods.csv": ("FinancialPeriod", ":ID(FinancialPeriod)", [
+        ("company_id", "string"), ("period_end", "string"),
+        ("period_type", "string"), ("label", "string"), ("raw_hash", "string"),
+    ]),
+    "metrics.csv": ("FinancialMetrics", ":ID(FinancialMetrics)", [
+        *[(f, "double") for f in NUMBER_FIELDS],  # may carry decimals (table_parser)
+        ("source_url", "string"), ("ingested_at", "string"),
+    ]),
+    "series.csv": ("MetricSeries", ":ID(MetricSeries)", [
+        ("company_id", "string"), ("period_type", "string"), ("period_end", "string[]"),
+        *[(f, "double[]") for f in NUMBER_FIELDS],
+        ("label", "string[]"), ("source_url", "string[]"), ("raw_hash", "string[]"),
+    ]),
+    "news.csv": ("News", "news_id:ID(News)", [
+        ("title", "string"), ("summary", "string"), ("source", "string"),
+        ("published_at", "string"), ("url", "string"),
+        ("event_type", "string"), ("event_types", "string[]"), ("event_scores", "double[]"),
+        ("time_context", "string"), ("context_period_end", "string"),
+        ("duplicate_count", "long"),
+        ("duplicate_sources", "string[]"), ("duplicate_urls", "string[]"),
+    ]),
+}
+
+# file -> (type, start label, end label)
+REL_FILES = {
+    "has_period.csv": ("HAS_PERIOD", "Company", "FinancialPeriod"),
+    "has_metrics.csv": ("HAS_METRICS", "FinancialPeriod", "FinancialMetrics"),
+    "has_series.csv": ("HAS_SERIES", "Company", "MetricSeries"),
+    "mentioned_in.csv": ("MENTIONED_IN", "Company", "News"),
+}
+
+
+def period_id(company_id, period_type, period_end):
+    return f"{company_id}|{period_type}|{period_end}"
+
+
+def _element(v):
+    if isinstance(v, float) and math.isnan(v):
+        return "NaN"  # the spelling both importers parse
+    return str(v).replace(ARRAY_DELIMITER, ",")
+
+
+def _cell(value, typ):
+    if value is None:
+        return ""
+    if typ.endswith("[]"):
+        return ARRAY_DELIMITER.join(_element(v) for v in value)
+    return value
+
+
+class CsvWriter:
+    """One open csv.writer per file; rows are streamed, nothing is buffered."""
+
+    def __init__(self, out_dir, files):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self._files = {}
+        self._writers = {}
+        self.counts = {}
+        for name in files:
+            f = open(self.out_dir / name, "w", newline="", encoding="utf-8")
+            self._files[name] = f
+            self._writers[name] = csv.writer(f)
+            self.counts[name] = 0
+        for name, (_, id_col, props) in NODE_FILES.items():
+            if name in self._writers:
+                self._writers[name].writerow([id_col] + [f"{p}:{t}" for p, t in props])
+        for name, (_, start, end) in REL_FILES.items():
+            if name in self._writers:
+                self._writers[name].writerow([f":START_ID({start})", f":END_ID({end})"])
+
+    def node(self, name, node_id, values):
+        _, _, props = NODE_FILES[name]
+        self._writers[name].writerow([node_id] + [_cell(values.get(p), t) for p, t in props])
+        self.counts[name] += 1
+
+    def rel(self, name, start, end):
+        self._writers[name].writerow([start, end])
+        self.counts[name] += 1
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+
+
+def write_company(w, payload, news, version, seen_news):
+    company = payload["company"]
+    cid = company["company_id"]
+    w.node("companies.csv", cid, {**company, "data_version": version})
+
+    periods = payload["quarterly_financials"] + payload["annual_financials"]
+    if writes_graph():
+        for r in periods:
+            pid = period_id(cid, r["period_type"], r["period_end"])
+            w.node("periods.csv", pid, {**r, "company_id": cid})
+            w.node("metrics.csv", "M|" + pid, {**r, **(r.get("derived") or {}), "ingested_at": version})
+            w.rel("has_period.csv", cid, pid)
+            w.rel("has_metrics.csv", pid, "M|" + pid)
+
+    if writes_series():
+        for period_type, rows in (("quarter", payload["quarterly_financials"]),
+                                  ("year", payload["annual_financials"])):
+            sid = f"S|{cid}|{period_type}"
+            w.node("series.csv", sid, {"company_id": cid, "period_type": period_type,
+                                       **rows_to_arrays(rows)})
+            w.rel("has_series.csv", cid, sid)
+
+    for n in news:
+        if n["news_id"] not in seen_news:
+            seen_news.add(n["news_id"])
+            w.node("news.csv", n["news_id"], n)
+        w.rel("mentioned_in.csv", cid, n["news_id"])
+
+
+def _files():
+    files = ["companies.csv", "news.csv", "mentioned_in.csv"]
+    if writes_graph():
+        files += ["periods.csv", "metrics.csv", "has_period.csv", "has_metrics.csv"]
+    if writes_series():
+        files += ["series.csv", "has_series.csv"]
+    return files
+
+
+def export_csv(universe, out_dir, *, with_news=True):
+    files = _files()
+    w = CsvWriter(out_dir, files)
+    version = datetime.utcnow().isoformat() + "Z"
+    seen_news = set()
+    try:
+        for start in range(0, len(universe), CHUNK):
+            chunk = universe[start:start + CHUNK]
+            payloads = []
+            for entry in chunk:
+                try:
+                    payloads.append((entry, normalize(entry.get("screener_url") or SCREENER_URL)))
+                except Exception as e:
+                    print(f"  ❌ {entry.get('company_id') or entry.get('screener_url')}: {e}")
+            attach_derived([p for _, p in payloads])
+
+            for entry, payload in payloads:
+                cid = payload["company"]["company_id"]
+                news = []
+                if with_news:
+                    news, _ = normalize_news(
+                        company_name=entry.get("news_query") or payload["company"]["name"],
+                        company_id=cid, incremental=False,
+                    )
+                write_company(w, payload, news, version, seen_news)
+                print(f"  → {cid}: {len(payload['quarterly_financials'])}q / "
+                      f"{len(payload['annual_financials'])}y / {len(news)} news")
+    finally:
+        w.close()
+
+    write_load_csv_script(out_dir, files)
+    return w.counts
+
+
+# --------------------------------------------------
+# Import instructions
+# --------------------------------------------------
+
+# How LOAD CSV finds nodes again when creating relationships
+_MATCH_KEY = {"Company": "company_id", "News": "news_id"}
+
+
+def admin_import_command(out_dir, files, database="neo4j"):
+    parts = [f"neo4j-admin database import full {database}"]
+    for name in files:
+        if name in NODE_FILES:
+            parts.append(f"--nodes={NODE_FILES[name][0]}={Path(out_dir) / name}")
+    for name in files:
+        if name in REL_FILES:
+            parts.append(f"--relationships={REL_FILES[name][0]}={Path(out_dir) / name}")
+    parts.append(f'--array-delimiter="{ARRAY_DELIMITER}"')
+    return " \\\n    ".join(parts)
+
+
+def _convert(column, typ):
+    ref = f"row.`{column}`"
+    if typ == "long":
+        return f"toInteger({ref})"
+    if typ == "double":
+        return f"toFloat({ref})"
+    if typ == "string[]":
+        return f"split({ref}, '{ARRAY_DELIMITER}')"
+    if typ == "double[]":
+        return f"[x IN split({ref}, '{ARRAY_DELIMITER}') | toFloat(x)]"
+    return ref
+
+
+def write_load_csv_script(out_dir, files):
+    """Equivalent LOAD CSV script (CSVs must sit in Neo4j's import directory)."""
+    lines = ["// Generated by graph/bulk_import.py; expects an empty database.", ""]
+    temp_labels = [
+        NODE_FILES[n][0] for n in files
+        if n in NODE_FILES and NODE_FILES[n][0] not in _MATCH_KEY
+    ]
+    for label in ["Company", "News"]:
+        key = _MATCH_KEY[label]
+        lines.append(f"CREATE INDEX IF NOT EXISTS FOR (n:{label}) ON (n.{key});")
+    for label in temp_labels:
+        lines.append(f"CREATE INDEX import_{label.lower()} IF NOT EXISTS FOR (n:{label}) ON (n.import_id);")
+    lines.append("")
+
+    for name in files:
+        if name not in NODE_FILES:
+            continue
+        label, id_col, props = NODE_FILES[name]
+        key = _MATCH_KEY.get(label, "import_id")
+        assignments = [f"{key}: row.`{id_col}`"] + [
+            f"{p}: {_convert(f'{p}:{t}', t)}" for p, t in props
+        ]
+        lines.append(f"LOAD CSV WITH HEADERS FROM 'file:///{name}' AS row")
+        lines.append("CALL { WITH row CREATE (:" + label + " {" + ", ".join(assignments) + "}) }")
+        lines.append("IN TRANSACTIONS OF 10000 ROWS;")
+        lines.append("")
+
+    for name in files:
+        if name not in REL_FILES:
+            continue
+        rel_type, start, end = REL_FILES[name]
+        start_key = _MATCH_KEY.get(start, "import_id")
+        end_key = _MATCH_KEY.get(end, "import_id")
+        lines.append(f"LOAD CSV WITH HEADERS FROM 'file:///{name}' AS row")
+        lines.append(
+            f"CALL {{ WITH row MATCH (a:{start} {{{start_key}: row.`:START_ID({start})`}}) "
+            f"MATCH (b:{end} {{{end_key}: row.`:END_ID({end})`}}) CREATE (a)-[:{rel_type}]->(b) }}"
+        )
+        lines.append("IN TRANSACTIONS OF 10000 ROWS;")
+        lines.append("")
+
+    for label in temp_labels:
+        lines.append(f"MATCH (n:{label}) CALL {{ WITH n REMOVE n.import_id }} IN TRANSACTIONS OF 10000 ROWS;")
+        lines.append(f"DROP INDEX import_{label.lower()} IF EXISTS;")
+
+    (Path(out_dir) / "load_csv.cypher").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+# --------------------------------------------------
+# Post-import
+# --------------------------------------------------
+
+def finalize(driver, company_ids=None):
+    """
+    Graph-side steps after the import tool ran (indexes, links, search
+    fields, aggregates, snapshot) for the given companies, or every company
+    in the graph.
+    """
+    from graph.ingestion import ensure_indexes, link_news_to_periods
+    from graph.news_search import refresh_search_fields
+    from graph.peer_aggregates import refresh_peer_aggregates
+    from graph.read_model import publish_snapshot
+
+    with driver.driver.session() as session:
+        ensure_indexes(session)
+        if not company_ids:
+            company_ids = [r["company_id"] for r in session.run(
+                "MATCH (c:Company) RETURN c.company_id AS company_id")]
+        for cid in company_ids:
+            session.execute_write(link_news_to_periods, cid)
+            session.execute_write(refresh_search_fields, cid)
+            session.execute_write(refresh_peer_aggregates, cid)
+        snapshot = publish_snapshot(session)
+    return {"companies": len(company_ids), **snapshot}
+
+
+def _load_universe(path):
+    if not path:
+        return [{"company_id": "TATA_ELXSI", "screener_url": SCREENER_URL, "news_query": "Tata Elxsi"}]
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk CSV export for neo4j-admin import / LOAD CSV")
+    parser.add_argument("--universe", help="JSON list of companies (same format as refresh_scheduler)")
+    parser.add_argument("--out", default="import", help="Output directory for the CSVs")
+    parser.add_argument("--no-news", action="store_true", help="Skip NewsAPI fetches")
+    parser.add_argument("--finalize", action="store_true",
+                        help="After the import: indexes, ABOUT_PERIOD links, aggregates, snapshot")
+    args = parser.parse_args()
+
+    if args.finalize:
+        from graph.neo4j_connection import Neo4jConnection
+
+        conn = Neo4jConnection(
+            os.getenv("NEO4J_URI", "bolt://127.0.0.1:7687"),
+            os.getenv("NEO4J_USER", "neo4j"),
+            os.getenv("NEO4J_PASSWORD", "firmlens"),
+        )
+        try:
+            print("🔄 Finalizing imported graph...")
+            stats = finalize(conn)
+        finally:
+            conn.close()
+        print(f"✅ Finalized {stats['companies']} companies; snapshot {stats['path']}")
+        return
+
+    universe = _load_universe(args.universe)
+    start = time.perf_counter()
+    print(f"🔄 Writing bulk CSVs for {len(universe)} companies to {args.out}...")
+    counts = export_csv(universe, args.out, with_news=not args.no_news)
+    print(f"\n✅ Done in {time.perf_counter() - start:.1f}s")
+    for name, n in counts.items():
+        print(f"   {name:<20} {n:>9} rows")
+    print("\nImport into an EMPTY database with:\n")
+    print("  " + admin_import_command(args.out, list(counts)))
+    print(f"\nor run {Path(args.out) / 'load_csv.cypher'} with the CSVs in Neo4j's import directory,")
+    print("then: python graph/bulk_import.py --finalize")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+News-event impact analytics (whole universe, vectorized).
+
+    python graph/event_impact.py
+    python graph/event_impact.py --min-articles 1 --dry-run
+
+For every company, quarters are laid out on the shared period grid of
+normalizations/derived_metrics.py and news is bucketed into the quarter it
+was published in, per event_type (an article counts once per event type
+it carries, weighted by 1 + duplicate_count, i.e. syndicated coverage). A
+quarter with at least --min-articles such articles is a news cluster.
+
+The response to a cluster is the change into the following quarter:
+
+    sales, net_profit   QoQ growth %    (x[t+1] / x[t] - 1) * 100
+    opm_percent         QoQ delta, percentage points
+
+and is compared with the company's baseline (the mean change over all of
+its quarters), so `excess` is what is unusual after that kind of news.
+Results are stored as one node per (company, event_type):
+
+    (:Company)-[:HAS_EVENT_IMPACT]->(:EventImpact {company_id, event_type,
+        clusters, articles, sales_after, sales_baseline, sales_excess,
+        sales_hit_rate, opm_..., net_profit_..., universe_sales_excess, ...})
+
+universe_* fields are the same excess pooled over every company, for
+comparison. Served by /api/company/<id>/event-impact and added to the
+chatbot context (format_event_impact). This is correlation over few
+quarters, not causation; `clusters` says how much evidence there is.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from graph.neo4j_connection import Neo4jConnection
+from graph.series_store import read_series_many, reads_series
+from normalizations.derived_metrics import _growth, _period_key, _shift, build_panel
+
+# metric -> (field, unit); growth for flows, percentage-point delta for margins
+IMPACT_METRICS = {
+    "sales": ("sales", "pct"),
+    "opm": ("opm_percent", "pp"),
+    "net_profit": ("net_profit", "pct"),
+}
+MIN_CLUSTER_ARTICLES = 2
+
+
+# --------------------------------------------------
+# Graph reads
+# --------------------------------------------------
+
+def _quarter_rows(session, company_ids):
+    """company_id -> [{period_end, sales, opm_percent, net_profit}]"""
+    fields = [field for field, _ in IMPACT_METRICS.values()]
+    if reads_series():
+        return read_series_many(session, company_ids, "quarter", fields=fields)
+
+    result = session.run("""
+        UNWIND $company_ids AS cid
+        MATCH (:Company {company_id: cid})-[:HAS_PERIOD]->(p:FinancialPeriod {period_type: "quarter"})
+              -[:HAS_METRICS]->(m:FinancialMetrics)
+        RETURN cid, p.period_end AS period_end,
+               m.sales AS sales, m.opm_percent AS opm_percent, m.net_profit AS net_profit
+    """, {"company_ids": company_ids})
+    out = {cid: [] for cid in company_ids}
+    for r in result:
+        out[r["cid"]].append(dict(r))
+    return out
+
+
+def _news_events(session, company_ids):
+    """[(company_id, published_at, event_types, weight)]"""
+    result = session.run("""
+        UNWIND $company_ids AS cid
+        MATCH (:Company {company_id: cid})-[:MENTIONED_IN]->(n:News)
+        WHERE n.published_at IS NOT NULL
+        RETURN cid, n.published_at AS published_at,
+               CASE WHEN size(coalesce(n.event_types, [])) > 0 THEN n.event_types
+                    ELSE [coalesce(n.event_type, "general")] END AS event_types,
+               1 + coalesce(n.duplicate_count, 0) AS weight
+    """, {"company_ids": company_ids})
+    return [(r["cid"], r["published_at"], r["event_types"], r["weight"]) for r in result]
+
+
+# --------------------------------------------------
+# Compute
+# --------------------------------------------------
+
+def _responses(panel):
+    """metric -> (C, T) change from quarter t into t+1 (NaN where unknown)."""
+    out = {}
+    for name, (field, unit) in IMPACT_METRICS.items():
+        x = panel.values[field]
+        change = _growth(x, 1) if unit == "pct" else x - _shift(x, 1)
+        # Align the change into t+1 with quarter t
+        following = np.full_like(change, np.nan)
+        following[:, :-1] = change[:, 1:]
+        out[name] = following
+    return out
+
+
+def _event_counts(panel, events):
+    """event_type -> (C, T) weighted article counts per company and quarter."""
+    row = {cid: i for i, cid in enumerate(panel.company_ids)}
+    first = int(panel.period_keys[0]) if len(panel.period_keys) else 0
+    n_periods = len(panel.period_keys)
+
+    by_type = {}
+    for cid, published_at, event_types, weight in events:
+        col = _period_key(str(published_at)[:10], "quarter") - first
+        if cid not in row or not 0 <= col < n_periods:
+            continue
+        for event_type in set(event_types):
+            idx = by_type.setdefault(event_type, ([], [], []))
+            idx[0].append(row[cid])
+            idx[1].append(col)
+            idx[2].append(weight)
+
+    counts = {}
+    for event_type, (rows, cols, weights) in by_type.items():
+        c = np.zeros((len(panel.company_ids), n_periods))
+        np.add.at(c, (np.array(rows), np.array(cols)), np.array(weights, dtype=float))
+        counts[event_type] = c
+    return counts
+
+
+def _nanmean(x, mask, axis=None):
+    """Mean of x where mask and x is finite; NaN when there is nothing."""
+    valid = mask & np.isfinite(x)
+    n = valid.sum(axis=axis)
+    total = np.where(valid, x, 0.0).sum(axis=axis)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(n > 0, total / n, np.nan), n
+
+
+def compute_event_impact(rows_by_company: dict, events: list, min_articles=MIN_CLUSTER_ARTICLES) -> list[dict]:
+    """One row per (company, event_type) with at least one usable cluster."""
+    panel = build_panel(rows_by_company, "quarter")
+    if not len(panel.period_keys):
+        return []
+    responses = _responses(panel)
+    everywhere = np.ones_like(next(iter(responses.values())), dtype=bool)
+    baselines = {name: _nanmean(r, everywhere, axis=1)[0] for name, r in responses.items()}
+
+    rows = []
+    for event_type, counts in sorted(_event_counts(panel, events).items()):
+        clustered = counts >= min_articles
+        stats = {}
+        for name, r in responses.items():
+            after, n = _nanmean(r, clustered, axis=1)
+            excess = after - baselines[name]
+            hits, _ = _nanmean((r > baselines[name][:, None]).astype(float), clustered & np.isfinite(r), axis=1)
+            # Pooled over every company: each cluster's change vs its own baseline
+            pooled, _ = _nanmean(r - baselines[name][:, None], clustered)
+            stats[name] = (after, excess, hits, n, pooled)
+
+        usable = np.zeros(len(panel.company_ids), dtype=int)
+        for _, _, _, n, _ in stats.values():
+            usable = np.maximum(usable, n)
+        articles = np.where(clustered, counts, 0).sum(axis=1)
+
+        for ci, cid in enumerate(panel.company_ids):
+            if not usable[ci]:
+                continue
+            row = {
+                "company_id": cid,
+                "event_type": event_type,
+                "clusters": int(usable[ci]),
+                "articles": int(articles[ci]),
+            }
+            for name, (after, excess, hits, _, pooled) in stats.items():
+                row[f"{name}_after"] = _round(after[ci])
+                row[f"{name}_baseline"] = _round(baselines[name][ci])
+                row[f"{name}_excess"] = _round(excess[ci])
+                row[f"{name}_hit_rate"] = _round(hits[ci])
+                row[f"universe_{name}_excess"] = _round(pooled)
+            rows.append(row)
+    return rows
+
+
+def _round(v):
+    v = float(v)
+    return None if np.isnan(v) else round(v, 2)
+
+
+# --------------------------------------------------
+# Graph writes / reads
+# --------------------------------------------------
+
+def store_event_impact(tx, rows, company_ids, computed_at):
+    """Replace the EventImpact nodes of `company_ids` with `rows`."""
+    tx.run("""
+        UNWIND $rows AS row
+        MATCH (c:Company {company_id: row.company_id})
+        MERGE (e:EventImpact {company_id: row.company_id, event_type: row.event_type})
+        SET e = row, e.computed_at = $computed_at
+        MERGE (c)-[:HAS_EVENT_IMPACT]->(e)
+    """, {"rows": rows, "computed_at": computed_at})
+    keep = [f"{r['company_id']}|{r['event_type']}" for r in rows]
+    tx.run("""
+        MATCH (e:EventImpact)
+        WHERE e.company_id IN $company_ids AND NOT e.company_id + "|" + e.event_type IN $keep
+        DETACH DELETE e
+    """, {"company_ids": company_ids, "keep": keep})
+
+
+def run_event_impact(session, min_articles=MIN_CLUSTER_ARTICLES, dry_run=False):
+    company_ids = [r["company_id"] for r in session.run("MATCH (c:Company) RETURN c.company_id AS company_id")]
+    rows = compute_event_impact(
+        _quarter_rows(session, company_ids), _news_events(session, company_ids), min_articles
+    )
+    if not dry_run:
+        session.execute_write(
+            store_event_impact, rows, company_ids, datetime.utcnow().isoformat() + "Z"
+        )
+    return {"companies": len(company_ids), "rows": rows}
+
+
+def read_event_impact(session, company_id):
+    """Stored rows for one company, best-evidenced event types first."""
+    return [
+        dict(r["e"])
+        for r in session.run("""
+            MATCH (:Company {company_id: $company_id})-[:HAS_EVENT_IMPACT]->(e:EventImpact)
+            RETURN e
+            ORDER BY e.clusters DESC, e.articles DESC
+        """, {"company_id": company_id})
+    ]
+
+
+def _signed(v, unit):
+    if v is None:
+        return "n/a"
+    return f"{v:+.1f}{'%' if unit == 'pct' else 'pp'}"
+
+
+def format_event_impact(rows) -> str:
+    """Compact lines for the chatbot context."""
+    lines = []
+    for r in rows:
+        parts = [
+            f"{name} {_signed(r.get(f'{name}_excess'), unit)} vs usual "
+            f"(universe {_signed(r.get(f'universe_{name}_excess'), unit)})"
+            for name, (_, unit) in IMPACT_METRICS.items()
+        ]
+        lines.append(
+            f"- {r['event_type']}: {r['clusters']} news quarters ({r['articles']} articles); "
+            f"next quarter " + ", ".join(parts)
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute news-event impact analytics for every company")
+    parser.add_argument("--min-articles", type=int, default=MIN_CLUSTER_ARTICLES,
+                        help="Weighted articles of one event type that make a quarter a news cluster")
+    parser.add_argument("--dry-run", action="store_true", help="Compute and print, store nothing")
+    args = parser.parse_args()
+
+    conn = Neo4jConnection(
+        os.getenv("NEO4J_URI", "bolt://127.0.0.1:7687"),
+        os.getenv("NEO4J_USER", "neo4j"),
+        os.getenv("NEO4J_PASSWORD", "firmlens"),
+    )
+    try:
+        print("🔄 Computing event impact...")
+        with conn.driver.session() as session:
+            result = run_event_impact(session, args.min_articles, args.dry_run)
+    finally:
+        conn.close()
+
+    by_company = {}
+    for r in result["rows"]:
+        by_company.setdefault(r["company_id"], []).append(r)
+    for cid, rows in sorted(by_company.items()):
+        print(f"\n{cid}\n{format_event_impact(rows)}")
+    verb = "computed" if args.dry_run else "stored"
+    print(f"\n✅ {len(result['rows'])} event impact rows {verb} for {result['companies']} companies")
+
+
+if __name__ == "__main__":
+    main()
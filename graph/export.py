@@ -0,0 +1,267 @@
+"""
+Columnar export of the financial universe (needs pyarrow).
+
+    python graph/export.py --out exports
+    python graph/export.py --out exports --full --batch-size 500
+
+Writes hive-partitioned Parquet, one partition per company, so a changed
+company is replaced without touching the rest:
+
+    exports/
+      companies/company_id=TATA_ELXSI/part-0.parquet
+      financials/company_id=TATA_ELXSI/part-0.parquet   (quarter + year rows)
+      news/company_id=TATA_ELXSI/part-0.parquet
+      _export_state.json                                 company_id -> data_version
+
+Read it back with e.g. pyarrow.dataset.dataset("exports/financials",
+partitioning="hive") or pandas.read_parquet("exports/financials").
+
+Companies are paged by company_id and exported --batch-size at a time, so
+memory stays bounded by one batch whatever the universe size. Without
+--full only companies whose data_version differs from the last export (or
+that have no data_version) are written; partitions of companies no longer
+in the graph are removed.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from graph.neo4j_connection import Neo4jConnection
+from graph.series_store import NUMBER_FIELDS, read_series_many, reads_series
+
+STATE_FILE = "_export_state.json"
+DATASETS = ["companies", "financials", "news"]
+
+COMPANY_COLUMNS = {
+    "name": "string", "sector": "string", "industry": "string",
+    "market_cap_cr": "float64", "current_price": "float64",
+    "description": "string", "data_version": "string",
+}
+FINANCIAL_COLUMNS = {
+    "period_type": "string", "period_end": "string", "label": "string", "source_url": "string",
+    **{f: "float64" for f in NUMBER_FIELDS},
+}
+NEWS_COLUMNS = {
+    "news_id": "string", "title": "string", "summary": "string", "source": "string",
+    "published_at": "string", "url": "string", "event_type": "string",
+    "event_types": "list<string>", "time_context": "string",
+    "context_period_end": "string", "duplicate_count": "int64",
+}
+
+
+def _arrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("❌ pyarrow is required for exports: pip install pyarrow")
+    return pa, pq
+
+
+def _schema(pa, columns):
+    types = {
+        "string": pa.string(),
+        "float64": pa.float64(),
+        "int64": pa.int64(),
+        "list<string>": pa.list_(pa.string()),
+    }
+    return pa.schema([(name, types[t]) for name, t in columns.items()])
+
+
+# --------------------------------------------------
+# Graph reads (one batch of companies at a time)
+# --------------------------------------------------
+
+def company_pages(session, batch_size):
+    """Yield lists of {company_id, data_version}, keyset-paged by company_id."""
+    after = ""
+    while True:
+        page = [
+            dict(r)
+            for r in session.run("""
+                MATCH (c:Company)
+                WHERE c.company_id > $after
+                RETURN c.company_id AS company_id, c.data_version AS data_version
+                ORDER BY c.company_id
+                LIMIT $limit
+            """, {"after": after, "limit": batch_size})
+        ]
+        if not page:
+            return
+        yield page
+        after = page[-1]["company_id"]
+
+
+def fetch_companies(session, company_ids):
+    result = session.run("""
+        UNWIND $company_ids AS cid
+        MATCH (c:Company {company_id: cid})
+        RETURN cid, properties(c) AS props
+    """, {"company_ids": company_ids})
+    return {r["cid"]: [r["props"]] for r in result}
+
+
+def fetch_financials(session, company_ids):
+    if reads_series():
+        out = {cid: [] for cid in company_ids}
+        for period_type in ("quarter", "year"):
+            for cid, rows in read_series_many(session, company_ids, period_type).items():
+                out[cid].extend({**r, "period_type": period_type} for r in rows)
+        return out
+
+    result = session.run("""
+        UNWIND $company_ids AS cid
+        MATCH (:Company {company_id: cid})-[:HAS_PERIOD]->(p:FinancialPeriod)
+              -[:HAS_METRICS]->(m:FinancialMetrics)
+        RETURN cid, p.period_type AS period_type, p.period_end AS period_end,
+               p.label AS label, properties(m) AS metrics
+        ORDER BY cid, period_type, period_end
+    """, {"company_ids": company_ids})
+    out = {cid: [] for cid in company_ids}
+    for r in result:
+        out[r["cid"]].append({
+            "period_type": r["period_type"], "period_end": r["period_end"],
+            "label": r["label"], **r["metrics"],
+        })
+    return out
+
+
+def fetch_news(session, company_ids):
+    result = session.run("""
+        UNWIND $company_ids AS cid
+        MATCH (:Company {company_id: cid})-[:MENTIONED_IN]->(n:News)
+        RETURN cid, properties(n) AS props
+        ORDER BY cid, n.published_at
+    """, {"company_ids": company_ids})
+    out = {cid: [] for cid in company_ids}
+    for r in result:
+        out[r["cid"]].append(r["props"])
+    return out
+
+
+# --------------------------------------------------
+# Parquet writes
+# --------------------------------------------------
+
+def _to_table(pa, rows, columns):
+    schema = _schema(pa, columns)
+    arrays = {}
+    for name, t in columns.items():
+        values = [r.get(name) for r in rows]
+        if t == "float64":
+            values = [float(v) if isinstance(v, (int, float)) else None for v in values]
+        elif t == "int64":
+            values = [int(v) if isinstance(v, (int, float)) else None for v in values]
+        elif t == "string":
+            values = [None if v is None else str(v) for v in values]
+        arrays[name] = values
+    return pa.table(arrays, schema=schema)
+
+
+def write_partition(out_dir, dataset, company_id, rows, columns):
+    """Replace one company's partition (written to a temp file, then renamed)."""
+    pa, pq = _arrow()
+    part_dir = Path(out_dir) / dataset / f"company_id={company_id}"
+    part_dir.mkdir(parents=True, exist_ok=True)
+    tmp = part_dir / "part-0.parquet.tmp"
+    pq.write_table(_to_table(pa, rows, columns), tmp, compression="zstd")
+    os.replace(tmp, part_dir / "part-0.parquet")
+
+
+def drop_partition(out_dir, company_id):
+    for dataset in DATASETS:
+        shutil.rmtree(Path(out_dir) / dataset / f"company_id={company_id}", ignore_errors=True)
+
+
+def _load_state(out_dir):
+    try:
+        return json.loads((Path(out_dir) / STATE_FILE).read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_state(out_dir, state):
+    path = Path(out_dir) / STATE_FILE
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def export_universe(session, out_dir, *, batch_size=200, full=False):
+    """Export changed companies; returns counts for the summary line."""
+    _arrow()  # fail fast before touching the graph
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    state = _load_state(out_dir)
+
+    seen = set()
+    stats = {"companies": 0, "exported": 0, "periods": 0, "news": 0, "removed": 0}
+    for page in company_pages(session, batch_size):
+        stats["companies"] += len(page)
+        seen.update(c["company_id"] for c in page)
+        changed = [
+            c["company_id"] for c in page
+            if full or not c["data_version"] or state.get(c["company_id"]) != c["data_version"]
+        ]
+        if not changed:
+            continue
+
+        companies = fetch_companies(session, changed)
+        financials = fetch_financials(session, changed)
+        news = fetch_news(session, changed)
+        for cid in changed:
+            write_partition(out_dir, "companies", cid, companies.get(cid, []), COMPANY_COLUMNS)
+            write_partition(out_dir, "financials", cid, financials[cid], FINANCIAL_COLUMNS)
+            write_partition(out_dir, "news", cid, news[cid], NEWS_COLUMNS)
+            stats["periods"] += len(financials[cid])
+            stats["news"] += len(news[cid])
+
+        versions = {c["company_id"]: c["data_version"] for c in page}
+        state.update({cid: versions[cid] for cid in changed})
+        stats["exported"] += len(changed)
+        _save_state(out_dir, state)  # a crash mid-run resumes from here
+
+    for cid in set(state) - seen:
+        drop_partition(out_dir, cid)
+        del state[cid]
+        stats["removed"] += 1
+    _save_state(out_dir, state)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export companies, financials and news to Parquet")
+    parser.add_argument("--out", default="exports", help="Output directory")
+    parser.add_argument("--batch-size", type=int, default=200, help="Companies per batch")
+    parser.add_argument("--full", action="store_true", help="Re-export every company")
+    args = parser.parse_args()
+
+    conn = Neo4jConnection(
+        os.getenv("NEO4J_URI", "bolt://127.0.0.1:7687"),
+        os.getenv("NEO4J_USER", "neo4j"),
+        os.getenv("NEO4J_PASSWORD", "firmlens"),
+    )
+    start = time.perf_counter()
+    try:
+        print(f"🔄 Exporting to {args.out}" + (" (full)..." if args.full else "..."))
+        with conn.driver.session() as session:
+            stats = export_universe(session, args.out, batch_size=args.batch_size, full=args.full)
+    finally:
+        conn.close()
+
+    print(f"✅ {stats['exported']} of {stats['companies']} companies exported "
+          f"({stats['periods']} periods, {stats['news']} news), "
+          f"{stats['removed']} removed in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
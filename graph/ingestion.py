@@ -1,14 +1,26 @@
+import argparse
+import json
 import sys
+from datetime import date, datetime, timedelta
 from pathlib import Path
+from urllib.parse import urlparse
 
 # Add project root to Python path
 project_root = Path(__file__).parent.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
+from data.data_extraction import SCREENER_URL, extract_all, fetch_html, parse_html
 from graph.neo4j_connection import Neo4jConnection
-from normalizations.normalize_numbers import normalize
-from normalizations.normalize_news import normalize_news
+from graph.news_search import refresh_search_fields
+from graph.peer_aggregates import refresh_peer_aggregates
+from graph.read_model import publish_snapshot
+from graph.run_journal import NullJournal, RunJournal
+from graph.stage_profiler import NullProfiler, StageProfiler
+from graph.series_store import ingest_series, read_series, reads_series, writes_graph, writes_series
+from normalizations.normalize_numbers import STORED_FIELDS, company_id_for, normalize_raw
+from normalizations.derived_metrics import attach_derived
+from normalizations.normalize_news import normalize_news, advance_watermark
 
 # Try bolt:// for direct connection (recommended for local Neo4j)
 # Use neo4j:// for routing/clustering setups
@@ -36,7 +48,9 @@ def ingest_financials(tx, company_id, records):
         params = {
             **r,
             "company_id": company_id,
-            "source_url": r.get("source_url")  # Will be None if not present
+            "source_url": r.get("source_url"),  # Will be None if not present
+            "raw_hash": r.get("raw_hash"),
+            "derived": r.get("derived") or {}   # QoQ/YoY/TTM, see derived_metrics
         }
         tx.run("""
             MERGE (p:FinancialPeriod {
@@ -44,23 +58,74 @@ def ingest_financials(tx, company_id, records):
                 period_end: $period_end,
                 period_type: $period_type
             })
-            SET p.label = $label
-
-            CREATE (m:FinancialMetrics {
-                sales: $sales,
-                operating_profit: $operating_profit,
-                net_profit: $net_profit,
-                opm_percent: $opm_percent,
-                eps: $eps,
-                source_url: $source_url
-            })
+            SET p.label = $label,
+                p.raw_hash = $raw_hash
 
             MERGE (c:Company {company_id: $company_id})
             MERGE (c)-[:HAS_PERIOD]->(p)
-            MERGE (p)-[:HAS_METRICS]->(m)
+
+            // One metrics node per period: re-ingestion updates it in place
+            MERGE (p)-[:HAS_METRICS]->(m:FinancialMetrics)
+            SET m.sales = $sales,
+                m.operating_profit = $operating_profit,
+                m.net_profit = $net_profit,
+                m.opm_percent = $opm_percent,
+                m.eps = $eps,
+                m.source_url = $source_url,
+                m.ingested_at = toString(datetime())
+            SET m += $derived
         """, params)
 
 
+def stored_periods(tx, company_id):
+    """(period_type, period_end) -> stored row with raw_hash, for column diffing."""
+    if reads_series():
+        return {
+            (period_type, r["period_end"]): r
+            for period_type in ("quarter", "year")
+            for r in read_series(tx, company_id, period_type, fields=STORED_FIELDS[1:])
+        }
+
+    result = tx.run("""
+        MATCH (:Company {company_id: $company_id})-[:HAS_PERIOD]->(p:FinancialPeriod)
+              -[:HAS_METRICS]->(m:FinancialMetrics)
+        RETURN p.period_type AS period_type, p.period_end AS period_end,
+               p.label AS label, p.raw_hash AS raw_hash,
+               m.sales AS sales, m.operating_profit AS operating_profit,
+               m.opm_percent AS opm_percent, m.net_profit AS net_profit,
+               m.eps AS eps, m.source_url AS source_url
+    """, {"company_id": company_id})
+    return {(r["period_type"], r["period_end"]): dict(r) for r in result}
+
+
+# A changed period also changes the derived metrics (QoQ / YoY / TTM, see
+# derived_metrics) of the periods up to a year after it
+DERIVED_REACH = {"quarter": 4, "year": 1}
+
+
+def rows_to_write(rows, period_type):
+    """Changed rows plus the later rows whose derived metrics depend on them."""
+    out, reach = [], 0
+    for r in sorted(rows, key=lambda r: r["period_end"]):
+        if r.get("changed", True):
+            reach = DERIVED_REACH[period_type] + 1
+        if reach:
+            out.append(r)
+            reach -= 1
+    return out
+
+
+# Optional News properties (older payloads may not carry them)
+NEWS_DEFAULTS = {
+    "event_types": [],
+    "event_scores": [],
+    "context_period_end": None,
+    "duplicate_count": 0,
+    "duplicate_sources": [],
+    "duplicate_urls": [],
+}
+
+
 def ingest_news(tx, company_id, news):
     for n in news:
         tx.run("""
@@ -71,11 +136,141 @@ def ingest_news(tx, company_id, news):
                 nw.published_at = $published_at,
                 nw.url = $url,
                 nw.event_type = $event_type,
-                nw.time_context = $time_context
+                nw.event_types = $event_types,
+                nw.event_scores = $event_scores,
+                nw.time_context = $time_context,
+                nw.context_period_end = $context_period_end,
+                nw.duplicate_count = $duplicate_count,
+                nw.duplicate_sources = $duplicate_sources,
+                nw.duplicate_urls = $duplicate_urls
 
             MERGE (c:Company {company_id: $company_id})
             MERGE (c)-[:MENTIONED_IN]->(nw)
-        """, {**n, "company_id": company_id})
+        """, {**NEWS_DEFAULTS, **n, "company_id": company_id})
+
+
+def ensure_indexes(session):
+    """
+    Lookup indexes used by ingestion MERGEs and the period/news traversals.
+    Schema changes run as their own auto-commit transactions.
+    """
+    for stmt in [
+        "CREATE INDEX company_id IF NOT EXISTS FOR (c:Company) ON (c.company_id)",
+        "CREATE INDEX news_id IF NOT EXISTS FOR (n:News) ON (n.news_id)",
+        "CREATE INDEX news_published_at IF NOT EXISTS FOR (n:News) ON (n.published_at)",
+        "CREATE INDEX period_key IF NOT EXISTS "
+        "FOR (p:FinancialPeriod) ON (p.company_id, p.period_end, p.period_type)",
+        "CREATE INDEX peer_aggregate_key IF NOT EXISTS "
+        "FOR (a:PeerAggregate) ON (a.group_type, a.name, a.period_type)",
+        "CREATE INDEX event_impact_key IF NOT EXISTS "
+        "FOR (e:EventImpact) ON (e.company_id, e.event_type)",
+        # news_text predates the search scope fields (see graph/news_search.py)
+        "DROP INDEX news_text IF EXISTS",
+        "CREATE FULLTEXT INDEX news_search IF NOT EXISTS FOR (n:News) "
+        "ON EACH [n.title, n.summary, n.search_companies, n.search_day]",
+    ]:
+        session.run(stmt).consume()
+
+
+def link_news_to_periods(tx, company_id):
+    """
+    Materialize (:News)-[:ABOUT_PERIOD {via}]->(:FinancialPeriod) for one company:
+      via = "time_context"  the article names the quarter (e.g. "Q3 FY25")
+      via = "published_in"  the article was published inside the period
+    Idempotent; re-run after every ingestion so new periods pick up older news
+    (and stale published_in links are removed).
+    """
+    tx.run("""
+        MATCH (c:Company {company_id: $company_id})-[:MENTIONED_IN]->(nw:News)
+        WHERE nw.context_period_end IS NOT NULL
+        MATCH (c)-[:HAS_PERIOD]->(p:FinancialPeriod {
+            period_type: "quarter", period_end: nw.context_period_end
+        })
+        MERGE (nw)-[r:ABOUT_PERIOD]->(p)
+        SET r.via = "time_context"
+    """, {"company_id": company_id})
+
+    # Month arithmetic keeps the day number (2024-06-30 - 3 months = 2024-03-30),
+    # so quarters are bounded by their first day instead
+    inside = """
+        published <= period_end
+        AND CASE p.period_type
+              WHEN "quarter" THEN published >= date.truncate("quarter", period_end)
+              ELSE published > period_end - duration({years: 1})
+            END
+    """
+
+    # Drop published_in links outside the window (left by the older
+    # day-number bound, which also linked e.g. Mar 31 news to the Jun quarter)
+    tx.run("""
+        MATCH (:Company {company_id: $company_id})-[:MENTIONED_IN]->(nw:News)
+              -[r:ABOUT_PERIOD {via: "published_in"}]->(p:FinancialPeriod)
+        WITH r, p, date(p.period_end) AS period_end, date(nw.published_at) AS published
+        WHERE published IS NULL OR NOT (""" + inside + """)
+        DELETE r
+    """, {"company_id": company_id})
+
+    tx.run("""
+        MATCH (c:Company {company_id: $company_id})-[:MENTIONED_IN]->(nw:News)
+        WHERE nw.published_at IS NOT NULL
+        MATCH (c)-[:HAS_PERIOD]->(p:FinancialPeriod)
+        WITH nw, p, date(p.period_end) AS period_end, date(nw.published_at) AS published
+        WHERE """ + inside + """
+        MERGE (nw)-[r:ABOUT_PERIOD]->(p)
+        SET r.via = coalesce(r.via, "published_in")
+    """, {"company_id": company_id})
+
+
+def existing_news_ids(tx, company_id, news_ids):
+    """news_ids (from the given list) already linked to this company."""
+    result = tx.run("""
+        UNWIND $news_ids AS id
+        MATCH (:Company {company_id: $company_id})-[:MENTIONED_IN]->(nw:News {news_id: id})
+        RETURN collect(nw.news_id) AS ids
+    """, {"company_id": company_id, "news_ids": list(news_ids)})
+    return set(result.single()["ids"])
+
+
+DEDUP_LOOKBACK_DAYS = 14
+
+
+def recent_news(tx, company_id, since):
+    """Stored articles published on/after `since`, for cross-run duplicate matching."""
+    result = tx.run("""
+        MATCH (:Company {company_id: $company_id})-[:MENTIONED_IN]->(nw:News)
+        WHERE nw.published_at >= $since
+        RETURN nw.news_id AS news_id, nw.title AS title, nw.summary AS summary,
+               nw.source AS source, nw.published_at AS published_at
+    """, {"company_id": company_id, "since": since})
+    return [dict(r) for r in result]
+
+
+def add_news_duplicates(tx, records):
+    """
+    Fold newly fetched copies into already-stored canonical articles
+    (collapse_duplicates records with existing=True). Copies whose URL is
+    already listed are skipped, together with their source, so re-running
+    the write or a partly overlapping fetch does not double count.
+    """
+    tx.run("""
+        UNWIND $records AS r
+        MATCH (nw:News {news_id: r.news_id})
+        WITH nw, [pair IN r.duplicate_pairs
+                  WHERE NOT pair[0] IN coalesce(nw.duplicate_urls, [])] AS pairs
+        WHERE size(pairs) > 0
+        SET nw.duplicate_count = coalesce(nw.duplicate_count, 0) + size(pairs),
+            nw.duplicate_urls = coalesce(nw.duplicate_urls, []) + [pair IN pairs | pair[0]],
+            nw.duplicate_sources = coalesce(nw.duplicate_sources, [])
+                                   + [pair IN pairs WHERE pair[1] IS NOT NULL | pair[1]]
+    """, {"records": records})
+
+
+def stamp_data_version(tx, company_id, version):
+    """Mark the company's graph data as changed (read by chat sessions/caches)."""
+    tx.run("""
+        MATCH (c:Company {company_id: $company_id})
+        SET c.data_version = $version
+    """, {"company_id": company_id, "version": version})
 
 
 def verify_connection(driver):
@@ -115,7 +310,174 @@ def try_connect(uri, user, password):
         return None
 
 
+def screener_symbol(screener_url):
+    """
+    Profiler label for a Screener URL, known before the company is scraped:
+    'https://www.screener.in/company/TATAELXSI/consolidated/' -> 'TATAELXSI'
+    """
+    parts = [p for p in urlparse(screener_url).path.split("/") if p]
+    if "company" in parts[:-1]:
+        return parts[parts.index("company") + 1]
+    return parts[-1] if parts else screener_url
+
+
+def run_ingestion(driver, screener_url=SCREENER_URL, news_query=None, journal=None, profiler=None):
+    """
+    Extract -> normalize -> ingest one company. `news_query` is the NewsAPI
+    search term (the scraped company name when omitted). Raises on failure;
+    the news watermark only advances after every graph write succeeded.
+    With a RunJournal, stages completed earlier in the same run are skipped
+    (normalized payloads come from the journal, nothing is re-scraped).
+    With a StageProfiler every stage that runs is timed (see stage_profiler).
+    Returns counts for callers such as graph/refresh_scheduler.py.
+    """
+    journal = journal or NullJournal()
+    profiler = profiler or NullProfiler()
+    key = screener_url
+    label = screener_symbol(screener_url)
+
+    def step(stage, fn):
+        return journal.step(key, stage, profiler.wrap(label, stage, fn))
+
+    def extract():
+        with profiler.stage(label, "http"):
+            html = fetch_html(screener_url)
+        with profiler.stage(label, "parse_html"):
+            soup = parse_html(html)
+        with profiler.stage(label, "extract"):
+            raw = extract_all(screener_url, soup=soup)
+        # Columns whose raw cells are unchanged are reused from the graph
+        with profiler.stage(label, "stored_periods"), driver.driver.session() as session:
+            known = session.execute_read(stored_periods, company_id_for(raw["company_name"]))
+        with profiler.stage(label, "normalize"):
+            numeric_data = normalize_raw(raw, known)
+            attach_derived([numeric_data])
+        return numeric_data
+
+    print("\n🔄 Fetching and normalizing data...")
+    numeric_data = journal.step(key, "normalize", extract)
+    company = numeric_data["company"]
+    company_id = company["company_id"]
+
+    # Only articles newer than this company's watermark are fetched; copies of
+    # recently stored articles are folded into those instead of re-added
+    def fetch_news():
+        since = (date.today() - timedelta(days=DEDUP_LOOKBACK_DAYS)).isoformat()
+        with driver.driver.session() as session:
+            stored = session.execute_read(recent_news, company_id, since)
+        return normalize_news(
+            company_name=news_query or company["name"], company_id=company_id, existing=stored
+        )
+
+    news_data, news_window = step("normalize_news", fetch_news)
+
+    quarterly = rows_to_write(numeric_data["quarterly_financials"], "quarter")
+    annual = rows_to_write(numeric_data["annual_financials"], "year")
+    print(f"✅ Normalized {len(numeric_data['quarterly_financials'])} quarterly periods "
+          f"({len(quarterly)} new, restated or dependent)")
+    print(f"✅ Normalized {len(numeric_data['annual_financials'])} annual periods "
+          f"({len(annual)} new, restated or dependent)")
+    print(f"✅ Normalized {len(news_data)} new news articles")
+
+    print(f"\n🔄 Ingesting data for company: {company['name']} ({company_id})...")
+
+    with driver.driver.session() as session:
+        with profiler.stage(label, "indexes"):
+            ensure_indexes(session)
+
+        print("  → Ingesting company data...")
+        step("company", lambda: session.execute_write(ingest_company, company))
+
+        if writes_graph():
+            print("  → Ingesting quarterly financials...")
+            step("quarterly", lambda: session.execute_write(
+                ingest_financials, company_id, quarterly
+            ))
+
+            print("  → Ingesting annual financials...")
+            step("annual", lambda: session.execute_write(
+                ingest_financials, company_id, annual
+            ))
+
+        if writes_series():
+            def write_series():
+                # merge_rows keeps stored periods, so only changed rows are sent
+                if quarterly:
+                    session.execute_write(ingest_series, company_id, "quarter", quarterly)
+                if annual:
+                    session.execute_write(ingest_series, company_id, "year", annual)
+
+            print("  → Ingesting metric series...")
+            step("series", write_series)
+
+        def write_news():
+            copies = [n for n in news_data if n.get("existing")]
+            fresh = [n for n in news_data if not n.get("existing")]
+            already = session.execute_read(
+                existing_news_ids, company_id, [n["news_id"] for n in fresh]
+            )
+            new_news = [n for n in fresh if n["news_id"] not in already]
+            if already:
+                print(f"    (skipping {len(already)} already-ingested articles)")
+            if copies:
+                print(f"    (folding {sum(n['duplicate_count'] for n in copies)} copies into stored articles)")
+                session.execute_write(add_news_duplicates, copies)
+            session.execute_write(
+                ingest_news, company_id, new_news
+            )
+            return len(new_news)
+
+        print("  → Ingesting news articles...")
+        new_news = step("news", write_news)
+
+        print("  → Linking news to financial periods...")
+        step("links", lambda: session.execute_write(link_news_to_periods, company_id))
+        step("search_fields", lambda: session.execute_write(refresh_search_fields, company_id))
+
+        step("data_version", lambda: session.execute_write(
+            stamp_data_version, company_id,
+            datetime.utcnow().isoformat() + "Z"
+        ))
+
+        print("  → Refreshing sector/industry aggregates...")
+        groups = step("aggregates", lambda: session.execute_write(refresh_peer_aggregates, company_id))
+        print(f"    ({', '.join(f'{t}: {n}' for t, n in groups) or 'no sector/industry'})")
+
+        print("  → Publishing dashboard snapshot...")
+        snapshot = step("snapshot", lambda: publish_snapshot(session))
+        print(f"    ({snapshot['rebuilt']} of {snapshot['companies']} companies rebuilt)")
+
+    # Advance only after the graph write succeeded
+    step("watermark", lambda: advance_watermark(company_id, news_data, news_window))
+
+    result = {
+        "company_id": company_id,
+        "periods": len(numeric_data["quarterly_financials"]) + len(numeric_data["annual_financials"]),
+        "written_periods": len(quarterly) + len(annual),
+        "news": len(news_data),
+        "new_news": new_news,
+    }
+    journal.step(key, "done", lambda: result)
+    return result
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Ingest companies into Neo4j")
+    parser.add_argument("--universe", help="JSON list of companies (same format as refresh_scheduler)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Start a new run instead of resuming an interrupted one")
+    parser.add_argument("--profile", action="store_true",
+                        help="Time every stage (wall, CPU, peak memory) and print a ranked summary")
+    parser.add_argument("--profile-dir",
+                        help="Also write a cProfile .pstats file per company and stage here (implies --profile)")
+    args = parser.parse_args()
+
+    if args.universe:
+        with open(args.universe, encoding="utf-8") as f:
+            universe = json.load(f)
+    else:
+        universe = [{"screener_url": SCREENER_URL, "news_query": "Tata Elxsi"}]
+
     print("🔄 Connecting to Neo4j...")
     print(f"   URI: {URI}")
     print(f"   User: {USER}")
@@ -158,6 +520,7 @@ def main():
         print(f"  - Docker: docker start <neo4j-container>")
         return
     
+    profiler = StageProfiler(args.profile_dir) if args.profile or args.profile_dir else None
     try:
         # Connection already verified in try_connect, but verify again for safety
         if not verify_connection(driver):
@@ -165,50 +528,35 @@ def main():
             return
         
         print("✅ Connected to Neo4j successfully")
-        print("\n🔄 Fetching and normalizing data...")
-        
-        numeric_data = normalize()
-        news_data = normalize_news()
-        
-        print(f"✅ Normalized {len(numeric_data['quarterly_financials'])} quarterly periods")
-        print(f"✅ Normalized {len(numeric_data['annual_financials'])} annual periods")
-        print(f"✅ Normalized {len(news_data)} news articles")
-        
-        company = numeric_data["company"]
-        company_id = company["company_id"]
-        
-        print(f"\n🔄 Ingesting data for company: {company['name']} ({company_id})...")
-        
-        with driver.driver.session() as session:
-            print("  → Ingesting company data...")
-            session.execute_write(ingest_company, company)
-            
-            print("  → Ingesting quarterly financials...")
-            session.execute_write(
-                ingest_financials, company_id,
-                numeric_data["quarterly_financials"]
-            )
-            
-            print("  → Ingesting annual financials...")
-            session.execute_write(
-                ingest_financials, company_id,
-                numeric_data["annual_financials"]
-            )
-            
-            print("  → Ingesting news articles...")
-            session.execute_write(
-                ingest_news, company_id, news_data
-            )
-        
+
+        # Interrupted runs are resumed from the journal (see graph/run_journal.py)
+        journal = RunJournal()
+        journal.start_run(resume=not args.fresh)
+        if journal.resumed:
+            print(f"↻ Resuming interrupted run {journal.run_id}")
+
+        for entry in universe:
+            url = entry.get("screener_url") or SCREENER_URL
+            if journal.company_done(url):
+                print(f"↻ {entry.get('company_id') or url}: already ingested in this run")
+                continue
+            run_ingestion(driver, url, entry.get("news_query"), journal=journal, profiler=profiler)
+
+        journal.finish_run()
+        journal.close()
         driver.close()
         print("\n✅ Data successfully ingested into Neo4j")
         
     except KeyboardInterrupt:
-        print("\n⚠️  Operation cancelled by user")
+        print("\n⚠️  Operation cancelled by user (re-run to resume)")
     except Exception as e:
-        print(f"\n❌ Error during ingestion: {e}")
+        print(f"\n❌ Error during ingestion (re-run to resume): {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        # Also after a failed/interrupted run: the stages that did run
+        if profiler:
+            profiler.print_summary()
 
 
 if __name__ == "__main__":
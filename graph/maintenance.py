@@ -0,0 +1,252 @@
+"""
+Graph retention and compaction.
+
+    python graph/maintenance.py --news-days 365 --keep-ids keep.txt --dry-run
+    python graph/maintenance.py --news-days 365 --keep-companies TATA_ELXSI --json
+
+Steps (in order):
+  news_retention       News published more than --news-days ago, unless its
+                       news_id is in --keep-ids or a --keep-companies company
+                       mentions it (skipped when --news-days is not given)
+  duplicate_metrics    extra FinancialMetrics under one FinancialPeriod (left by
+                       pre-MERGE re-ingestion); the newest one is kept
+  orphan_periods       FinancialPeriod with no Company
+  orphan_metrics       FinancialMetrics with no FinancialPeriod (including
+                       those of periods removed just before)
+  orphan_news          News no Company mentions
+  orphan_series        MetricSeries with no Company
+  orphan_event_impact  EventImpact with no Company (see graph/event_impact.py)
+
+Every delete runs in its own short write transaction of at most --batch-size
+nodes, with an optional pause between batches, so the job can run while the
+app is serving reads. duplicate_metrics (a whole-graph aggregation) selects
+its node ids once and then deletes them batch by batch.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from graph.ingestion import stamp_data_version
+from graph.neo4j_connection import Neo4jConnection
+from graph.read_model import publish_snapshot
+
+# Each step is a MATCH fragment binding the nodes to remove as `n`
+STEPS = {
+    "news_retention": """
+        MATCH (n:News)
+        WHERE n.published_at IS NOT NULL AND n.published_at < $cutoff
+          AND NOT n.news_id IN $keep_ids
+          AND NOT EXISTS {
+              MATCH (c:Company)-[:MENTIONED_IN]->(n)
+              WHERE c.company_id IN $keep_companies
+          }
+    """,
+    "duplicate_metrics": """
+        MATCH (p:FinancialPeriod)-[:HAS_METRICS]->(m:FinancialMetrics)
+        WITH p, m ORDER BY coalesce(m.ingested_at, "") DESC, id(m) DESC
+        WITH p, collect(m) AS metrics
+        WHERE size(metrics) > 1
+        UNWIND metrics[1..] AS n
+    """,
+    "orphan_periods": """
+        MATCH (n:FinancialPeriod)
+        WHERE NOT EXISTS { MATCH (:Company)-[:HAS_PERIOD]->(n) }
+    """,
+    "orphan_metrics": """
+        MATCH (n:FinancialMetrics)
+        WHERE NOT EXISTS { MATCH (:FinancialPeriod)-[:HAS_METRICS]->(n) }
+    """,
+    "orphan_news": """
+        MATCH (n:News)
+        WHERE NOT EXISTS { MATCH (:Company)-[:MENTIONED_IN]->(n) }
+    """,
+    "orphan_series": """
+        MATCH (n:MetricSeries)
+        WHERE NOT EXISTS { MATCH (:Company)-[:HAS_SERIES]->(n) }
+    """,
+    "orphan_event_impact": """
+        MATCH (n:EventImpact)
+        WHERE NOT EXISTS { MATCH (:Company)-[:HAS_EVENT_IMPACT]->(n) }
+    """,
+}
+
+# Steps whose match aggregates over the whole graph: their node ids are
+# selected once and deleted in batches, instead of re-running the match
+# for every batch.
+SELECT_ONCE = {"duplicate_metrics"}
+
+
+def _count(tx, match, params):
+    return tx.run(match + " RETURN count(n) AS n", params).single()["n"]
+
+
+def _delete_batch(tx, match, params):
+    return tx.run(
+        match + " WITH DISTINCT n LIMIT $batch DETACH DELETE n RETURN count(*) AS n",
+        params,
+    ).single()["n"]
+
+
+def _select_ids(tx, match, params):
+    return tx.run(match + " RETURN DISTINCT elementId(n) AS id", params).value("id")
+
+
+def _delete_ids(tx, ids):
+    return tx.run("""
+        MATCH (n) WHERE elementId(n) IN $ids
+        DETACH DELETE n
+        RETURN count(*) AS n
+    """, {"ids": ids}).single()["n"]
+
+
+def _touched_companies(tx, params):
+    """Companies whose news the retention step is about to remove."""
+    result = tx.run(STEPS["news_retention"] + """
+        MATCH (c:Company)-[:MENTIONED_IN]->(n)
+        RETURN collect(DISTINCT c.company_id) AS ids
+    """, params)
+    return result.single()["ids"]
+
+
+def run_step(session, name, params, *, batch_size=1000, pause_ms=0, dry_run=False):
+    """Delete one step's matches in bounded batches; returns a report row."""
+    match = STEPS[name]
+    params = {**params, "batch": batch_size}
+    start = time.perf_counter()
+
+    if dry_run:
+        matched = session.execute_read(_count, match, params)
+        return {"step": name, "matched": matched, "deleted": 0, "batches": 0,
+                "seconds": round(time.perf_counter() - start, 3)}
+
+    deleted = batches = 0
+
+    def pause():
+        if pause_ms:
+            time.sleep(pause_ms / 1000)
+
+    if name in SELECT_ONCE:
+        ids = session.execute_read(_select_ids, match, params)
+        for i in range(0, len(ids), batch_size):
+            deleted += session.execute_write(_delete_ids, ids[i:i + batch_size])
+            batches += 1
+            pause()
+        matched = len(ids)
+    else:
+        while True:
+            n = session.execute_write(_delete_batch, match, params)
+            if n == 0:
+                break
+            deleted += n
+            batches += 1
+            pause()
+        matched = deleted
+
+    return {"step": name, "matched": matched, "deleted": deleted, "batches": batches,
+            "seconds": round(time.perf_counter() - start, 3)}
+
+
+def run_maintenance(session, *, news_days=None, keep_ids=(), keep_companies=(),
+                    batch_size=1000, pause_ms=0, dry_run=False):
+    params = {
+        "cutoff": None,
+        "keep_ids": list(keep_ids),
+        "keep_companies": list(keep_companies),
+    }
+    steps = list(STEPS)
+    if news_days is None:
+        steps.remove("news_retention")
+    else:
+        params["cutoff"] = (datetime.utcnow() - timedelta(days=news_days)).strftime("%Y-%m-%d")
+
+    touched = []
+    if news_days is not None and not dry_run:
+        touched = session.execute_read(_touched_companies, params)
+
+    report = [
+        run_step(session, name, params, batch_size=batch_size,
+                 pause_ms=pause_ms, dry_run=dry_run)
+        for name in steps
+    ]
+
+    # Removed news changes what chat sessions / caches would load
+    removed_news = next((r["deleted"] for r in report if r["step"] == "news_retention"), 0)
+    if removed_news:
+        version = datetime.utcnow().isoformat() + "Z"
+        for company_id in touched:
+            session.execute_write(stamp_data_version, company_id, version)
+        publish_snapshot(session)
+
+    return {"cutoff": params["cutoff"], "dry_run": dry_run, "steps": report}
+
+
+def _read_keep_ids(path):
+    if not path:
+        return []
+    lines = Path(path).read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+
+
+def _print_report(report):
+    verb = "would delete" if report["dry_run"] else "deleted"
+    if report["cutoff"]:
+        print(f"News cutoff: published before {report['cutoff']}")
+    print(f"\n{'step':<20} {verb:>12} {'batches':>8} {'seconds':>8}")
+    for r in report["steps"]:
+        print(f"{r['step']:<20} {r['matched']:>12} {r['batches']:>8} {r['seconds']:>8.2f}")
+    total = sum(r["matched"] for r in report["steps"])
+    seconds = sum(r["seconds"] for r in report["steps"])
+    print(f"{'total':<20} {total:>12} {'':>8} {seconds:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Graph retention and compaction")
+    parser.add_argument("--news-days", type=int, help="Delete news older than this many days")
+    parser.add_argument("--keep-ids", help="File of news_ids to always keep (one per line)")
+    parser.add_argument("--keep-companies", default="",
+                        help="Comma-separated company_ids whose news is never pruned")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause-ms", type=int, default=0, help="Sleep between batches")
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would be deleted")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    conn = Neo4jConnection(
+        os.getenv("NEO4J_URI", "bolt://127.0.0.1:7687"),
+        os.getenv("NEO4J_USER", "neo4j"),
+        os.getenv("NEO4J_PASSWORD", "firmlens"),
+    )
+    try:
+        if not args.json:
+            print("🔄 Running graph maintenance" + (" (dry run)..." if args.dry_run else "..."))
+        with conn.driver.session() as session:
+            report = run_maintenance(
+                session,
+                news_days=args.news_days,
+                keep_ids=_read_keep_ids(args.keep_ids),
+                keep_companies=[c.strip() for c in args.keep_companies.split(",") if c.strip()],
+                batch_size=args.batch_size,
+                pause_ms=args.pause_ms,
+                dry_run=args.dry_run,
+            )
+    finally:
+        conn.close()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+        print("\n✅ Maintenance complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import base64
+import hashlib
+import json
+import re
+from datetime import date
+
+# --------------------------------------------------
+# Full-text news search
+#
+# Backed by the "news_search" full-text index (created in graph/ingestion.py
+# ensure_indexes) over News.title / News.summary plus two scope fields:
+#
+#   search_companies  one token per mentioning company (company_token)
+#   search_day        published_at as YYYYMMDD
+#
+# Company and date filters become Lucene clauses on those fields, so only
+# in-scope articles are matched and scored. Results are ranked by relevance
+# and paged with an opaque keyset cursor (score, news_id); the cursor is
+# applied to the ranked hits (Lucene cannot seek by score), so page N still
+# walks the hits ranked above it.
+# --------------------------------------------------
+
+NEWS_TEXT_INDEX = "news_search"
+MAX_LIMIT = 100
+
+_LUCENE_SPECIAL = re.compile(r'([+\-!(){}\[\]^"~*?:\\/]|&&|\|\|)')
+_LUCENE_OPERATOR = re.compile(r"\b(AND|OR|NOT)\b")
+
+
+def lucene_escape(text: str) -> str:
+    """Treat user input as plain terms, not Lucene syntax."""
+    text = _LUCENE_SPECIAL.sub(r"\\\1", text)
+    # Uppercase AND/OR/NOT are operators; lowercase they are plain terms
+    return _LUCENE_OPERATOR.sub(lambda m: m.group(1).lower(), text)
+
+
+def company_token(company_id: str) -> str:
+    """Analyzer-proof single token for a company id (ids may hold &, ., spaces)."""
+    return "c" + hashlib.md5(company_id.encode()).hexdigest()[:16]
+
+
+def _day(value: str | None, name: str) -> str:
+    if value is None:
+        return "*"
+    try:
+        return date.fromisoformat(value).strftime("%Y%m%d")
+    except ValueError:
+        raise ValueError(f"Invalid {name} date (expected YYYY-MM-DD): {value}")
+
+
+def scoped_query(query: str, company_id: str | None, date_from: str | None, date_to: str | None) -> str:
+    clauses = [f"+({query})"]
+    if company_id:
+        clauses.append(f"+search_companies:{company_token(company_id)}")
+    if date_from or date_to:
+        clauses.append(f"+search_day:[{_day(date_from, 'from')} TO {_day(date_to, 'to')}]")
+    return " ".join(clauses)
+
+
+def refresh_search_fields(tx, company_id):
+    """(Re)compute the scope fields of one company's news; run after news writes."""
+    rows = [
+        {
+            "news_id": r["news_id"],
+            "companies": " ".join(sorted(company_token(cid) for cid in r["company_ids"])),
+            "day": (r["published_at"] or "").replace("-", "") or None,
+        }
+        for r in tx.run("""
+            MATCH (:Company {company_id: $company_id})-[:MENTIONED_IN]->(nw:News)
+            MATCH (c:Company)-[:MENTIONED_IN]->(nw)
+            RETURN nw.news_id AS news_id, nw.published_at AS published_at,
+                   collect(c.company_id) AS company_ids
+        """, {"company_id": company_id})
+    ]
+    tx.run("""
+        UNWIND $rows AS row
+        MATCH (nw:News {news_id: row.news_id})
+        SET nw.search_companies = row.companies, nw.search_day = row.day
+    """, {"rows": rows})
+    return len(rows)
+
+
+def encode_cursor(score: float, news_id: str) -> str:
+    raw = json.dumps([score, news_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> tuple[float, str] | None:
+    if not cursor:
+        return None
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        score, news_id = json.loads(base64.urlsafe_b64decode(padded))
+        return float(score), str(news_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def search_news(
+    session,
+    query: str,
+    *,
+    company_id: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    limit: int = 20,
+    cursor: str | None = None,
+    raw_syntax: bool = False,
+) -> dict:
+    """
+    Relevance-ranked news matching `query`.
+    Optional company scope and published_at range (inclusive, YYYY-MM-DD),
+    both evaluated inside the full-text index.
+    Returns {"results": [...], "next_cursor": str | None}.
+    Raises ValueError for a bad cursor or date; with `raw_syntax`, malformed
+    Lucene surfaces as neo4j.exceptions.ClientError.
+    """
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    after = decode_cursor(cursor)
+
+    rows = list(session.run(
+        """
+        CALL db.index.fulltext.queryNodes($index, $query) YIELD node, score
+        WHERE $after_score IS NULL
+           OR score < $after_score
+           OR (score = $after_score AND node.news_id > $after_id)
+        WITH node, score
+        ORDER BY score DESC, node.news_id ASC
+        LIMIT $limit
+        OPTIONAL MATCH (c:Company)-[:MENTIONED_IN]->(node)
+        RETURN node.news_id AS news_id,
+               node.title AS title,
+               node.summary AS summary,
+               node.source AS source,
+               node.published_at AS published_at,
+               node.url AS url,
+               node.event_type AS event_type,
+               collect(c.company_id) AS company_ids,
+               score
+        ORDER BY score DESC, news_id ASC
+        """,
+        {
+            "index": NEWS_TEXT_INDEX,
+            "query": scoped_query(
+                query if raw_syntax else lucene_escape(query), company_id, date_from, date_to
+            ),
+            "after_score": after[0] if after else None,
+            "after_id": after[1] if after else None,
+            # one extra row tells us whether another page exists
+            "limit": limit + 1,
+        },
+    ))
+
+    results = [dict(r) for r in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = results[-1]
+        next_cursor = encode_cursor(last["score"], last["news_id"])
+    return {"results": results, "next_cursor": next_cursor}
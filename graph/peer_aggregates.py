@@ -0,0 +1,169 @@
+import math
+from datetime import datetime
+
+import numpy as np
+
+from graph.series_store import arrays_to_rows, read_series_many, reads_series
+
+# --------------------------------------------------
+# Sector / industry peer aggregates
+#
+# One node per (group_type, name, period_type) holds per-period quartiles
+# across the group's companies as aligned arrays (same layout as
+# MetricSeries, NaN = no data):
+#
+#   (:PeerAggregate {group_type: "sector", name: "IT", period_type: "quarter",
+#        company_ids: [...], period_end: [...], companies: [...],
+#        opm_p25: [...], opm_median: [...], opm_p75: [...],
+#        sales_growth_p25: [...], ..., eps_growth_p75: [...]})
+#
+# Growth is YoY (sales_yoy / eps_yoy from derived_metrics). Ingestion
+# recomputes only the groups the re-ingested company belongs (or belonged) to.
+# --------------------------------------------------
+
+GROUP_TYPES = ["sector", "industry"]
+PERIOD_TYPES = ["quarter", "year"]
+
+# aggregate name -> per-period source field
+AGG_METRICS = {
+    "opm": "opm_percent",
+    "sales_growth": "sales_yoy",
+    "eps_growth": "eps_yoy",
+}
+QUANTILES = {"p25": 25, "median": 50, "p75": 75}
+AGG_FIELDS = ["companies"] + [
+    f"{metric}_{q}" for metric in AGG_METRICS for q in QUANTILES
+]
+
+
+def _group_rows(session, company_ids, period_type):
+    """company_id -> [{period_end, opm_percent, sales_yoy, eps_yoy}]"""
+    fields = list(AGG_METRICS.values())
+    if reads_series():
+        return read_series_many(session, company_ids, period_type, fields=fields)
+
+    result = session.run("""
+        UNWIND $company_ids AS cid
+        MATCH (:Company {company_id: cid})-[:HAS_PERIOD]->(p:FinancialPeriod {period_type: $period_type})
+              -[:HAS_METRICS]->(m:FinancialMetrics)
+        RETURN cid, p.period_end AS period_end,
+               m.opm_percent AS opm_percent, m.sales_yoy AS sales_yoy, m.eps_yoy AS eps_yoy
+    """, {"company_ids": company_ids, "period_type": period_type})
+    out = {cid: [] for cid in company_ids}
+    for r in result:
+        out[r["cid"]].append(dict(r))
+    return out
+
+
+def compute_aggregates(rows_by_company: dict) -> dict:
+    """
+    Quartiles per period across companies -> aligned arrays (period_end sorted).
+    Companies missing a metric for a period are left out of that period.
+    """
+    period_ends = sorted({r["period_end"] for rows in rows_by_company.values() for r in rows})
+    col = {end: i for i, end in enumerate(period_ends)}
+    n_companies = len(rows_by_company)
+
+    arrays = {"period_end": period_ends}
+    present = np.zeros((n_companies, len(period_ends)), dtype=bool)
+    values = {name: np.full((n_companies, len(period_ends)), np.nan) for name in AGG_METRICS}
+    for ci, rows in enumerate(rows_by_company.values()):
+        for r in rows:
+            present[ci, col[r["period_end"]]] = True
+            for name, field in AGG_METRICS.items():
+                v = r.get(field)
+                if v is not None and not (isinstance(v, float) and math.isnan(v)):
+                    values[name][ci, col[r["period_end"]]] = v
+
+    arrays["companies"] = present.sum(axis=0).astype(float).tolist()
+    for name, x in values.items():
+        has_data = ~np.isnan(x).all(axis=0)
+        for q, pct in QUANTILES.items():
+            out = np.full(len(period_ends), np.nan)
+            if has_data.any():
+                out[has_data] = np.nanpercentile(x[:, has_data], pct, axis=0)
+            arrays[f"{name}_{q}"] = np.round(out, 4).tolist()
+    return arrays
+
+
+def _affected_groups(tx, company_id):
+    """(group_type, name) pairs the company is in now or was aggregated into before."""
+    rec = tx.run("""
+        OPTIONAL MATCH (c:Company {company_id: $company_id})
+        OPTIONAL MATCH (a:PeerAggregate) WHERE $company_id IN a.company_ids
+        RETURN c.sector AS sector, c.industry AS industry,
+               collect(DISTINCT [a.group_type, a.name]) AS previous
+    """, {"company_id": company_id}).single()
+    groups = {tuple(g) for g in rec["previous"] if g[0] is not None}
+    for group_type in GROUP_TYPES:
+        if rec[group_type]:
+            groups.add((group_type, rec[group_type]))
+    return sorted(groups)
+
+
+def refresh_group(tx, group_type, name):
+    """Recompute one sector/industry's aggregate nodes (deleted when empty)."""
+    if group_type not in GROUP_TYPES:
+        raise ValueError(f"Unknown group_type: {group_type}")
+    company_ids = [
+        r["company_id"]
+        for r in tx.run(
+            f"MATCH (c:Company) WHERE c.{group_type} = $name RETURN c.company_id AS company_id",
+            {"name": name},
+        )
+    ]
+    if not company_ids:
+        tx.run("""
+            MATCH (a:PeerAggregate {group_type: $group_type, name: $name})
+            DETACH DELETE a
+        """, {"group_type": group_type, "name": name})
+        return
+
+    for period_type in PERIOD_TYPES:
+        arrays = compute_aggregates(_group_rows(tx, company_ids, period_type))
+        tx.run("""
+            MERGE (a:PeerAggregate {group_type: $group_type, name: $name, period_type: $period_type})
+            SET a += $arrays,
+                a.company_ids = $company_ids,
+                a.updated_at = $updated_at
+        """, {
+            "group_type": group_type,
+            "name": name,
+            "period_type": period_type,
+            "arrays": arrays,
+            "company_ids": company_ids,
+            "updated_at": datetime.utcnow().isoformat() + "Z",
+        })
+
+
+def refresh_peer_aggregates(tx, company_id):
+    """Refresh only the groups touched by re-ingesting `company_id`."""
+    groups = _affected_groups(tx, company_id)
+    for group_type, name in groups:
+        refresh_group(tx, group_type, name)
+    return groups
+
+
+def read_group_summary(session, name, group_type="sector"):
+    """Precomputed aggregates for one group, or None if it has none."""
+    nodes = {
+        r["a"]["period_type"]: dict(r["a"])
+        for r in session.run("""
+            MATCH (a:PeerAggregate {group_type: $group_type, name: $name})
+            RETURN a
+        """, {"group_type": group_type, "name": name})
+    }
+    if not nodes:
+        return None
+
+    any_node = next(iter(nodes.values()))
+    return {
+        "group_type": group_type,
+        "name": name,
+        "company_ids": list(any_node.get("company_ids") or []),
+        "updated_at": any_node.get("updated_at"),
+        **{
+            period_type: arrays_to_rows(nodes.get(period_type) or {}, AGG_FIELDS)
+            for period_type in PERIOD_TYPES
+        },
+    }
@@ -0,0 +1,448 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from graph.series_store import read_series, reads_series
+
+# --------------------------------------------------
+# Read-model snapshot
+#
+# Ingestion publishes each company's overview bundle into a SQLite file so
+# the dashboard can serve /api/companies and /api/company/<id>/overview
+# locally, without touching Neo4j. Publishing writes a new versioned file
+# and then atomically replaces the small CURRENT pointer next to it;
+# readers notice the pointer change and reopen, so a swap never exposes a
+# half-written snapshot.
+#
+#   read_model/
+#     CURRENT                         -> "read_model-20250101T101500123456.sqlite"
+#     read_model-20250101T101500123456.sqlite
+# --------------------------------------------------
+
+READ_MODEL_DIR = Path(os.getenv("FIRMLENS_READ_MODEL_DIR") or Path(__file__).parent.parent / "read_model")
+POINTER = "CURRENT"
+SNAPSHOT_NEWS_LIMIT = int(os.getenv("FIRMLENS_SNAPSHOT_NEWS") or 50)
+KEEP_SNAPSHOTS = 2  # current + previous (readers may still have it open)
+
+# Row fields returned by the overview (same names in graph and series mode)
+OVERVIEW_QUARTER_FIELDS = [
+    "label", "sales", "operating_profit", "net_profit", "opm_percent", "eps", "source_url",
+    "sales_qoq", "sales_yoy", "net_profit_yoy", "sales_ttm", "net_profit_ttm",
+    "opm_delta_qoq", "opm_delta_yoy",
+]
+OVERVIEW_YEAR_FIELDS = [
+    "label", "sales", "operating_profit", "net_profit", "opm_percent", "eps", "source_url",
+    "sales_yoy", "net_profit_yoy", "eps_yoy", "opm_delta_yoy",
+]
+OVERVIEW_COMPANY_FIELDS = [
+    "company_id", "name", "sector", "industry", "market_cap_cr", "current_price",
+    "description", "description_sources", "data_version",
+]
+OVERVIEW_NEWS_FIELDS = [
+    "news_id", "title", "summary", "source", "published_at", "url", "event_type", "time_context",
+]
+OVERVIEW_SECTIONS = {
+    "company": OVERVIEW_COMPANY_FIELDS,
+    "quarterly": OVERVIEW_QUARTER_FIELDS,
+    "annual": OVERVIEW_YEAR_FIELDS,
+    "news": OVERVIEW_NEWS_FIELDS,
+}
+# Always returned with their section so rows stay identifiable
+_KEY_FIELDS = {"quarterly": "period_end", "annual": "period_end", "news": "news_id"}
+
+
+def parse_fields(spec):
+    """
+    ?fields= projection -> {section: [fields] or None for all}.
+      "quarterly.sales,quarterly.label,news"  -> quarterly (2 fields) + all news fields
+    Sections not named are left out. Empty spec -> None (full overview).
+    Raises ValueError on unknown sections/fields (names are spliced into Cypher).
+    """
+    if not spec or not spec.strip():
+        return None
+    projection = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        section, _, field = item.partition(".")
+        if section not in OVERVIEW_SECTIONS:
+            raise ValueError(f"Unknown section in fields: {section}")
+        if not field:
+            projection[section] = None
+            continue
+        if field not in OVERVIEW_SECTIONS[section] and field != _KEY_FIELDS.get(section):
+            raise ValueError(f"Unknown field in fields: {item}")
+        if section in projection and projection[section] is None:
+            continue
+        fields = projection.setdefault(section, [])
+        if field not in fields:
+            fields.append(field)
+    return projection
+
+
+def _wanted(projection, section):
+    """Fields to return for a section, or None if the section is not requested."""
+    if projection is None or (section in projection and projection[section] is None):
+        return [f for f in OVERVIEW_SECTIONS[section] if f != _KEY_FIELDS.get(section)]
+    if section not in projection:
+        return None
+    return [f for f in projection[section] if f != _KEY_FIELDS.get(section)]
+
+
+def project_bundle(bundle, projection):
+    """Apply a parse_fields() projection to an already-built overview bundle."""
+    if projection is None:
+        return bundle
+    out = {"generated_at": bundle.get("generated_at")}
+    for section in OVERVIEW_SECTIONS:
+        fields = _wanted(projection, section)
+        if fields is None:
+            continue
+        value = bundle.get(section)
+        if section == "company":
+            out[section] = value if projection[section] is None else {
+                f: (value or {}).get(f) for f in fields
+            }
+        else:
+            keep = [_KEY_FIELDS[section], *fields]
+            out[section] = [{f: row.get(f) for f in keep} for row in value or []]
+    return out
+
+
+def rows_to_columns(rows, section, projection=None):
+    """[{period_end, sales, ...}] -> {"period_end": [...], "sales": [...]} (keys even when empty)"""
+    fields = [_KEY_FIELDS[section], *(_wanted(projection, section) or [])]
+    return {f: [row.get(f) for row in rows] for f in fields}
+
+
+def _record_to_dict(obj):
+    if hasattr(obj, "_properties"):
+        return dict(obj._properties)  # noqa
+    return obj
+
+
+# --------------------------------------------------
+# Neo4j loaders (shared by the app fallback and the snapshot builder)
+# --------------------------------------------------
+
+def load_companies(session, limit=50):
+    return [
+        dict(r)
+        for r in session.run(
+            """
+            MATCH (c:Company)
+            RETURN c.company_id AS company_id,
+                   c.name AS name,
+                   c.sector AS sector,
+                   c.industry AS industry
+            ORDER BY c.name
+            LIMIT $limit
+            """,
+            {"limit": limit},
+        )
+    ]
+
+
+def _period_return(fields):
+    columns = ["p.period_end AS period_end"]
+    for f in fields:
+        columns.append("p.label AS label" if f == "label" else f"m.{f} AS {f}")
+    return ",\n                   ".join(columns)
+
+
+def _load_periods(session, company_id, period_type, fields):
+    if reads_series():
+        return read_series(session, company_id, period_type, fields=fields)
+    return [
+        dict(r)
+        for r in session.run(
+            f"""
+            MATCH (c:Company {{company_id: $company_id}})
+                  -[:HAS_PERIOD]->(p:FinancialPeriod {{period_type: $period_type}})
+                  -[:HAS_METRICS]->(m:FinancialMetrics)
+            RETURN {_period_return(fields)}
+            ORDER BY p.period_end ASC
+            """,
+            {"company_id": company_id, "period_type": period_type},
+        )
+    ]
+
+
+def load_overview(session, company_id, limit_news, projection=None):
+    """
+    Overview bundle for one company, or None if it doesn't exist.
+    `projection` (see parse_fields) limits the sections and the properties
+    each Cypher RETURN fetches.
+    """
+    company_fields = _wanted(projection, "company")
+    if projection is None or (projection.get("company", []) is None):
+        company_return = "c AS company"
+    elif company_fields:
+        company_return = "c {" + ", ".join(f".{f}" for f in company_fields) + "} AS company"
+    else:
+        company_return = "true AS company"  # existence check only
+
+    company_rec = session.run(
+        f"""
+        MATCH (c:Company {{company_id: $company_id}})
+        RETURN {company_return}
+        """,
+        {"company_id": company_id},
+    ).single()
+
+    if not company_rec:
+        return None
+
+    bundle = {}
+    if company_fields is not None:
+        bundle["company"] = _record_to_dict(company_rec["company"])
+
+    quarter_fields = _wanted(projection, "quarterly")
+    if quarter_fields is not None:
+        bundle["quarterly"] = _load_periods(session, company_id, "quarter", quarter_fields)
+
+    year_fields = _wanted(projection, "annual")
+    if year_fields is not None:
+        bundle["annual"] = _load_periods(session, company_id, "year", year_fields)
+
+    news_fields = _wanted(projection, "news")
+    if news_fields is not None:
+        news_return = ",\n                   ".join(
+            ["n.news_id AS news_id"] + [f"n.{f} AS {f}" for f in news_fields]
+        )
+        bundle["news"] = [
+            dict(r)
+            for r in session.run(
+                f"""
+                MATCH (c:Company {{company_id: $company_id}})-[:MENTIONED_IN]->(n:News)
+                RETURN {news_return}
+                ORDER BY n.published_at DESC
+                LIMIT $limit
+                """,
+                {"company_id": company_id, "limit": limit_news},
+            )
+        ]
+
+    bundle["generated_at"] = datetime.utcnow().isoformat() + "Z"
+    return bundle
+
+
+# --------------------------------------------------
+# Publish (ingestion side)
+# --------------------------------------------------
+
+SCHEMA = """
+    CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+    CREATE TABLE companies (
+        company_id TEXT PRIMARY KEY,
+        name TEXT, sector TEXT, industry TEXT,
+        data_version TEXT
+    );
+    CREATE INDEX companies_name ON companies (name);
+    CREATE TABLE overview (
+        company_id TEXT PRIMARY KEY,
+        news_complete INTEGER,  -- 1 if every news item fit under news_limit
+        payload TEXT
+    );
+"""
+
+
+def current_snapshot_path(directory=READ_MODEL_DIR):
+    try:
+        name = (Path(directory) / POINTER).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    path = Path(directory) / name
+    return path if name and path.exists() else None
+
+
+def _previous_rows(path, news_limit):
+    """company_id -> (data_version, news_complete, payload) from the live snapshot."""
+    if path is None:
+        return {}
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("""
+            SELECT c.company_id, c.data_version, o.news_complete, o.payload
+            FROM companies c JOIN overview o USING (company_id)
+        """).fetchall()
+        stored_limit = conn.execute("SELECT value FROM meta WHERE key = 'news_limit'").fetchone()
+    finally:
+        conn.close()
+    if not stored_limit or int(stored_limit[0]) != news_limit:
+        return {}  # built with a different news depth: rebuild everything
+    return {cid: (version, complete, payload) for cid, version, complete, payload in rows}
+
+
+def publish_snapshot(session, directory=READ_MODEL_DIR, news_limit=SNAPSHOT_NEWS_LIMIT):
+    """
+    Build a new snapshot from Neo4j and make it current. Companies whose
+    data_version matches the live snapshot are copied instead of re-queried.
+    Returns {"path", "companies", "rebuilt"}.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    previous = _previous_rows(current_snapshot_path(directory), news_limit)
+
+    companies = [
+        dict(r)
+        for r in session.run("""
+            MATCH (c:Company)
+            RETURN c.company_id AS company_id, c.name AS name, c.sector AS sector,
+                   c.industry AS industry, c.data_version AS data_version
+        """)
+    ]
+
+    version = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    name = f"read_model-{version}.sqlite"
+    building = directory / (name + ".tmp")
+    conn = sqlite3.connect(building)
+    rebuilt = 0
+    try:
+        conn.executescript(SCHEMA)
+        for c in companies:
+            cid = c["company_id"]
+            cached = previous.get(cid)
+            if cached and c["data_version"] and cached[0] == c["data_version"]:
+                news_complete, payload = cached[1], cached[2]
+            else:
+                bundle = load_overview(session, cid, news_limit)
+                if bundle is None:
+                    continue
+                news_complete = int(len(bundle["news"]) < news_limit)
+                payload = json.dumps(bundle, default=str)
+                rebuilt += 1
+            conn.execute(
+                "INSERT INTO companies VALUES (?, ?, ?, ?, ?)",
+                (cid, c["name"], c["sector"], c["industry"], c["data_version"]),
+            )
+            conn.execute("INSERT INTO overview VALUES (?, ?, ?)", (cid, news_complete, payload))
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("built_at", datetime.utcnow().isoformat() + "Z"),
+            ("news_limit", str(news_limit)),
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(building, directory / name)
+    pointer_tmp = directory / (POINTER + ".tmp")
+    pointer_tmp.write_text(name, encoding="utf-8")
+    os.replace(pointer_tmp, directory / POINTER)
+
+    _prune(directory)
+    return {"path": str(directory / name), "companies": len(companies), "rebuilt": rebuilt}
+
+
+def _prune(directory):
+    snapshots = sorted(directory.glob("read_model-*.sqlite"))
+    for old in snapshots[:-KEEP_SNAPSHOTS]:
+        try:
+            old.unlink()
+        except OSError:
+            pass  # still open somewhere (Windows); next publish retries
+
+
+# --------------------------------------------------
+# Serve (app side)
+# --------------------------------------------------
+
+class ReadModel:
+    """
+    Local reader for the published snapshot. Every lookup stats the CURRENT
+    pointer and reopens when it changed, so a new ingestion is picked up on
+    the next request. Lookups return None on a miss (no snapshot, unknown
+    company, or more news requested than the snapshot holds).
+    """
+
+    def __init__(self, directory=READ_MODEL_DIR):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pointer_key = None
+        self._path = None
+        self.hits = 0
+        self.misses = 0
+
+    def _refresh(self):
+        # caller holds self._lock
+        try:
+            st = os.stat(self.directory / POINTER)
+        except FileNotFoundError:
+            self._swap(None, None)
+            return
+        key = (st.st_mtime_ns, st.st_size, st.st_ino)
+        if key == self._pointer_key:
+            return
+        path = current_snapshot_path(self.directory)
+        conn = None
+        if path is not None:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._swap(conn, path)
+        self._pointer_key = key
+
+    def _swap(self, conn, path):
+        old, self._conn, self._path = self._conn, conn, path
+        if old is not None:
+            old.close()
+        if conn is None:
+            self._pointer_key = None
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            self._refresh()
+            if self._conn is None:
+                return None
+            return self._conn.execute(sql, params).fetchall()
+
+    def _count(self, hit):
+        # += is not atomic across request threads
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def companies(self, limit=50):
+        rows = self._query(
+            "SELECT company_id, name, sector, industry FROM companies ORDER BY name LIMIT ?",
+            (limit,),
+        )
+        self._count(rows is not None)
+        if rows is None:
+            return None
+        return [
+            {"company_id": cid, "name": name, "sector": sector, "industry": industry}
+            for cid, name, sector, industry in rows
+        ]
+
+    def overview(self, company_id, limit_news):
+        rows = self._query(
+            "SELECT news_complete, payload FROM overview WHERE company_id = ?", (company_id,),
+        )
+        if not rows:
+            self._count(False)
+            return None
+        news_complete, payload = rows[0]
+        bundle = json.loads(payload)
+        # only the latest news_limit items are stored; asking for more is a miss
+        if limit_news > len(bundle["news"]) and not news_complete:
+            self._count(False)
+            return None
+        bundle["news"] = bundle["news"][:max(limit_news, 0)]
+        self._count(True)
+        return bundle
+
+    def stats(self):
+        with self._lock:
+            self._refresh()
+            path, hits, misses = self._path, self.hits, self.misses
+        return {
+            "snapshot": path.name if path else None,
+            "hits": hits,
+            "misses": misses,
+        }
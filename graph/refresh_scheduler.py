@@ -0,0 +1,322 @@
+"""
+Priority refresh scheduler around graph/ingestion.py run_ingestion.
+
+    python graph/refresh_scheduler.py --universe universe.json
+    python graph/refresh_scheduler.py --universe universe.json --plan   # show the queue, ingest nothing
+    python graph/refresh_scheduler.py --once                            # one refresh, then exit
+
+universe.json lists the companies to keep fresh:
+
+    [{"company_id": "TATA_ELXSI",
+      "screener_url": "https://www.screener.in/company/TATAELXSI/",
+      "news_query": "Tata Elxsi"}]
+
+Each tick every company is scored
+
+    staleness      hours since its last refresh / FIRMLENS_REFRESH_BASE_HOURS
+  + news volume    log1p(articles published in the last 7 days) * NEWS_WEIGHT
+  + results season RESULTS_BOOST while inside the window after a quarter end
+                   when Indian companies publish results (0-45 days), for
+                   companies whose latest stored quarter predates that
+                   quarter end (their results are due)
+
+and the highest-scoring company that is eligible (past its jittered
+minimum interval / failure backoff) is refreshed, if every source it
+uses still has budget. Budgets are token buckets per source (screener
+scrapes, NewsAPI calls). State (last refresh, next eligible time,
+failures, bucket levels) is persisted after every run, so a restart
+resumes where it left off instead of refreshing everything at once.
+"""
+import argparse
+import heapq
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from data.data_extraction import SCREENER_URL
+from graph.ingestion import run_ingestion
+from graph.neo4j_connection import Neo4jConnection
+from graph.series_store import reads_series
+
+
+def _env_float(name, default):
+    v = os.getenv(name)
+    return float(v) if v is not None and v.strip() != "" else default
+
+
+STATE_PATH = Path(os.getenv("FIRMLENS_SCHEDULER_STATE") or project_root / "refresh_state.json")
+
+BASE_HOURS = _env_float("FIRMLENS_REFRESH_BASE_HOURS", 24)        # staleness unit
+MIN_INTERVAL_HOURS = _env_float("FIRMLENS_REFRESH_MIN_HOURS", 2)  # per company
+MAX_BACKOFF_HOURS = _env_float("FIRMLENS_REFRESH_MAX_BACKOFF_HOURS", 48)
+JITTER = _env_float("FIRMLENS_REFRESH_JITTER", 0.2)               # +/- fraction
+NEWS_WEIGHT = 0.5
+RESULTS_BOOST = 1.5
+RESULTS_WINDOW_DAYS = 45
+IDLE_SLEEP_S = _env_float("FIRMLENS_REFRESH_IDLE_S", 60)
+
+# source -> (capacity, refill per hour); one ingestion costs 1 of each source
+BUDGETS = {
+    "screener": (_env_float("FIRMLENS_BUDGET_SCREENER", 30), _env_float("FIRMLENS_BUDGET_SCREENER_PER_HOUR", 30)),
+    "newsapi": (_env_float("FIRMLENS_BUDGET_NEWSAPI", 10), _env_float("FIRMLENS_BUDGET_NEWSAPI_PER_HOUR", 4)),
+}
+SOURCES_PER_RUN = ["screener", "newsapi"]
+
+DEFAULT_UNIVERSE = [
+    {"company_id": "TATA_ELXSI", "screener_url": SCREENER_URL, "news_query": "Tata Elxsi"},
+]
+
+
+# --------------------------------------------------
+# State
+# --------------------------------------------------
+
+def load_state(path=STATE_PATH) -> dict:
+    """{"companies": {company_id: {...}}, "budgets": {source: {"tokens", "at"}}}"""
+    if not Path(path).exists():
+        return {"companies": {}, "budgets": {}}
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    state.setdefault("companies", {})
+    state.setdefault("budgets", {})
+    return state
+
+
+def save_state(state, path=STATE_PATH):
+    # Write-then-rename so a crash never leaves a half-written state file
+    tmp = Path(path).with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def load_universe(path):
+    if not path:
+        return DEFAULT_UNIVERSE
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# --------------------------------------------------
+# Rate budgets (token buckets)
+# --------------------------------------------------
+
+def _bucket(state, source, now):
+    capacity, per_hour = BUDGETS[source]
+    b = state["budgets"].get(source) or {"tokens": capacity, "at": now}
+    tokens = min(capacity, b["tokens"] + (now - b["at"]) / 3600 * per_hour)
+    b = {"tokens": tokens, "at": now}
+    state["budgets"][source] = b
+    return b
+
+
+def has_budget(state, sources, now) -> bool:
+    return all(_bucket(state, s, now)["tokens"] >= 1 for s in sources)
+
+
+def spend(state, sources, now):
+    for s in sources:
+        _bucket(state, s, now)["tokens"] -= 1
+
+
+def seconds_until_budget(state, sources, now) -> float:
+    wait = 0.0
+    for s in sources:
+        missing = 1 - _bucket(state, s, now)["tokens"]
+        if missing > 0:
+            wait = max(wait, missing / BUDGETS[s][1] * 3600)
+    return wait
+
+
+# --------------------------------------------------
+# Scoring
+# --------------------------------------------------
+
+_QUARTER_ENDS = [(3, 31), (6, 30), (9, 30), (12, 31)]
+
+
+def last_quarter_end(today: date) -> date:
+    ends = [date(y, m, d) for y in (today.year - 1, today.year) for m, d in _QUARTER_ENDS]
+    return max(e for e in ends if e <= today)
+
+
+def days_since_quarter_end(today: date) -> int:
+    return (today - last_quarter_end(today)).days
+
+
+def results_due(latest_quarter: str | None, today: date) -> bool:
+    """Inside the results window and the company's last quarter isn't stored yet."""
+    if days_since_quarter_end(today) > RESULTS_WINDOW_DAYS:
+        return False
+    return latest_quarter is None or latest_quarter < last_quarter_end(today).isoformat()
+
+
+def score(entry: dict, now: float, recent_news: int, today: date, latest_quarter: str | None = None) -> float:
+    last = entry.get("last_refresh")
+    staleness = (now - last) / 3600 / BASE_HOURS if last else 10.0  # never refreshed: first
+    season = RESULTS_BOOST if results_due(latest_quarter, today) else 0.0
+    return staleness + NEWS_WEIGHT * math.log1p(recent_news) + season
+
+
+def recent_news_counts(session, company_ids, days=7) -> dict:
+    since = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d")
+    result = session.run("""
+        UNWIND $company_ids AS cid
+        OPTIONAL MATCH (:Company {company_id: cid})-[:MENTIONED_IN]->(n:News)
+        WHERE n.published_at >= $since
+        RETURN cid, count(n) AS recent
+    """, {"company_ids": company_ids, "since": since})
+    return {r["cid"]: r["recent"] for r in result}
+
+
+def latest_quarters(session, company_ids) -> dict:
+    """company_id -> latest stored quarterly period_end (missing if none)."""
+    if reads_series():
+        query = """
+            UNWIND $company_ids AS cid
+            MATCH (s:MetricSeries {company_id: cid, period_type: "quarter"})
+            WHERE size(s.period_end) > 0
+            RETURN cid, s.period_end[-1] AS latest
+        """
+    else:
+        query = """
+            UNWIND $company_ids AS cid
+            MATCH (:Company {company_id: cid})-[:HAS_PERIOD]->(p:FinancialPeriod {period_type: "quarter"})
+            RETURN cid, max(p.period_end) AS latest
+        """
+    return {r["cid"]: r["latest"] for r in session.run(query, {"company_ids": company_ids})}
+
+
+def build_queue(universe, state, now, recent, latest=None) -> list:
+    """Heap of (-score, company_id, company) for every company in the universe."""
+    today = datetime.utcfromtimestamp(now).date()
+    latest = latest or {}
+    heap = []
+    for company in universe:
+        cid = company["company_id"]
+        entry = state["companies"].get(cid, {})
+        priority = score(entry, now, recent.get(cid, 0), today, latest.get(cid))
+        heapq.heappush(heap, (-priority, cid, company))
+    return heap
+
+
+def _jittered(hours):
+    return hours * 3600 * (1 + random.uniform(-JITTER, JITTER))
+
+
+def record_result(state, company_id, now, ok, result=None):
+    entry = state["companies"].setdefault(company_id, {})
+    if ok:
+        entry.update({
+            "last_refresh": now,
+            "failures": 0,
+            "next_eligible": now + _jittered(MIN_INTERVAL_HOURS),
+            "last_new_news": (result or {}).get("new_news"),
+        })
+    else:
+        failures = entry.get("failures", 0) + 1
+        backoff = min(MIN_INTERVAL_HOURS * 2 ** failures, MAX_BACKOFF_HOURS)
+        entry.update({"failures": failures, "next_eligible": now + _jittered(backoff)})
+
+
+def next_company(universe, state, now, recent, latest=None):
+    """Highest-priority eligible company, or (None, seconds to wait)."""
+    queue = build_queue(universe, state, now, recent, latest)
+    wait = IDLE_SLEEP_S
+    while queue:
+        neg_score, cid, company = heapq.heappop(queue)
+        eligible_at = state["companies"].get(cid, {}).get("next_eligible", 0)
+        if eligible_at > now:
+            wait = min(wait, eligible_at - now)
+            continue
+        if not has_budget(state, SOURCES_PER_RUN, now):
+            return None, max(1.0, seconds_until_budget(state, SOURCES_PER_RUN, now))
+        return (company, -neg_score), 0.0
+    return None, max(1.0, wait)
+
+
+# --------------------------------------------------
+# Loop
+# --------------------------------------------------
+
+def run(driver, universe, *, once=False, plan=False):
+    state = load_state()
+    ids = [c["company_id"] for c in universe]
+
+    while True:
+        now = time.time()
+        with driver.driver.session() as session:
+            recent = recent_news_counts(session, ids)
+            latest = latest_quarters(session, ids)
+
+        if plan:
+            for neg_score, cid, _ in sorted(build_queue(universe, state, now, recent, latest)):
+                entry = state["companies"].get(cid, {})
+                eligible_in = max(0, entry.get("next_eligible", 0) - now) / 60
+                print(f"  {-neg_score:6.2f}  {cid:<24} recent_news={recent.get(cid, 0):<4} "
+                      f"latest_quarter={latest.get(cid) or '-':<10} "
+                      f"eligible_in={eligible_in:.0f}m failures={entry.get('failures', 0)}")
+            return
+
+        picked, wait = next_company(universe, state, now, recent, latest)
+        if picked is None:
+            save_state(state)  # bucket levels
+            if once:
+                print(f"⏸  Nothing eligible (next in {wait:.0f}s)")
+                return
+            time.sleep(wait + random.uniform(0, JITTER * wait))
+            continue
+
+        company, priority = picked
+        cid = company["company_id"]
+        print(f"\n⏱  Refreshing {cid} (priority {priority:.2f})")
+        spend(state, SOURCES_PER_RUN, now)
+        try:
+            result = run_ingestion(
+                driver,
+                screener_url=company.get("screener_url") or SCREENER_URL,
+                news_query=company.get("news_query"),
+            )
+            record_result(state, cid, time.time(), True, result)
+            print(f"✅ {cid}: {result['new_news']} new articles")
+        except Exception as e:
+            record_result(state, cid, time.time(), False)
+            print(f"❌ {cid} failed ({state['companies'][cid]['failures']} in a row): {e}")
+        save_state(state)
+
+        if once:
+            return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Priority refresh scheduler")
+    parser.add_argument("--universe", help="JSON list of companies (default: Tata Elxsi only)")
+    parser.add_argument("--once", action="store_true", help="Refresh at most one company and exit")
+    parser.add_argument("--plan", action="store_true", help="Print the ranked queue and exit")
+    args = parser.parse_args()
+
+    conn = Neo4jConnection(
+        os.getenv("NEO4J_URI", "bolt://127.0.0.1:7687"),
+        os.getenv("NEO4J_USER", "neo4j"),
+        os.getenv("NEO4J_PASSWORD", "firmlens"),
+    )
+    try:
+        run(conn, load_universe(args.universe), once=args.once, plan=args.plan)
+    except KeyboardInterrupt:
+        print("\n⚠️  Scheduler stopped")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
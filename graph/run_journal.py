@@ -0,0 +1,133 @@
+import json
+import os
+import sqlite3
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# --------------------------------------------------
+# Ingestion run journal
+#
+# A local SQLite file recording, per run and per company, which pipeline
+# stages completed and what they produced (the normalized payloads). A run
+# that dies partway is resumed by replaying completed stages from the
+# journal: nothing is re-scraped and finished graph writes are skipped.
+# Graph stages are MERGE-based, so re-running the one that was in flight
+# when the run died is safe.
+# --------------------------------------------------
+
+project_root = Path(__file__).parent.parent
+JOURNAL_PATH = Path(os.getenv("FIRMLENS_JOURNAL") or project_root / "ingest_journal.sqlite")
+# An unfinished run older than this is abandoned instead of resumed (stale payloads)
+RESUME_MAX_AGE_HOURS = float(os.getenv("FIRMLENS_JOURNAL_MAX_AGE_H") or 24)
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        run_id TEXT PRIMARY KEY,
+        started_at TEXT NOT NULL,
+        finished_at TEXT,
+        status TEXT NOT NULL             -- running | done | abandoned
+    );
+    CREATE TABLE IF NOT EXISTS stages (
+        run_id TEXT NOT NULL,
+        company_key TEXT NOT NULL,
+        stage TEXT NOT NULL,
+        payload TEXT,                    -- JSON result of the stage
+        completed_at TEXT NOT NULL,
+        PRIMARY KEY (run_id, company_key, stage)
+    );
+"""
+
+
+def _now():
+    return datetime.utcnow().isoformat() + "Z"
+
+
+class RunJournal:
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.run_id = None
+        self.resumed = False
+
+    def start_run(self, resume=True, max_age_hours=RESUME_MAX_AGE_HOURS):
+        """Resume the latest unfinished run if it is recent enough, else start a new one."""
+        row = self.conn.execute("""
+            SELECT run_id, started_at FROM runs
+            WHERE status = 'running' ORDER BY started_at DESC LIMIT 1
+        """).fetchone()
+
+        cutoff = (datetime.utcnow() - timedelta(hours=max_age_hours)).isoformat() + "Z"
+        if row and resume and row[1] >= cutoff:
+            self.run_id, self.resumed = row[0], True
+            return self.run_id
+
+        with self.conn:
+            self.conn.execute(
+                "UPDATE runs SET status = 'abandoned', finished_at = ? WHERE status = 'running'",
+                (_now(),),
+            )
+            self.run_id = uuid.uuid4().hex
+            self.conn.execute(
+                "INSERT INTO runs (run_id, started_at, status) VALUES (?, ?, 'running')",
+                (self.run_id, _now()),
+            )
+        self.resumed = False
+        return self.run_id
+
+    def completed(self, company_key, stage):
+        """(True, payload) if the stage finished in this run, else (False, None)."""
+        row = self.conn.execute(
+            "SELECT payload FROM stages WHERE run_id = ? AND company_key = ? AND stage = ?",
+            (self.run_id, company_key, stage),
+        ).fetchone()
+        if row is None:
+            return False, None
+        return True, json.loads(row[0]) if row[0] is not None else None
+
+    def step(self, company_key, stage, fn):
+        """Run `fn` once per run: a completed stage returns its journaled result."""
+        done, payload = self.completed(company_key, stage)
+        if done:
+            print(f"  ↻ {stage}: completed earlier in this run, skipping")
+            return payload
+        result = fn()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?, ?)",
+                (self.run_id, company_key, stage,
+                 json.dumps(result, default=str) if result is not None else None, _now()),
+            )
+        return result
+
+    def company_done(self, company_key):
+        return self.completed(company_key, "done")[0]
+
+    def finish_run(self):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE runs SET status = 'done', finished_at = ? WHERE run_id = ?",
+                (_now(), self.run_id),
+            )
+            # Payloads of finished runs are no longer needed
+            self.conn.execute(
+                "UPDATE stages SET payload = NULL WHERE run_id = ?", (self.run_id,)
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+class NullJournal:
+    """Same interface, no persistence (one-off callers such as the scheduler)."""
+
+    run_id = None
+    resumed = False
+
+    def step(self, company_key, stage, fn):
+        return fn()
+
+    def company_done(self, company_key):
+        return False
@@ -0,0 +1,143 @@
+import math
+import os
+
+# --------------------------------------------------
+# Compact time-series storage mode
+#
+# Instead of one FinancialPeriod + one FinancialMetrics node per period, a
+# company's quarterly (or annual) history is one node holding aligned arrays:
+#
+#   (:Company)-[:HAS_SERIES]->(:MetricSeries {company_id, period_type,
+#        period_end: [...], label: [...], sales: [...], eps: [...], ...})
+#
+# Neo4j list properties cannot contain nulls, so gaps are stored as NaN
+# (numbers) or "" (strings) and turned back into None on read.
+#
+# FIRMLENS_STORAGE_MODE:
+#   graph  (default) period/metrics nodes only
+#   series           series nodes only (reads use the series adapter)
+#   both             write both, read series
+# --------------------------------------------------
+
+STORAGE_MODE = (os.getenv("FIRMLENS_STORAGE_MODE") or "graph").strip().lower()
+
+NUMBER_FIELDS = [
+    "sales", "operating_profit", "net_profit", "opm_percent", "eps",
+    # derived (see normalizations/derived_metrics.py)
+    "sales_qoq", "sales_yoy", "sales_ttm",
+    "operating_profit_qoq", "operating_profit_yoy", "operating_profit_ttm",
+    "net_profit_qoq", "net_profit_yoy", "net_profit_ttm",
+    "eps_qoq", "eps_yoy", "eps_ttm",
+    "opm_delta_qoq", "opm_delta_yoy", "opm_avg_4q",
+]
+STRING_FIELDS = ["label", "source_url", "raw_hash"]  # raw_hash: see normalize_numbers.column_hash
+
+
+def writes_graph() -> bool:
+    return STORAGE_MODE in ("graph", "both")
+
+
+def writes_series() -> bool:
+    return STORAGE_MODE in ("series", "both")
+
+
+def reads_series() -> bool:
+    return STORAGE_MODE in ("series", "both")
+
+
+# --------------------------------------------------
+# Encoding
+# --------------------------------------------------
+
+def _flatten(row: dict) -> dict:
+    return {**row, **(row.get("derived") or {})}
+
+
+def rows_to_arrays(rows: list[dict]) -> dict:
+    """Period rows -> aligned, null-free arrays sorted by period_end."""
+    rows = sorted((_flatten(r) for r in rows), key=lambda r: r["period_end"])
+    arrays = {"period_end": [r["period_end"] for r in rows]}
+    for f in NUMBER_FIELDS:
+        arrays[f] = [float(r[f]) if r.get(f) is not None else math.nan for r in rows]
+    for f in STRING_FIELDS:
+        arrays[f] = [r.get(f) or "" for r in rows]
+    return arrays
+
+
+def _decode_number(v):
+    if v is None or (isinstance(v, float) and math.isnan(v)):
+        return None
+    return int(v) if float(v).is_integer() else v
+
+
+def arrays_to_rows(series: dict, fields: list[str] | None = None) -> list[dict]:
+    """Series node properties -> overview-style rows (oldest first)."""
+    ends = list(series.get("period_end") or [])
+    wanted = (["label"] + NUMBER_FIELDS + ["source_url"]) if fields is None else fields
+    rows = []
+    for i, end in enumerate(ends):
+        row = {"period_end": end}
+        for f in wanted:
+            values = series.get(f)
+            if values is None or i >= len(values):
+                row[f] = None
+            elif f in STRING_FIELDS:
+                row[f] = values[i] or None
+            else:
+                row[f] = _decode_number(values[i])
+        rows.append(row)
+    return rows
+
+
+def merge_rows(existing: dict | None, rows: list[dict]) -> list[dict]:
+    """Existing series + new rows; a new row replaces the same period_end."""
+    by_end = {r["period_end"]: r for r in arrays_to_rows(existing or {})}
+    for r in rows:
+        by_end[r["period_end"]] = _flatten(r)
+    return list(by_end.values())
+
+
+# --------------------------------------------------
+# Write
+# --------------------------------------------------
+
+def ingest_series(tx, company_id, period_type, rows):
+    """Upsert one company's series node for a period_type (merging periods)."""
+    existing = tx.run("""
+        MATCH (s:MetricSeries {company_id: $company_id, period_type: $period_type})
+        RETURN s AS series
+    """, {"company_id": company_id, "period_type": period_type}).single()
+
+    merged = merge_rows(dict(existing["series"]) if existing else None, rows)
+    tx.run("""
+        MERGE (c:Company {company_id: $company_id})
+        MERGE (s:MetricSeries {company_id: $company_id, period_type: $period_type})
+        SET s += $arrays
+        MERGE (c)-[:HAS_SERIES]->(s)
+    """, {"company_id": company_id, "period_type": period_type, "arrays": rows_to_arrays(merged)})
+
+
+# --------------------------------------------------
+# Read adapter
+# --------------------------------------------------
+
+def read_series_many(session, company_ids, period_type, *, limit=None, fields=None):
+    """
+    {company_id: rows} for several companies in one query.
+    `limit` keeps only the latest N periods (still returned oldest first).
+    """
+    result = session.run("""
+        UNWIND $company_ids AS cid
+        MATCH (s:MetricSeries {company_id: cid, period_type: $period_type})
+        RETURN cid, s AS series
+    """, {"company_ids": list(company_ids), "period_type": period_type})
+
+    out = {cid: [] for cid in company_ids}
+    for r in result:
+        rows = arrays_to_rows(dict(r["series"]), fields)
+        out[r["cid"]] = rows[-int(limit):] if limit else rows
+    return out
+
+
+def read_series(session, company_id, period_type, *, limit=None, fields=None):
+    return read_series_many(session, [company_id], period_type, limit=limit, fields=fields)[company_id]
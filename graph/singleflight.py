@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import functools
+import os
+import threading
+from typing import Any, Callable, Hashable
+
+# --------------------------------------------------
+# Single-flight request coalescing
+#
+# Concurrent calls with the same key share ONE in-flight computation; every
+# waiter gets the leader's result (or its exception). Nothing is cached after
+# the call finishes, so data is never staler than a normal read.
+#
+# FIRMLENS_SINGLEFLIGHT selects the coalesced groups:
+#   "all" (default) | "off" | comma list, e.g. "overview,chat"
+# Results are shared between waiters: treat them as read-only.
+# --------------------------------------------------
+
+
+def _enabled_groups() -> set[str] | None:
+    """None means every group is enabled."""
+    raw = (os.getenv("FIRMLENS_SINGLEFLIGHT") or "all").strip().lower()
+    if raw in ("all", "on", "1", "true"):
+        return None
+    if raw in ("off", "none", "0", "false"):
+        return set()
+    return {g.strip() for g in raw.split(",") if g.strip()}
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.executed = 0
+        self.collapsed = 0
+        self.errors = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        if not self.enabled:
+            with self._lock:
+                self.calls += 1
+                self.executed += 1
+            return fn(*args, **kwargs)
+
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                call.waiters += 1
+                self.collapsed += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "calls": self.calls,
+                "executed": self.executed,
+                "collapsed": self.collapsed,
+                "errors": self.errors,
+                "in_flight": len(self._calls),
+            }
+
+
+_groups: dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def get_group(name: str) -> SingleFlight:
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            enabled = _enabled_groups()
+            group = SingleFlight(name, enabled=enabled is None or name in enabled)
+            _groups[name] = group
+        return group
+
+
+def coalesced(group: str, key: Callable[..., Hashable]):
+    """
+    Decorator: route calls through the named single-flight group.
+    `key` receives the same arguments as the wrapped function.
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return get_group(group).do(key(*args, **kwargs), fn, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def singleflight_stats() -> dict[str, dict[str, Any]]:
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {g.name: g.stats() for g in groups}
@@ -0,0 +1,112 @@
+import cProfile
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+# --------------------------------------------------
+# Per-stage ingestion profiling (python graph/ingestion.py --profile)
+#
+# Every pipeline stage of every company is timed: wall clock, CPU time of
+# the process, and the peak Python heap allocated while it ran (tracemalloc,
+# only switched on in this mode). With a dump directory each stage also
+# runs under cProfile and is written to <dir>/<company>/<stage>.pstats,
+# readable with `python -m pstats` or snakeviz.
+#
+# Stages are never nested (the extract step is split into http / parse /
+# extract / stored_periods / normalize), so times add up and the cProfile
+# and tracemalloc peaks of one stage don't interfere with another.
+# --------------------------------------------------
+
+
+class StageProfiler:
+    def __init__(self, dump_dir=None):
+        self.dump_dir = Path(dump_dir) if dump_dir else None
+        self.records = []  # {company, stage, wall_s, cpu_s, peak_mb}
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, company, stage):
+        profile = cProfile.Profile() if self.dump_dir else None
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profile:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+            _, peak = tracemalloc.get_traced_memory()
+            self.records.append({
+                "company": company,
+                "stage": stage,
+                "wall_s": time.perf_counter() - wall,
+                "cpu_s": time.process_time() - cpu,
+                "peak_mb": max(0, peak - base) / 1e6,
+            })
+            if profile:
+                path = self.dump_dir / company / f"{stage}.pstats"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                profile.dump_stats(path)
+
+    def wrap(self, company, stage, fn):
+        """fn, timed as `stage` when called (journal.step may skip it)."""
+        def run():
+            with self.stage(company, stage):
+                return fn()
+        return run
+
+    def by_stage(self) -> list[dict]:
+        """Totals per stage across companies, slowest first."""
+        totals = {}
+        for r in self.records:
+            t = totals.setdefault(r["stage"], {
+                "stage": r["stage"], "runs": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_mb": 0.0,
+            })
+            t["runs"] += 1
+            t["wall_s"] += r["wall_s"]
+            t["cpu_s"] += r["cpu_s"]
+            t["peak_mb"] = max(t["peak_mb"], r["peak_mb"])
+        return sorted(totals.values(), key=lambda t: -t["wall_s"])
+
+    def print_summary(self, top=10):
+        if not self.records:
+            print("\n⏱  Profile: no stages ran")
+            return
+        total = sum(r["wall_s"] for r in self.records) or 1.0
+
+        print("\n⏱  Profile by stage (wall-clock share; CPU well below wall = waiting on I/O)")
+        print(f"   {'stage':<16} {'runs':>5} {'wall s':>9} {'cpu s':>9} {'share':>7} {'peak MB':>9}")
+        for t in self.by_stage():
+            print(f"   {t['stage']:<16} {t['runs']:>5} {t['wall_s']:>9.3f} {t['cpu_s']:>9.3f} "
+                  f"{t['wall_s'] / total:>7.1%} {t['peak_mb']:>9.1f}")
+
+        print("\n   Slowest company stages:")
+        for r in sorted(self.records, key=lambda r: -r["wall_s"])[:top]:
+            print(f"   {r['wall_s']:>8.3f}s  {r['company']:<24} {r['stage']}")
+        if resource:
+            # ru_maxrss is KiB on Linux
+            print(f"\n   Process max RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+        if self.dump_dir:
+            print(f"   cProfile dumps: {self.dump_dir}/<company>/<stage>.pstats")
+
+
+class NullProfiler:
+    """Same interface, no measurement (the default)."""
+
+    def stage(self, company, stage):
+        return nullcontext()
+
+    def wrap(self, company, stage, fn):
+        return fn
+
+    def print_summary(self, top=10):
+        pass
@@ -0,0 +1,215 @@
+import hashlib
+import re
+from functools import lru_cache
+
+import numpy as np
+
+# --------------------------------
+# Near-duplicate collapsing (MinHash + LSH banding)
+#
+# Syndicated wire stories arrive from many outlets with near-identical text
+# but different URLs, and outlets decorate them: " | Business Standard"
+# suffixes, "Rs 200 cr" vs "₹200 crore", a swapped verb. Text is first
+# normalized (outlet suffixes stripped from titles, currency / units /
+# percentages / digit grouping unified), then compared as sets of word
+# unigrams + bigrams: articles whose Jaccard similarity is >= MIN_JACCARD
+# are one cluster (transitively).
+#
+# Candidate pairs come from MinHash signatures (NUM_PERM hashes) cut into
+# BANDS bands of ROWS rows: a pair lands in a shared bucket with probability
+# 1 - (1 - J^ROWS)^BANDS, ~1.0 at J = MIN_JACCARD, so no all-pairs comparison is
+# needed. Every candidate is then checked with the exact Jaccard.
+# --------------------------------
+
+NUM_PERM = 64
+ROWS = 2
+BANDS = NUM_PERM // ROWS
+MIN_JACCARD = 0.6
+MAX_CANDIDATES = 64
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+_rng = np.random.default_rng(20240611)
+_A = _rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)  # odd multipliers
+_B = _rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+
+
+# --------------------------------
+# Text normalization
+# --------------------------------
+
+# Outlet names seen as title suffixes (compared after _outlet_key)
+OUTLETS = {
+    "business standard", "economic times", "et now", "etmarkets", "moneycontrol",
+    "livemint", "mint", "reuters", "bloomberg", "times of india", "hindu businessline",
+    "business line", "financial express", "ndtv profit", "cnbc tv18", "cnbctv18",
+    "zee business", "business today", "india today", "hindu", "hindustan times",
+    "pti", "ians", "marketscreener", "yahoo finance", "investing com", "trade brains",
+}
+
+_PIPE_SUFFIX = re.compile(r"\s*\|[^|]*$")
+_DASH_SUFFIX = re.compile(r"\s+[-–—]\s+(?P<tail>[^-–—|]+)$")
+
+_NORMALIZE = [
+    (re.compile(r"(?<=\d),(?=\d)"), ""),                                  # 1,234 -> 1234
+    (re.compile(r"(?:₹|\brs\b\.?|\binr\b)\s*(?=\d)"), " inr "),
+    (re.compile(r"(?<=\d)\s*(?:crores?|crs?)\b\.?"), " crore"),
+    (re.compile(r"(?<=\d)\s*(?:lakhs?|lacs?)\b"), " lakh"),
+    (re.compile(r"(?<=\d)\s*(?:billion|bn)\b"), " billion"),
+    (re.compile(r"(?<=\d)\s*(?:million|mn)\b"), " million"),
+    (re.compile(r"(?<=\d)\s*(?:%|per\s?cent\b|pct\b)"), " pct"),
+]
+
+
+def _outlet_key(name: str) -> str:
+    words = _WORD.findall((name or "").lower())
+    if words and words[0] == "the":
+        words = words[1:]
+    return " ".join(words)
+
+
+def strip_outlet(title: str, source: str | None = None) -> str:
+    """Drop " | Outlet" / " - Outlet" title suffixes (outlet = known name or the article's source)."""
+    title = _PIPE_SUFFIX.sub("", title or "").strip() or (title or "")
+    m = _DASH_SUFFIX.search(title)
+    if m:
+        tail = _outlet_key(m.group("tail"))
+        if tail in OUTLETS or (source and tail == _outlet_key(source)):
+            title = title[:m.start()].rstrip()
+    return title
+
+
+def normalize_text(text: str) -> str:
+    text = (text or "").lower()
+    for pattern, repl in _NORMALIZE:
+        text = pattern.sub(repl, text)
+    return text
+
+
+def features(n: dict) -> frozenset:
+    """Word unigrams + bigrams of the normalized title + summary."""
+    text = normalize_text(f"{strip_outlet(n.get('title') or '', n.get('source'))} {n.get('summary') or ''}")
+    words = _WORD.findall(text)
+    return frozenset(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+# --------------------------------
+# MinHash / clustering
+# --------------------------------
+
+@lru_cache(maxsize=65536)
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+
+
+def signatures(feature_sets: list[frozenset]) -> np.ndarray:
+    """(docs, NUM_PERM) MinHash signatures (multiply-add hashing mod 2^64)."""
+    sigs = np.full((len(feature_sets), NUM_PERM), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for i, fs in enumerate(feature_sets):
+        if fs:
+            x = np.fromiter((_feature_hash(f) for f in fs), dtype=np.uint64, count=len(fs))
+            sigs[i] = (x[:, None] * _A + _B).min(axis=0)
+    return sigs
+
+
+def cluster(feature_sets: list[frozenset]) -> list[list[int]]:
+    """Groups of indices with Jaccard >= MIN_JACCARD (transitively)."""
+    parent = list(range(len(feature_sets)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    sigs = signatures(feature_sets)
+    docs = [i for i, fs in enumerate(feature_sets) if fs]
+    for band in range(BANDS):
+        buckets: dict = {}
+        cols = slice(band * ROWS, (band + 1) * ROWS)
+        for i in docs:
+            buckets.setdefault(sigs[i, cols].tobytes(), []).append(i)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            # Compare against the bucket's cluster representatives only, and
+            # at most MAX_CANDIDATES of them, so a skewed bucket stays linear.
+            roots: list[int] = []
+            for j in members:
+                merged = False
+                for i in roots[-MAX_CANDIDATES:]:
+                    if find(i) == find(j) or jaccard(feature_sets[i], feature_sets[j]) >= MIN_JACCARD:
+                        ri, rj = find(i), find(j)
+                        if ri != rj:
+                            parent[rj] = ri
+                        merged = True
+                        break
+                if not merged:
+                    roots.append(j)
+
+    groups: dict = {}
+    for i in range(len(feature_sets)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+def _canonical_rank(n: dict):
+    # Earliest copy wins (usually the original wire story), then the fullest summary.
+    return (n.get("published_ts") or n.get("published_at") or "9999", -len(n.get("summary") or ""))
+
+
+def collapse_duplicates(news: list[dict], existing: list[dict] | None = None) -> list[dict]:
+    """
+    Keep one canonical article per near-duplicate cluster.
+    The canonical article gains:
+      duplicate_count     number of collapsed copies
+      duplicate_sources   their source names
+      duplicate_urls      their URLs
+      duplicate_news_ids  their news_ids (so watermarks still cover them)
+      duplicate_pairs     [url, source] per copy (sources above skip empty ones)
+    `existing` are already-stored articles (news_id, title, summary, source,
+    published_at). A cluster that contains one of them keeps the stored
+    article as canonical: it is returned as {"news_id": <stored id>,
+    "existing": True, "duplicate_*": <the new copies>, "published_ts"} so
+    ingestion can add the copies to the stored node instead of writing them.
+    Order of the input is preserved for the surviving articles.
+    """
+    existing = existing or []
+    everything = list(news) + list(existing)
+    n_new = len(news)
+
+    keep: dict = {}
+    for members in cluster([features(n) for n in everything]):
+        stored = sorted((i for i in members if i >= n_new), key=lambda i: _canonical_rank(everything[i]))
+        fresh = sorted((i for i in members if i < n_new), key=lambda i: _canonical_rank(everything[i]))
+        if not fresh:
+            continue
+        if stored:
+            head, dups = stored[0], fresh
+            record = {
+                "news_id": everything[head]["news_id"],
+                "existing": True,
+                "published_ts": max((news[i].get("published_ts") or "") for i in dups) or None,
+            }
+            position = fresh[0]
+        else:
+            head, dups = fresh[0], fresh[1:]
+            record = dict(news[head])
+            position = head
+        keep[position] = {
+            **record,
+            "duplicate_count": len(dups),
+            "duplicate_sources": [news[i].get("source") for i in dups if news[i].get("source")],
+            "duplicate_urls": [news[i]["url"] for i in dups],
+            "duplicate_news_ids": [news[i]["news_id"] for i in dups],
+            # index-aligned (url, source) per copy; source may be None
+            "duplicate_pairs": [[news[i]["url"], news[i].get("source")] for i in dups],
+        }
+
+    return [keep[i] for i in sorted(keep)]
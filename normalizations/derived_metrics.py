@@ -0,0 +1,135 @@
+from dataclasses import dataclass
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# --------------------------------
+# Derived metrics (vectorized)
+#
+# Each company's periods are laid out on a shared, contiguous period grid
+# as (companies x periods) float arrays with NaN for gaps, so QoQ / YoY
+# growth, TTM sums and rolling aggregates are single array expressions
+# over the whole universe. Results are attached to the normalized rows and
+# stored on FinancialMetrics at ingest time.
+# --------------------------------
+
+METRICS = ["sales", "operating_profit", "net_profit", "opm_percent", "eps"]
+FLOW_METRICS = ["sales", "operating_profit", "net_profit", "eps"]  # summable over quarters
+
+
+@dataclass
+class SeriesPanel:
+    company_ids: list[str]
+    period_type: str                # "quarter" | "year"
+    period_keys: np.ndarray         # (T,) int: year*4+quarter, or year
+    values: dict                    # metric -> (C, T) float64, NaN = missing
+    positions: dict                 # company_id -> {period_end: column}
+
+
+def _period_key(period_end: str, period_type: str) -> int:
+    year, month = int(period_end[:4]), int(period_end[5:7])
+    return year if period_type == "year" else year * 4 + (month - 1) // 3
+
+
+def build_panel(rows_by_company: dict, period_type: str) -> SeriesPanel:
+    """rows_by_company: company_id -> normalized period rows of one period_type."""
+    company_ids = list(rows_by_company)
+    keys = {
+        _period_key(r["period_end"], period_type)
+        for rows in rows_by_company.values()
+        for r in rows
+    }
+    if keys:
+        period_keys = np.arange(min(keys), max(keys) + 1)
+    else:
+        period_keys = np.arange(0)
+    first = int(period_keys[0]) if len(period_keys) else 0
+
+    values = {m: np.full((len(company_ids), len(period_keys)), np.nan) for m in METRICS}
+    positions: dict = {}
+    for ci, cid in enumerate(company_ids):
+        positions[cid] = {}
+        for r in rows_by_company[cid]:
+            col = _period_key(r["period_end"], period_type) - first
+            positions[cid][r["period_end"]] = col
+            for m in METRICS:
+                v = r.get(m)
+                if v is not None:
+                    values[m][ci, col] = v
+
+    return SeriesPanel(company_ids, period_type, period_keys, values, positions)
+
+
+def _shift(x: np.ndarray, n: int) -> np.ndarray:
+    """Value n periods earlier (NaN where it doesn't exist)."""
+    out = np.full_like(x, np.nan)
+    if n < x.shape[1]:
+        out[:, n:] = x[:, :-n]
+    return out
+
+
+def _growth(x: np.ndarray, n: int) -> np.ndarray:
+    """Percent change vs n periods earlier; undefined for non-positive bases."""
+    base = _shift(x, n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(base > 0, (x / base - 1.0) * 100.0, np.nan)
+
+
+def _rolling(x: np.ndarray, window: int, fn) -> np.ndarray:
+    """Trailing-window aggregate; NaN if any period in the window is missing."""
+    out = np.full_like(x, np.nan)
+    if x.shape[1] >= window:
+        out[:, window - 1:] = fn(sliding_window_view(x, window, axis=1), axis=-1)
+    return out
+
+
+def quarterly_derived(panel: SeriesPanel) -> dict:
+    v = panel.values
+    out = {}
+    for m in FLOW_METRICS:
+        out[f"{m}_qoq"] = _growth(v[m], 1)
+        out[f"{m}_yoy"] = _growth(v[m], 4)
+        out[f"{m}_ttm"] = _rolling(v[m], 4, np.sum)
+    opm = v["opm_percent"]
+    out["opm_delta_qoq"] = opm - _shift(opm, 1)
+    out["opm_delta_yoy"] = opm - _shift(opm, 4)
+    out["opm_avg_4q"] = _rolling(opm, 4, np.mean)
+    return out
+
+
+def annual_derived(panel: SeriesPanel) -> dict:
+    v = panel.values
+    out = {f"{m}_yoy": _growth(v[m], 1) for m in FLOW_METRICS}
+    out["opm_delta_yoy"] = v["opm_percent"] - _shift(v["opm_percent"], 1)
+    return out
+
+
+def _attach(rows_by_company: dict, panel: SeriesPanel, derived: dict) -> None:
+    # Convert each array to nested Python lists once (NaN -> None)
+    as_lists = {}
+    for field, arr in derived.items():
+        obj = np.round(arr, 4).astype(object)
+        obj[np.isnan(arr)] = None
+        as_lists[field] = obj.tolist()
+
+    for ci, cid in enumerate(panel.company_ids):
+        for r in rows_by_company[cid]:
+            col = panel.positions[cid][r["period_end"]]
+            r["derived"] = {field: rows[ci][col] for field, rows in as_lists.items()}
+
+
+def attach_derived(payloads: list[dict]) -> list[dict]:
+    """
+    Compute derived metrics for any number of normalize() payloads at once and
+    add a "derived" dict to every quarterly/annual row (in place).
+    """
+    quarterly = {p["company"]["company_id"]: p["quarterly_financials"] for p in payloads}
+    annual = {p["company"]["company_id"]: p["annual_financials"] for p in payloads}
+
+    q_panel = build_panel(quarterly, "quarter")
+    _attach(quarterly, q_panel, quarterly_derived(q_panel))
+
+    a_panel = build_panel(annual, "year")
+    _attach(annual, a_panel, annual_derived(a_panel))
+
+    return payloads
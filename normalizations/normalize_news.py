@@ -1,7 +1,8 @@
 import sys
-import re
+import os
+import json
 import hashlib
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from pathlib import Path
 
 # Add project root to Python path
@@ -9,7 +10,11 @@ project_root = Path(__file__).parent.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
-from data.news_extraction import fetch_company_news, API_KEY
+from data.news_extraction import fetch_company_news_since, API_KEY
+from normalizations.dedup_news import collapse_duplicates
+from normalizations.event_classifier import (
+    TIME_CONTEXT_RE, classify, classify_batch, infer_time_contexts, primary_event
+)
 
 # --------------------------------
 # Helpers
@@ -36,46 +41,169 @@ def parse_date(date_str: str | None) -> str | None:
 
 
 def infer_event_type(title: str, summary: str) -> str:
-    text = f"{title} {summary}".lower()
-
-    if any(k in text for k in ["profit", "pat", "earnings", "results", "margin"]):
-        return "earnings"
-    if any(k in text for k in ["labour", "law", "regulation", "policy"]):
-        return "regulation"
-    if any(k in text for k in ["brokerage", "rating", "target", "buy", "sell"]):
-        return "market_opinion"
-    if any(k in text for k in ["deal", "contract", "order", "partnership"]):
-        return "business_update"
-
-    return "general"
+    """
+    First matched event type in priority order (whole-word keyword match).
+    Use event_classifier.classify_batch for many articles at once.
+    """
+    return primary_event(classify(f"{title} {summary}"))
 
 
 def infer_time_context(text: str) -> str | None:
     """
     Extracts Q / FY context if present
     """
-    match = re.search(r"(Q[1-4])\s*(FY)?\s*(\d{2,4})?", text)
-    if match:
-        return match.group(0)
-    return None
+    return infer_time_contexts([text])[0]
+
+
+_QUARTER_END = {"Q1": (6, 30), "Q2": (9, 30), "Q3": (12, 31), "Q4": (3, 31)}
+
+
+def time_context_to_period_end(time_context: str | None, published_at: str | None) -> str | None:
+    """
+    Quarter end date named by a time context, using the Indian fiscal year
+    (FY25 = Apr 2024 – Mar 2025):
+      'Q3 FY25'  -> '2024-12-31'
+      'Q4FY2025' -> '2025-03-31'
+      'Q3' (no year) -> latest Q3 end on/before published_at
+    """
+    if not time_context:
+        return None
+    m = TIME_CONTEXT_RE.search(time_context)
+    if not m:
+        return None
+
+    quarter, _, year = m.groups()
+    month, day = _QUARTER_END[quarter]
+
+    if year:
+        fy = int(year) + 2000 if len(year) == 2 else int(year)
+        if len(year) == 3 or not 2000 <= fy <= 2100:
+            return None
+        cal_year = fy if quarter == "Q4" else fy - 1
+        return date(cal_year, month, day).isoformat()
+
+    if not published_at:
+        return None
+    published = date.fromisoformat(published_at[:10])
+    end = date(published.year, month, day)
+    if end > published:
+        end = date(published.year - 1, month, day)
+    return end.isoformat()
+
+
+# --------------------------------
+# Watermarks (local state file)
+# --------------------------------
+
+NEWS_STATE_PATH = Path(os.getenv("NEWS_STATE_PATH") or project_root / "news_state.json")
+MAX_SEEN_IDS = 500
+
+
+def _load_state() -> dict:
+    if not NEWS_STATE_PATH.exists():
+        return {}
+    with open(NEWS_STATE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_watermark(company_id: str) -> dict:
+    """
+    {"published_at": <everything older is ingested>,
+     "latest": <newest raw ISO timestamp ingested>,
+     "backfill_to": <set while an older gap is still unfetched>,
+     "seen_ids": [...]}
+    Empty dict if the company was never ingested.
+    """
+    return _load_state().get(company_id, {})
+
+
+def fetch_bounds(wm: dict) -> tuple[str | None, str | None]:
+    """
+    (since, to) for the next fetch. While a gap is open (a previous fetch was
+    truncated), the gap is fetched first; newer articles follow once it closes.
+    """
+    return wm.get("published_at"), wm.get("backfill_to")
+
+
+def advance_watermark(company_id: str, news: list[dict], window: dict | None = None) -> dict:
+    """
+    Record ingested articles. Call only AFTER they are written to the graph,
+    so a failed run refetches them next time.
+
+    `window` is the fetch that produced `news` (see normalize_news). Fetches
+    run newest first, so a truncated one leaves a gap between its `since`
+    and the oldest article it reached: the watermark then stays at `since`
+    and backfill_to marks the gap, instead of jumping to the newest article
+    and skipping the gap for good.
+    """
+    state = _load_state()
+    wm = state.get(company_id, {})
+
+    latest = wm.get("latest") or wm.get("published_at")
+    seen = list(wm.get("seen_ids", []))
+    for n in news:
+        ts = n.get("published_ts")
+        if ts and (latest is None or ts > latest):
+            latest = ts
+        for news_id in [n["news_id"], *n.get("duplicate_news_ids", [])]:
+            if news_id not in seen:
+                seen.append(news_id)
+
+    if window is None or window["complete"]:
+        wm = {"published_at": latest, "latest": latest}
+    else:
+        wm = {"published_at": window["since"], "latest": latest,
+              "backfill_to": window["oldest"] or window["to"]}
+    wm["seen_ids"] = seen[-MAX_SEEN_IDS:]
+    state[company_id] = wm
+
+    # Write-then-rename so a crash never leaves a half-written state file
+    tmp = NEWS_STATE_PATH.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, NEWS_STATE_PATH)
+    return wm
 
 
 # --------------------------------
 # Normalization
 # --------------------------------
 
-def normalize_news():
-    COMPANY_NAME = "Tata Elxsi"
-    COMPANY_ID = "TATA_ELXSI"
+def normalize_news(
+    company_name: str,
+    company_id: str,
+    incremental: bool = True,
+    dedupe: bool = True,
+    existing: list[dict] | None = None
+):
+    """
+    Normalized articles for one company; `company_name` is the NewsAPI query.
+    With `incremental`, only articles newer than the company's watermark
+    (and not already seen) are fetched and returned.
+    Returns (articles, window); pass window to advance_watermark once the
+    articles are stored.
+    With `dedupe`, syndicated near-duplicates collapse into one canonical
+    article that lists the other sources; `existing` (already-stored
+    articles) are matched too, and copies of them come back as
+    existing=True records (see dedup_news.collapse_duplicates).
+    """
+    wm = load_watermark(company_id) if incremental else {}
+    seen_ids = set(wm.get("seen_ids", []))
 
     # Fetch articles from news_extraction.py
-    raw_articles = fetch_company_news(
-        company_name=COMPANY_NAME,
+    since, to = fetch_bounds(wm)
+    if since is None:
+        since = (date.today() - timedelta(days=30)).isoformat()
+    raw_articles, complete = fetch_company_news_since(
+        company_name=company_name,
         api_key=API_KEY,
-        days=30,
-        page_size=10
+        since=since,
+        to=to
     )
+    stamps = [a["published_at"] for a in raw_articles if a.get("published_at")]
+    window = {"since": since, "to": to, "complete": complete, "oldest": min(stamps, default=None)}
     normalized = []
+    texts = []
 
     for article in raw_articles:
         title = clean_text(article.get("title"))
@@ -85,24 +213,42 @@ def normalize_news():
         if not title or not url:
             continue
 
-        event_type = infer_event_type(title, summary or "")
-        time_context = infer_time_context(title + " " + (summary or ""))
+        news_id = generate_news_id(url)
+        if news_id in seen_ids:
+            continue
+        seen_ids.add(news_id)
 
+        texts.append(title + " " + (summary or ""))
         normalized.append({
-            "news_id": generate_news_id(url),
-            "company_id": COMPANY_ID,
+            "news_id": news_id,
+            "company_id": company_id,
 
             "title": title,
             "summary": summary,
             "source": article.get("source"),  # Already a string, not a dict
             "published_at": parse_date(article.get("published_at")),  # Changed from "publishedAt" to "published_at"
+            "published_ts": article.get("published_at"),  # raw timestamp, drives the watermark
             "url": url,
 
-            "event_type": event_type,
-            "time_context": time_context
+            "event_type": None,
+            "event_types": [],
+            "event_scores": [],
+            "time_context": None,
+            "context_period_end": None
         })
 
-    return normalized
+    # Classify the whole batch in one pass
+    for n, scored, time_context in zip(normalized, classify_batch(texts), infer_time_contexts(texts)):
+        n["event_type"] = primary_event(scored)
+        n["event_types"] = [event for event, _ in scored]
+        n["event_scores"] = [score for _, score in scored]
+        n["time_context"] = time_context
+        n["context_period_end"] = time_context_to_period_end(time_context, n["published_at"])
+
+    if dedupe:
+        normalized = collapse_duplicates(normalized, existing)
+
+    return normalized, window
 
 
 # --------------------------------
@@ -110,7 +256,7 @@ def normalize_news():
 # --------------------------------
 
 if __name__ == "__main__":
-    news = normalize_news()
+    news, window = normalize_news("Tata Elxsi", "TATA_ELXSI", incremental=False)
 
     print("\n--- NORMALIZED NEWS ---")
     print("Total articles:", len(news))
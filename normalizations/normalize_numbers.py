@@ -1,3 +1,4 @@
+import hashlib
 import sys
 import os
 from pathlib import Path
@@ -7,33 +8,13 @@ project_root = Path(__file__).parent.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
-from data.data_extraction import extract_all
-import re
+from data.data_extraction import SCREENER_URL, extract_all
+from normalizations.table_parser import parse_cells, parse_table, to_python
 
 # ------------------------
-# Cleaning helpers
+# Date helpers
 # ------------------------
 
-def clean_number(val):
-    if not val:
-        return None
-    val = val.replace(",", "")
-    m = re.findall(r"-?\d+", val)
-    return int(m[0]) if m else None
-
-
-def clean_float(val):
-    if not val:
-        return None
-    return float(val.replace(",", ""))
-
-
-def clean_percent(val):
-    if not val:
-        return None
-    return int(float(val.replace("%", "")))
-
-
 def quarter_to_date(label):
     # "Dec 2025" → "2025-12-31"
     month_map = {
@@ -56,55 +37,119 @@ def year_to_date(label):
 # Normalization
 # ------------------------
 
-def normalize():
-    raw = extract_all()
+# Row fields taken over unchanged from the graph when a column didn't change
+STORED_FIELDS = [
+    "period_end", "label", "sales", "operating_profit", "opm_percent",
+    "net_profit", "eps", "source_url", "raw_hash",
+]
+
+
+def company_id_for(company_name):
+    return company_name.upper().replace(" ", "_")
+
+
+METRIC_FIELDS = ["sales", "operating_profit", "opm_percent", "net_profit", "eps"]
+
+
+def _at(values, i):
+    return values[i] if values and i < len(values) else None
+
+
+def _parsed(table):
+    """Whole metric table -> {metric: [value, ...]} (see table_parser)."""
+    parsed = parse_table({f: table.get(f) or [] for f in METRIC_FIELDS})
+    return {f: to_python(v) for f, v in parsed.items()}
 
-    company_id = raw["company_name"].upper().replace(" ", "_")
 
+# Part of every column hash: bump when parsing changes so stored periods are
+# re-parsed (2: table_parser keeps decimals)
+PARSER_VERSION = "2"
+
+
+def column_hash(label, cells):
+    """Fingerprint of one raw table column; a change means new or restated."""
+    raw = "\x1f".join([PARSER_VERSION, label] + ["" if c is None else str(c) for c in cells])
+    return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+
+def _reuse(stored, company_id, period_type):
+    """A stored period row (see ingestion.stored_periods) in normalize() shape."""
+    row = {f: stored.get(f) for f in STORED_FIELDS}
+    return {**row, "company_id": company_id, "period_type": period_type, "changed": False}
+
+
+def normalize_raw(raw, known=None):
+    """
+    extract_all() output -> normalized payload.
+    `known` maps (period_type, period_end) -> the stored row; columns whose raw
+    cells hash the same as the stored raw_hash are taken from it unchanged.
+    Every row carries changed=True/False so ingestion can
+    write only new or restated periods (see ingestion.rows_to_write).
+    """
+    known = known or {}
+    company_id = company_id_for(raw["company_name"])
+
+    market_cap_cr, current_price = to_python(parse_cells([raw["market_cap"], raw["current_price"]]))
     company = {
         "company_id": company_id,
         "name": raw["company_name"],
         "sector": raw["sector"],
         "industry": raw["industry"],
-        "market_cap_cr": clean_number(raw["market_cap"]),
-        "current_price": clean_number(raw["current_price"]),
+        "market_cap_cr": market_cap_cr,
+        "current_price": current_price,
         "description": raw.get("description"),
         "description_sources": raw.get("description_sources", [])
     }
 
     # Quarterly
     q = raw["quarterly"]
+    values = _parsed(q["metrics"])
     quarterly_financials = []
 
     for i, label in enumerate(q["quarters"]):
+        period_end = quarter_to_date(label)
+        cells = [_at(q["metrics"].get(f), i) for f in METRIC_FIELDS]
+        raw_hash = column_hash(label, cells + [_at(q["sources"], i)])
+
+        stored = known.get(("quarter", period_end))
+        if stored and stored.get("raw_hash") == raw_hash:
+            quarterly_financials.append(_reuse(stored, company_id, "quarter"))
+            continue
+
         quarterly_financials.append({
             "company_id": company_id,
             "period_type": "quarter",
-            "period_end": quarter_to_date(label),
+            "period_end": period_end,
             "label": label,
-            "sales": clean_number(q["metrics"]["sales"][i]),
-            "operating_profit": clean_number(q["metrics"]["operating_profit"][i]),
-            "opm_percent": clean_percent(q["metrics"]["opm_percent"][i]),
-            "net_profit": clean_number(q["metrics"]["net_profit"][i]),
-            "eps": clean_float(q["metrics"]["eps"][i]),
-            "source_url": q["sources"][i]
+            **{f: _at(values[f], i) for f in METRIC_FIELDS},
+            "source_url": _at(q["sources"], i),
+            "raw_hash": raw_hash,
+            "changed": True
         })
 
     # Annual P&L
     pl = raw["pl"]
+    values = _parsed(pl)
     annual_financials = []
 
     for i, year in enumerate(pl["years"]):
+        period_end = year_to_date(year)
+        cells = [_at(pl.get(f), i) for f in METRIC_FIELDS]
+        raw_hash = column_hash(year, cells)
+
+        stored = known.get(("year", period_end))
+        if stored and stored.get("raw_hash") == raw_hash:
+            annual_financials.append(_reuse(stored, company_id, "year"))
+            continue
+
         annual_financials.append({
             "company_id": company_id,
             "period_type": "year",
-            "period_end": year_to_date(year),
+            "period_end": period_end,
             "label": f"FY{year.split()[1]}",
-            "sales": clean_number(pl["sales"][i]),
-            "operating_profit": clean_number(pl["operating_profit"][i]),
-            "opm_percent": clean_percent(pl["opm_percent"][i]),
-            "net_profit": clean_number(pl["net_profit"][i]),
-            "eps": clean_float(pl["eps"][i])
+            **{f: _at(values[f], i) for f in METRIC_FIELDS},
+            "raw_hash": raw_hash,
+            "changed": True
         })
 
     normalized_payload = {
@@ -116,6 +161,10 @@ def normalize():
     return normalized_payload
 
 
+def normalize(url=SCREENER_URL, known=None):
+    return normalize_raw(extract_all(url), known)
+
+
 # ------------------------
 # Run directly
 # ------------------------
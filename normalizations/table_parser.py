@@ -0,0 +1,115 @@
+import math
+import re
+
+import numpy as np
+
+# --------------------------------
+# Bulk table parser
+#
+# A scraped screener table (metric -> list of cell strings) is parsed in one
+# pass: all cells are joined into one text, separators and signs are
+# rewritten with whole-text str.replace calls, and numpy converts the lines
+# to float64 in bulk. Decimals are kept ("1,234.56" -> 1234.56), which the
+# old per-cell helpers truncated. Texts the fast path cannot convert (unit
+# suffixes, currency signs, stray words) go through one precompiled,
+# line-anchored regex instead.
+#
+# Handled:   "1,234"  "1,234.56"  "-12"  "−12"  "(1,234)"  "12.5%"
+#            "₹ 45,123 Cr."  "850 Lakh" (-> 8.5, amounts are in crore)
+# Blank or unparseable cells become NaN (None once converted to Python).
+# --------------------------------
+
+_CELL_RE = re.compile(r"""
+    ^[ \t]*
+    (?:
+        (?P<open>\()?[ \t]*
+        (?P<sign>[-+−])?[ \t]*
+        (?:₹|Rs\.?)?[ \t]*
+        (?P<num>\d+(?:\.\d*)?|\.\d+)
+        [ \t]*(?P<pct>%)?
+        [ \t]*(?P<unit>Cr\.?|Crores?|Lakhs?|Lacs?)?
+        [ \t]*\)?
+      |
+        [^\n]*
+    )
+    [ \t]*$
+""", re.MULTILINE | re.VERBOSE | re.IGNORECASE)
+
+# unit -> multiplier into crore
+_UNIT_SCALE = {"lakh": 0.01, "lakhs": 0.01, "lac": 0.01, "lacs": 0.01}
+
+# (old, new) rewrites turning common cells into plain float literals.
+# Only a cell's trailing ")" / "%" is dropped and whitespace is kept, so
+# anything _CELL_RE would not read as a number ("1 234", "%12", "1)2")
+# stays invalid for numpy and the batch falls back to the regex: a cell
+# parses the same whatever else is in the batch.
+_FAST_REPLACE = [(",", ""), (")\n", "\n"), ("%\n", "\n"), ("(", "-"), ("−", "-")]
+
+# After the rewrites, only these may remain; numpy would also accept
+# exponents, "inf"/"nan" and "1_000", which _CELL_RE does not
+_FAST_CHARS = b"0123456789.-+ \t\n"
+
+
+def _cell_text(cell) -> str:
+    if cell is None:
+        return ""
+    return str(cell).replace("\n", " ")
+
+
+def _parse_fast(text: str):
+    """Plain numbers only; None when any cell needs the regex."""
+    text += "\n"
+    for old, new in _FAST_REPLACE:
+        text = text.replace(old, new)
+    try:
+        if text.encode("ascii").translate(None, _FAST_CHARS):
+            return None
+    except UnicodeEncodeError:
+        return None
+    if "--" in text:
+        return None  # "(-5)": the regex applies the sign once
+    try:
+        return np.array([line or "nan" for line in text[:-1].split("\n")], dtype=np.float64)
+    except ValueError:
+        return None
+
+
+def _parse_regex(text: str) -> np.ndarray:
+    opens, signs, nums, _, units = zip(*_CELL_RE.findall(text.replace(",", "")))
+
+    values = np.array([n or "nan" for n in nums], dtype=np.float64)
+    negative = (np.array(opens) == "(") | np.isin(signs, ["-", "−"])
+    values[negative] *= -1
+    if any(units):
+        scale = [_UNIT_SCALE.get(u.lower().rstrip("."), 1.0) for u in units]
+        values *= np.array(scale)
+    return values
+
+
+def parse_cells(cells: list) -> np.ndarray:
+    """Cell strings -> float64 array (NaN = blank / not a number)."""
+    if not cells:
+        return np.zeros(0)
+    text = "\n".join(_cell_text(c) for c in cells)
+    values = _parse_fast(text)
+    return values if values is not None else _parse_regex(text)
+
+
+def parse_table(table: dict) -> dict:
+    """
+    {metric: [cell, ...]} -> {metric: float64 array}, all metrics in one
+    pass. Columns keep their own lengths.
+    """
+    names = list(table)
+    lengths = [len(table[name] or []) for name in names]
+    flat = parse_cells([c for name in names for c in (table[name] or [])])
+    bounds = np.cumsum([0] + lengths)
+    return {name: flat[bounds[i]:bounds[i + 1]] for i, name in enumerate(names)}
+
+
+def to_python(values) -> list:
+    """float64 array -> JSON/Neo4j values: None for NaN, int when integral."""
+    return [
+        None if math.isnan(v) else int(v) if v.is_integer() else v
+        for v in np.asarray(values, dtype=np.float64).tolist()
+    ]